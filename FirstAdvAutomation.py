@@ -1,139 +1,341 @@
-from playwright.sync_api import sync_playwright
-import time
-import re
-import pandas as pd
-
-def fill_shadow_input(component, value, frame):
-    shadow_input = frame.locator(component).evaluate_handle("el => el.shadowRoot.querySelector('input')")
-    shadow_input.as_element().fill(value)
-
-def main(index, row, CLIENT_ID, USER_ID, PASSWORD, SEC_QUESTION, first_name, last_name, email, company_id, location, position_type, csp_id, package_text):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context()
-        page = context.new_page()
-        page.goto("https://enterprise.fadv.com/")
-        time.sleep(5)
-
-        # Login steps
-        frame = page.frame_locator("#new-login-iframe")
-        fill_shadow_input("fadv-input#login-client-id-input", CLIENT_ID, frame)
-        fill_shadow_input("fadv-input#login-user-id-input", USER_ID, frame)
-        fill_shadow_input("fadv-input#login-password-input", PASSWORD, frame)
-        page.frame_locator("#new-login-iframe").locator("fadv-button#login-button").click()
-        time.sleep(2)
-        # Handle Proceed button in iframe
-        frame = page.frame_locator("#new-login-iframe")
-        fill_shadow_input("fadv-input#security-question-input", SEC_QUESTION, frame)
-        page.frame_locator("#new-login-iframe").locator("fadv-button#security-question-submit-button").click()
-        time.sleep(2)
-        try:
-            # Wait for the iframe and switch to it
-            page.wait_for_selector("iframe#new-login-iframe", timeout=5000)
-            frame_locator = page.frame_locator("iframe#new-login-iframe")
-            
-            # Wait for and click the Proceed button using text matching
-            proceed_button = frame_locator.get_by_text("Proceed", exact=True)
-            proceed_button.click(timeout=30000)
-        except:
-            pass
-
-        # Continue with other actions
+"""
+Command-line batch runner: pushes rows from a CSV or JSONL file through the same
+engine as the Flask worker (validation, browser processes, retries, rate limit)
+without Google Sheets in the loop.
+
+Rows are streamed, never loaded as a whole; each result is appended to the output
+file (JSONL) as soon as the row finishes, so an interrupted run loses nothing and
+--resume skips every row that already has a final result there.
+
+Orders go through the same submitted-orders index as the worker (the job store
+in --state-db): a row whose email, package and company were already ordered, from
+this file, an earlier run or a sheet, is skipped, and a retry after Send may have
+gone through looks the subject up in FADV before sending again. If the subject
+is there the row ends as "Review" rather than risk a second order; --resume
+leaves it alone.
+
+    export FADV_CLIENT_ID=... FADV_USER_ID=... FADV_PASSWORD=... FADV_SEC_QUESTION=...
+    python FirstAdvAutomation.py applicants.csv --output results.jsonl --concurrency 2
+    python FirstAdvAutomation.py applicants.csv --output results.jsonl --resume
+    python FirstAdvAutomation.py pending.jsonl --flow pending-review --dry-run
+"""
+import argparse
+import csv
+import getpass
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time as t
+
+from browser_process import BrowserProcess, RowCancelled, row_error
+from browser_profile import BrowserProfile
+from job_store import BUSY, DEFAULT_DB_PATH, DUPLICATE, SUBMIT, VERIFY, JobStore, iter_row_keys, order_key
+from option_index import OptionIndex
+from pipeline_config import CONFIG_PATH, load_config, location_map, pipeline_settings
+from portal_session import PORTAL_URL
+from retry import PERMANENT, RetryPolicy, classify
+from row_validation import validate_applicant, validate_pending
+from session_state import STATE_DIR
+from worker_pool import WorkerPool, account_limiter, browser_slot
+
+FINAL_RESULTS = ("Completed", "Error", "Invalid", "Review")
+
+
+def read_rows(path):
+    """Yields row dicts from a CSV (header row) or JSONL (one object per line) file, one at a time."""
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield {k: "" if v is None else str(v) for k, v in json.loads(line).items()}
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                yield {k: (v or "").strip() for k, v in row.items() if k is not None}
+
+
+def finished_keys(output_path):
+    """Row keys that already have a final result in a previous run's output."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by a crash
+            if record.get("result") in FINAL_RESULTS:
+                done.add(record.get("key"))
+    return done
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class ResultWriter:
+    """Appends one JSON line per finished row and flushes it right away."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        if self._file.tell() and not _ends_with_newline(path):
+            self._file.write("\n")  # a crash cut the last line short; don't glue the next record onto it
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def write(self, record):
+        record["finished_at"] = t.strftime("%Y-%m-%dT%H:%M:%S")
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            self.counts[record["result"]] = self.counts.get(record["result"], 0) + 1
+
+    def close(self):
+        self._file.close()
+
+
+class BatchRunner:
+    def __init__(self, credentials, writer, job_store, source, is_pending_review=False, concurrency=2,
+                 orders_per_minute=6, portal_url=PORTAL_URL, headless=True, retry_policy=None, settings=None):
+        self.credentials = credentials
+        self.writer = writer
+        self.job_store = job_store  # submitted-orders index shared with the sheet worker
+        self.source = source  # identifies this input file as the owner of its orders
+        self.is_pending_review = is_pending_review
+        self.concurrency = concurrency
+        self.orders_per_minute = orders_per_minute
+        self.portal_url = portal_url
+        self.headless = headless
+        self.retry_policy = retry_policy or RetryPolicy(max_attempts=3)
+        self.location_map = location_map(settings or {})  # built-in map plus the settings file's
+        self.option_index = OptionIndex()
+        self.browser_profile = BrowserProfile()
+        self.cancel = threading.Event()
+        self._local = threading.local()
+
+    def validate(self, row):
+        if self.is_pending_review:
+            return validate_pending(row)
+        return validate_applicant(row, self.location_map, self.option_index)
+
+    def run(self, jobs):
+        pool = WorkerPool(self._handle, self.concurrency, on_worker_exit=self._close_browser,
+                          name="batch-worker", queue_size=self.concurrency * 2).start()
         try:
-            #page.wait_for_selector("iframe#new-login-iframe", timeout=30000)   
-            page.frame_locator("#new-login-iframe").locator("fadv-button#notice-agree-button").click()
-            
-        except Exception as e:
-            # Fallback to JavaScript click
-            page.evaluate("document.getElementById('agreeBtn').click()")
-
-        
-        time.sleep(30)
-        # Expand the "Profile Advantage" menu if it's closed
-        page.locator("div#EE_MENU_PROFILE_ADVANTAGE > table > tbody > tr:first-child a").click()
-
-        # Wait for "New Subject" to become visible, then click it
-        page.locator("div#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span", has_text="New Subject").wait_for(state="visible")
-
-        page.locator("div#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span", has_text="New Subject").click()
-        time.sleep(20)
-        
-        # Fill form fields
-        page.locator("input#CDC_NEW_SUBJECT_FIRST_NAME").fill(first_name)
-        page.locator("input#CDC_NEW_SUBJECT_LAST_NAME").fill(last_name)
-        page.locator("input#CDC_NEW_SUBJECT_EMAIL_ADDRESS").fill(email)
-
-        time.sleep(25)
-        # Select CSP ID from dropdown
-        page.locator("select#Order\\.Info\\.RefID3").select_option(str(csp_id))
-        time.sleep(3)
-
-
-        # Find the matching package value
-        package_options = page.locator("select#CDC_NEW_SUBJECT_PACKAGE_LABEL option").all_text_contents()
-        
-        # Extract the option value (e.g., "2426" for "A - NON CDL DRIVER PKG + PHYSICAL AND DRUG (MC)")
-        matching_value = None
-        for option in package_options:
-            if package_text in option:
-                matching_value = page.locator(f"select#CDC_NEW_SUBJECT_PACKAGE_LABEL option", has_text=option).get_attribute("value")
-                break
-
-        # Select the matching package option
-        if matching_value:
-            page.locator("select#CDC_NEW_SUBJECT_PACKAGE_LABEL").select_option(matching_value)
-        
-        time.sleep(3)
-
-        # --- Company ID Dropdown ---
-        page.locator("select#Company\\ ID").select_option(label=company_id)
-        # --- Facility ID Mapping ---
-        location_map = {
-            "wilson": "00256 - WILSON, NC",
-            "new hill": "00250 - NEW HILL, NC",
-            "greenville": "00278 - EAST CAROLINA, NC"
-        }
-        facility_option = location_map.get(location)
-        if facility_option:
-            page.locator("select#Facility\\ ID").select_option(label=facility_option)
-            time.sleep(3)
-
-        # --- Position Type ---
-        page.locator("select#Position\\ Type").select_option(label=position_type)
-        time.sleep(3)
-
-        page.get_by_text("Send", exact=True).click()
-        time.sleep(10)
-         # ✅ **Mark as Completed**
-        df.at[index, "Status"] = "Completed"
-        print(f"✔ Successfully completed: {full_name}")
-        
-        
-        browser.close()
-
-if __name__ == '__main__':
-    CLIENT_ID = "CLIENT-ID"
-    USER_ID = "USER-ID"
-    PASSWORD = "PASSWORD"
-    SEC_QUESTION = "SEC Question"
-    csv_url = "Google spreadsheet URL"
-    df = pd.read_csv(csv_url)
-    for index, row in df.iterrows():
-
-        full_name = row["Full Name"].strip()
-        
-        # Split name at the first space
-        split = full_name.split(" ", 1)
-        first_name = split[0]
-        last_name = split[1] if len(split) > 1 else ""
-
-        email = row["Email"]
-        company_id = row["Company ID"]  # e.g. "300 - ISP Pickup & Delivery"
-        location = row["Location"].strip().lower()  # e.g. "Wilson"
-        position_type = row["Position Type"]  # e.g. "A - P&D Non-CDL Driver"
-        csp_id = row["CSP ID"]
-        package_text = row["Package"]
-        
-        print(f'Processing index: {index+1}\nFirst Name: {first_name}\nLast Name: {last_name}\nEmail: {email}\nCompany ID: {company_id}\nLocation: {location}\nPosition Type: {position_type}\nCSP ID: {csp_id}\nPackage: {package_text}\n\n')
-        
-        main(index, row, CLIENT_ID, USER_ID, PASSWORD, SEC_QUESTION, first_name, last_name, email, company_id, location, position_type, csp_id, package_text)
+            pool.run_batch(jobs, is_running=lambda: not self.cancel.is_set())
+        finally:
+            pool.shutdown()
+
+    def _browser(self):
+        browser = getattr(self._local, "browser", None)
+        if browser is None:
+            client_id, user_id, password, sec_question = self.credentials
+            browser = BrowserProcess({
+                "client_id": client_id,
+                "user_id": user_id,
+                "password": password,
+                "sec_question": sec_question,
+                "headless": self.headless,
+                "portal_url": self.portal_url,
+                "timeouts": {},
+                "location_map": self.location_map,
+                "browser_profile": self.browser_profile,
+                "state_dir": STATE_DIR,
+                "slot": threading.current_thread().name,
+            })
+            self._local.browser = browser
+        return browser
+
+    def _close_browser(self):
+        browser = getattr(self._local, "browser", None)
+        if browser is not None:
+            if self.cancel.is_set():
+                browser.kill()
+            else:
+                browser.close()
+            self._local.browser = None
+
+    def _handle(self, job):
+        index, key, row = job
+        record = {"row": index + 2, "key": key, "name": row.get("Full Name", ""), "email": row.get("Email", "")}
+        reason = self.validate(row)
+        if reason:
+            self.writer.write(dict(record, result="Invalid", error=reason, attempts=0))
+            return
+
+        # Idempotency: the same order is never sent twice, from this file or anywhere else
+        order = None if self.is_pending_review else order_key(row)
+        decision = SUBMIT
+        if order is not None:
+            while True:
+                decision = self.job_store.claim_order(order, self.source, "CLI", key)
+                if decision != BUSY:
+                    break
+                if self.cancel.wait(5):  # a duplicate row is placing this order right now
+                    return
+            if decision == DUPLICATE:
+                self.writer.write(dict(record, result="Completed", error=None, attempts=0,
+                                       note="Already ordered (same email, package and company)"))
+                return
+
+        limiter = account_limiter(self.credentials[:2], self.orders_per_minute)
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            if not limiter.acquire(lambda: not self.cancel.is_set()):
+                self._release(order, decision)
+                return
+            try:
+                with browser_slot():
+                    result = self._browser().run_row(
+                        index, row, self.is_pending_review,
+                        options=self.option_index.export(row.get("CSP ID", "")), cancel=self.cancel,
+                        verify_existing=decision != SUBMIT,
+                    )
+            except RowCancelled:
+                return  # not recorded, so --resume picks it up (and looks the order up first)
+            except Exception as e:
+                error = e
+                decision = VERIFY  # the browser died mid-row: Send may have gone through
+            else:
+                if result["options"]:
+                    self.option_index.merge(row.get("CSP ID", ""), result["options"])
+                if result["success"]:
+                    if order is not None:
+                        self.job_store.confirm_order(order)
+                    self.writer.write(dict(record, result="Completed", error=None, attempts=attempt,
+                                           timing=result["timing"]))
+                    return
+                if result.get("review"):
+                    # The subject is already in FADV, maybe from the attempt that crashed: a person decides
+                    if order is not None:
+                        self.job_store.hold_order(order)
+                    self.writer.write(dict(record, result="Review", error=result["error"], attempts=attempt))
+                    return
+                error = row_error(result)
+                if result.get("sent"):
+                    decision = VERIFY
+
+            if not self.retry_policy.should_retry(error, attempt):
+                self._release(order, decision)
+                kind = "permanent" if classify(error) == PERMANENT else "gave up"
+                self.writer.write(dict(record, result="Error", error=str(error), error_kind=kind, attempts=attempt))
+                return
+            delay = self.retry_policy.backoff.delay(attempt)
+            print(f"[INFO] Row {index + 2} will be retried in {int(delay)}s: {error}")
+            if self.cancel.wait(delay):
+                return
+
+    def _release(self, order, decision):
+        """Forgets an order claim that never reached Send; one that may have stays for the lookup."""
+        if order is not None and decision == SUBMIT:
+            self.job_store.release_order(order)
+
+
+def credentials_from(args):
+    def pick(value, env, prompt, flag=None, secret=False):
+        value = value or os.environ.get(env, "")
+        if not value and sys.stdin.isatty():
+            value = getpass.getpass(f"{prompt}: ") if secret else input(f"{prompt}: ")
+        if not value:
+            # Secrets have no command-line flag (it would show up in ps and shell history)
+            source = f"{flag} or ${env}" if flag else f"${env}"
+            sys.exit(f"[ERROR] {prompt} is required ({source}).")
+        return value
+
+    return (
+        pick(args.client_id, "FADV_CLIENT_ID", "Client ID", flag="--client-id"),
+        pick(args.user_id, "FADV_USER_ID", "User ID", flag="--user-id"),
+        pick(None, "FADV_PASSWORD", "Password", secret=True),
+        pick(None, "FADV_SEC_QUESTION", "Security answer", secret=True),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run FADV orders for rows in a CSV or JSONL file.")
+    parser.add_argument("input", help="CSV with a header row, or JSONL (.jsonl/.ndjson)")
+    parser.add_argument("--output", default=None, help="JSONL results file (default: <input>.results.jsonl)")
+    parser.add_argument("--flow", choices=("applicants", "pending-review"), default="applicants")
+    parser.add_argument("--concurrency", type=int, default=2, help="browser processes working in parallel")
+    parser.add_argument("--orders-per-minute", type=int, default=6, help="per-account rate limit (0 = none)")
+    parser.add_argument("--resume", action="store_true", help="skip rows that already have a final result in --output")
+    parser.add_argument("--dry-run", action="store_true", help="validate rows and report; no browser, no orders")
+    parser.add_argument("--state-db", default=DEFAULT_DB_PATH,
+                        help="job store holding the submitted-orders index (shared with the worker)")
+    parser.add_argument("--config", default=CONFIG_PATH, help="settings file (location map) shared with the worker")
+    parser.add_argument("--pipeline", default="default", help="whose section of --config to use")
+    parser.add_argument("--client-id")
+    parser.add_argument("--user-id")
+    parser.add_argument("--portal-url", default=PORTAL_URL)
+    parser.add_argument("--headed", action="store_true", help="show the browsers")
+    args = parser.parse_args()
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    skip = finished_keys(output) if args.resume else set()
+    if skip:
+        print(f"[INFO] Resuming: {len(skip)} rows already finished in {output}.")
+    elif os.path.exists(output) and not args.dry_run:
+        print(f"[INFO] Appending to existing {output} (use --resume to skip rows already finished).")
+
+    def jobs():
+        # tee in lockstep buffers a single row, so the file is still streamed
+        rows, rows_for_keys = itertools.tee(read_rows(args.input))
+        for (index, row), key in zip(enumerate(rows), iter_row_keys(rows_for_keys)):
+            if key not in skip:
+                yield index, key, row
+
+    is_pending_review = args.flow == "pending-review"
+    job_store = JobStore(args.state_db)
+    source = f"file:{os.path.abspath(args.input)}"
+    settings = pipeline_settings(load_config(args.config), args.pipeline)
+    if args.dry_run:
+        runner = BatchRunner(None, None, job_store, source, is_pending_review=is_pending_review, settings=settings)
+        valid = invalid = duplicate = 0
+        seen = {}
+        for index, key, row in jobs():
+            reason = runner.validate(row)
+            order = None if is_pending_review else order_key(row)
+            if reason:
+                invalid += 1
+                print(f"Row {index + 2} ({row.get('Full Name', '')}): invalid – {reason}")
+            elif order is not None and (order in seen or job_store.order_submitted(order)):
+                duplicate += 1
+                where = f"row {seen[order] + 2}" if order in seen else "an earlier run"
+                print(f"Row {index + 2} ({row.get('Full Name', '')}): already ordered by {where}; would be skipped")
+            else:
+                valid += 1
+                if order is not None:
+                    seen[order] = index
+        print(f"\nDry run: {valid} rows would be submitted, {invalid} rejected, {duplicate} duplicate orders, "
+              f"{len(skip)} already done.")
+        return
+
+    writer = ResultWriter(output)
+    runner = BatchRunner(credentials_from(args), writer, job_store, source, is_pending_review=is_pending_review,
+                         concurrency=args.concurrency, orders_per_minute=args.orders_per_minute,
+                         portal_url=args.portal_url, headless=not args.headed, settings=settings)
+
+    def on_signal(signum, frame):
+        print("\n[INFO] Stopping: in-flight rows are abandoned and will be retried with --resume.")
+        runner.cancel.set()
+
+    signal.signal(signal.SIGINT, on_signal)
+    signal.signal(signal.SIGTERM, on_signal)
+    started = t.monotonic()
+    try:
+        runner.run(jobs())
+    finally:
+        writer.close()
+    elapsed = t.monotonic() - started
+    done = sum(writer.counts.values())
+    print(f"\nFinished {done} rows in {elapsed:.0f}s: "
+          + ", ".join(f"{n} {result}" for result, n in sorted(writer.counts.items())) + f". Results in {output}.")
+
+
+if __name__ == "__main__":
+    main()
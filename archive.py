@@ -0,0 +1,184 @@
+"""
+Compaction of the hot sheets.
+
+Applicants and Pending Review rows that have been Completed for longer than a
+cutoff are copied to an archive and deleted from the sheet, so every poll reads
+and rescans only rows that can still change. The archive is a monthly worksheet
+in the same spreadsheet ("Applicants Archive 2026-10", SheetArchive) or a local
+SQLite file (SQLiteArchive); rows go to the month they were completed in.
+
+The job store keeps a ledger of archived rows: a row whose deletion failed is
+not archived twice, and /status totals still include what left the sheet.
+"""
+import json
+import sqlite3
+import threading
+import time as t
+
+from metrics import metrics
+from sheet_poller import column_letter, row_runs
+from sheet_snapshot import COMPLETED, PROCESSING, status_code
+
+DEFAULT_ARCHIVE_DB_PATH = "fadv_archive.db"
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archived_rows (
+    sheet_url TEXT NOT NULL,
+    worksheet TEXT NOT NULL,
+    month TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    archived_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archived_rows_month ON archived_rows (sheet_url, worksheet, month);
+"""
+
+
+def archive_month(completed_at):
+    """'YYYY-MM' of a completion time (epoch seconds, local time)."""
+    return t.strftime("%Y-%m", t.localtime(completed_at))
+
+
+def _record(headers, values):
+    """{header: cell} for a raw sheet row; the first column of a repeated header wins."""
+    record = {}
+    for name, value in zip(headers, list(values) + [""] * (len(headers) - len(values))):
+        record.setdefault(name, value)
+    return record
+
+
+class SheetArchive:
+    """Appends archived rows to one '<worksheet> Archive YYYY-MM' worksheet per month."""
+
+    def __init__(self, sheets_client):
+        self.sheets_client = sheets_client
+
+    def write(self, sheet_url, worksheet, headers, rows):
+        """Archives [(completed_at, values)], values in `headers` order: one append_rows per month."""
+        by_month = {}
+        for completed_at, values in rows:
+            by_month.setdefault(archive_month(completed_at), []).append(_record(headers, values))
+        for month, records in sorted(by_month.items()):
+            archive = self.sheets_client.worksheet_or_create(sheet_url, f"{worksheet} Archive {month}", headers)
+            with metrics.sheets_call("row_values"):
+                archive_headers = archive.row_values(1)
+            added = [name for name in dict.fromkeys(headers) if name not in archive_headers]
+            if added:
+                # Columns added to the hot sheet since this month's archive was started
+                archive_headers = archive_headers + added
+                with metrics.sheets_call("add_cols"):
+                    archive.add_cols(len(added))
+                with metrics.sheets_call("batch_update"):
+                    archive.batch_update([{
+                        "range": f"A1:{column_letter(len(archive_headers))}1", "values": [archive_headers],
+                    }])
+            with metrics.sheets_call("append_rows"):
+                archive.append_rows([[record.get(name, "") for name in archive_headers] for record in records],
+                                    value_input_option="RAW")
+
+
+class SQLiteArchive:
+    """Archived rows in a local SQLite file, one JSON {header: cell} object per row."""
+
+    def __init__(self, path=DEFAULT_ARCHIVE_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(ARCHIVE_SCHEMA)
+
+    def write(self, sheet_url, worksheet, headers, rows):
+        """Archives [(completed_at, values)], values in `headers` order, in one transaction."""
+        now = t.time()
+        params = [
+            (sheet_url, worksheet, archive_month(completed_at), completed_at, now,
+             json.dumps(_record(headers, values)))
+            for completed_at, values in rows
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT INTO archived_rows VALUES (?, ?, ?, ?, ?, ?)", params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def compactable_rows(snapshot, keys, completed, max_rows):
+    """
+    Indices of rows that may be moved out: Completed on the sheet, Completed in the
+    job store before the cutoff (`completed` is {row_key: completed_at}), and below
+    the last Processing row, so deleting them never shifts a row being worked on.
+    """
+    busy = snapshot.rows_with({PROCESSING})
+    start = busy[-1] + 1 if busy else 0
+    rows = [i for i in snapshot.rows_with({COMPLETED}) if i >= start and keys[i] in completed]
+    return rows[:max_rows]
+
+
+def delete_rows(sheet, row_numbers):
+    """Deletes sheet rows in one batch_update; the bottom run goes first so the others keep their indices."""
+    requests = [
+        {"deleteDimension": {"range": {"sheetId": sheet.id, "dimension": "ROWS",
+                                       "startIndex": first - 1, "endIndex": last}}}
+        for first, last in reversed(row_runs(row_numbers))
+    ]
+    with metrics.sheets_call("batch_update"):
+        sheet.spreadsheet.batch_update({"requests": requests})
+
+
+def _fetch_rows(sheet, width, indices):
+    """{index: cells} for the given data rows, read in one batch_get."""
+    last = column_letter(width)
+    runs = row_runs(i + 2 for i in indices)
+    with metrics.sheets_call("batch_get"):
+        results = sheet.batch_get([f"A{first}:{last}{end}" for first, end in runs])
+    rows = {}
+    for (first, end), values in zip(runs, results):
+        for offset in range(end - first + 1):
+            cells = list(values[offset]) if offset < len(values) else []
+            rows[first - 2 + offset] = cells + [""] * (width - len(cells))
+    return rows
+
+
+def compact_worksheet(job_store, archive, sheet_url, worksheet, sheet, snapshot, keys, older_than, max_rows=5000):
+    """
+    Archives and deletes the compactable rows of one worksheet; returns how many
+    were removed. `snapshot` and `keys` are the worker's last synced copy. The rows
+    are re-read first and nothing is touched if any of them moved or changed since.
+    Must only run while nothing can write to the sheet by row number.
+    """
+    completed = job_store.completed_before(sheet_url, worksheet, older_than)
+    indices = compactable_rows(snapshot, keys, completed, max_rows)
+    if not indices:
+        return 0
+
+    headers = snapshot.headers
+    fetched = _fetch_rows(sheet, len(headers), indices)
+    checked = [snapshot.index[name] for name in ("Full Name", "Email") if name in snapshot.index]
+    status_col = snapshot.index["Status"]
+    for i in indices:
+        cells = fetched[i]
+        if status_code(cells[status_col]) != COMPLETED or any(
+                cells[col] != snapshot.columns[col][i] for col in checked):
+            raise RuntimeError(f"row {i + 2} changed since the last poll; compaction postponed")
+
+    # Placed orders leave the sheet's OrderStatus count; the ledger keeps them for /status
+    order_col = snapshot.index.get("OrderStatus")
+    entries = [
+        (keys[i], completed[keys[i]], order_col is not None and fetched[i][order_col].strip().lower() == "placed")
+        for i in indices
+    ]
+    done = job_store.archived_keys(sheet_url, worksheet)
+    new = [(entry[1], fetched[i]) for i, entry in zip(indices, entries) if entry[:2] not in done]
+    if new:
+        archive.write(sheet_url, worksheet, headers, new)
+    job_store.record_archived(sheet_url, worksheet, entries)
+    delete_rows(sheet, [i + 2 for i in indices])
+    metrics.inc("fadv_archived_rows_total", len(indices), worksheet=worksheet)
+    return len(indices)
@@ -1,13 +1,47 @@
-from playwright.sync_api import sync_playwright
 import time as t
 import threading
 import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import pytz
-from datetime import datetime, timedelta, time
+from archive import SheetArchive, compact_worksheet
+from events import broadcaster
+from eta import Ewma, effective_seconds_per_row, finish_time
+from job_store import BUSY, DUPLICATE, SUBMIT, JobStore, column_row_keys, order_key
+from browser_profile import BrowserProfile
+from browser_process import BrowserProcess, RowCancelled, row_error
+from metrics import metrics
+from option_index import OptionIndex
+from portal_session import PORTAL_URL
+from portal_worker import LOCATION_MAP
+from pipeline_config import location_map
+from false_positives import FalsePositiveIndex
+from retry import PERMANENT, CircuitBreaker, RetryPolicy, call_with_retries, classify
+from row_validation import invalid_status, validate_applicant, validate_pending
+from scheduler import DEFAULT_WINDOWS, RunScheduler
+from session_state import SessionStateStore
+from sheet_poller import IncrementalSheet
+from sheet_snapshot import NEEDS_WORK, PROCESSING
+from sheets_client import SheetsClient
+from sheet_writer import StatusWriteBuffer
+from worker_pool import WorkerPool, account_limiter, browser_slot
+
+# Columns hashed on every poll to detect changes cheaply (see sheet_poller.IncrementalSheet)
+FINGERPRINT_COLUMNS = {
+    "Applicants": ("Full Name", "Email", "Status"),
+    "Pending Review": ("Full Name", "Email", "Status"),
+    "False Positives": ("Name", "Email Address"),
+}
+
+DEFAULT_PIPELINE = "default"
+
+# Status of a row held for a person (sheet_snapshot.REVIEW): final until they change it
+REVIEW_PREFIX = "Review: "
+
+# Pool job that runs a share of the Pending Review rows from one portal search
+PENDING_BATCH = "pending_batch"
 
 class FirstAdvantageAutomation:
-    def __init__(self):
+    def __init__(self, job_store=None, sheets_client=None, portal_url=PORTAL_URL, headless=True,
+                 name=DEFAULT_PIPELINE, shared_pool=None):
+        self.name = name  # pipeline name (see pipelines.PipelineRegistry)
         self._lock = threading.Lock()  # prevent double-starts
         self.CLIENT_ID = ""
         self.USER_ID = ""
@@ -18,103 +52,164 @@ class FirstAdvantageAutomation:
         self.thread = None
         self.status = "Stopped"
         self.forced = False
-        # In-memory counters
-        self.applicants_total = 0
-        self.applicants_processed = 0
-        self.pending_total = 0
-        self.pending_processed = 0
-        self.orders_placed = 0
+        self._local = threading.local()  # per-thread BrowserProcess
+        self.portal_url = portal_url
+        self.headless = headless
+        self.sheets_client = sheets_client or SheetsClient()  # cached gspread client + worksheet handles
+        self._readers = {}  # worksheet name -> IncrementalSheet
+        self.scheduler = RunScheduler()  # business-hours windows + the single pending resume
+        self._wakeup = threading.Event()  # interrupts the idle wait (stop, new credentials)
+        self.poll_interval = 10  # seconds between polls while there is work
+        self.max_idle_interval = 60  # idle polls back off up to this
+        self._idle_polls = 0
+        self.status_writer = StatusWriteBuffer()  # batches Processing/Completed/Error writes
+        self.job_store = job_store or JobStore()  # local row state, leases and counters (survives restarts)
+        self._row_keys = {}  # worksheet name -> row keys of the last synced snapshot
+        # Rolling per-row durations per flow, for the ETA in get_status
+        self.throughput = {"Applicants": Ewma(), "Pending Review": Ewma()}
+        self.concurrency = 2  # browser workers (capped by worker_pool.MAX_CONCURRENCY)
+        self.orders_per_minute = 6  # per-account rate limit shared by all workers
+        self.pool = None
+        self.shared_pool = shared_pool  # worker_pool.SharedWorkerPool when pipelines share browsers
+        if shared_pool is not None:
+            self.concurrency = shared_pool.size
+        self.step_timeouts = {}  # overrides for portal_session.DEFAULT_TIMEOUTS (ms)
+        self.browser_profile = BrowserProfile()  # resource blocking, lean launch flags, per-worker HTTP cache
+        self.session_state = SessionStateStore()  # encrypted saved login per account
+        self.location_map = dict(LOCATION_MAP)
+        self.option_index = OptionIndex()  # dropdown label -> value, per CSP ID, shared by workers
+        self.retry_policy = RetryPolicy(max_attempts=3)  # transient row failures are retried with backoff
+        self.breaker = CircuitBreaker(threshold=5)  # pauses the worker while FADV keeps failing
+        self._paused = False
+        self._cancel = threading.Event()  # set by stop(): in-flight rows abandon their browser process
+        self.row_deadline = 300  # seconds before a row's browser process is considered hung and killed
+        self.recycle_after_rows = 50  # fresh browser process after this many rows
+        self.browser_rss_limit_mb = 1500  # ...or once its process group uses more than this
+        self.last_timing = {}  # per-step seconds of the most recent row
+        self.pending_batch_min = 3  # from this many Pending Review rows, search once per worker (0 = never)
+        self.archive_after_days = 30  # Completed rows older than this leave the hot sheets (0 = never)
+        self.compact_interval = 6 * 3600  # seconds between compaction passes
+        self.compact_max_rows = 5000  # rows moved per worksheet and pass
+        self.archive = SheetArchive(self.sheets_client)  # monthly archive worksheets; or archive.SQLiteArchive()
+        self._next_compaction = 0.0
 
     def set_status(self, status_text):
         self.status = status_text
+        broadcaster.touch()
 
     def load_sheets(self):
         """
         This method just returns the 'Applicants', 'Pending Review', and 'False Positive' worksheets,
-        with a small retry in case of transient errors.
+        retrying transient errors with backoff. Handles come from the cached
+        SheetsClient, so a normal poll makes no API calls here.
         """
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
-                creds = ServiceAccountCredentials.from_json_keyfile_name("service-account.json", scope)
-                client = gspread.authorize(creds)
-                spreadsheet = client.open_by_url(self.sheet_url)
-                return {
-                    "Applicants": spreadsheet.worksheet("Applicants"),
-                    "Pending Review": spreadsheet.worksheet("Pending Review"),
-                    "False Positives": spreadsheet.worksheet("False Positives") # Add this line
-                }
-            except Exception as e:
-                print(f"Sheet load error (attempt {attempt+1}): {str(e)}")
-                t.sleep(2 * (attempt + 1))  # Exponential backoff
-        raise Exception("Failed to load sheets after retries.")
-    
-    def _click_pending_result_row(self, page, email, name=None, timeout=20000):
-        """
-        After 'Search', waits for results and clicks the subject row.
-        Prefers locating by the email icon's title attribute (stable).
-        Fallbacks to name text, then first row.
-        """
-        # Wait for the results table to appear
-        results = page.locator("table.GOIVD5ICHFF")
-        results.wait_for(state="visible", timeout=timeout)
-
-        # Wait until at least one data row exists (GWT renders asynchronously)
-        page.wait_for_function(
-            "document.querySelectorAll('table.GOIVD5ICHFF tr.standard').length > 0",
-            timeout=timeout,
+        def on_error(e, attempt):
+            print(f"Sheet load error (attempt {attempt}): {str(e)}")
+            # Never retry with half-opened or stale handles
+            self.sheets_client.invalidate(self.sheet_url, reauthorize=attempt > 1)
+
+        return call_with_retries(
+            lambda: self.sheets_client.worksheets(self.sheet_url, ["Applicants", "Pending Review", "False Positives"]),
+            attempts=3, on_error=on_error,
         )
 
-        # 1) Preferred: locate the email icon by title (unique & stable)
-        email_icon = results.locator(f"img.gwt-Image.pointer[title='{email}']").first
-        if email_icon.count() > 0:
-            row = email_icon.locator("xpath=ancestor::tr[1]")
-            # Click the name cell inside this row (the clickable one has 'pointer')
-            name_cell = row.locator("css=div.pointer").first
-            name_cell.click()
-            return True
-
-        # 2) Fallback: locate by the subject (name) text if provided
-        if name:
-            try:
-                results.locator(f"css=div.pointer:has-text('{name}')").first.click()
-                return True
-            except Exception:
-                pass
-
-        # 3) Fallback: click the first data row's clickable cell
-        try:
-            first_row_clickable = results.locator("tr.standard >> css=div.pointer").first
-            first_row_clickable.click()
-            return True
-        except Exception:
-            return False
-
-
     def get_status(self):
         """
-        Returns the last known counters (in memory) without re-loading the sheet.
-        This keeps /status calls fast and stable.
+        Returns the counters from the local job store without re-loading the sheet.
+        This keeps /status calls fast and stable, and they survive restarts.
         """
+        counts = self.job_store.counts(self.sheet_url)
+        applicants = counts.get("Applicants", {})
+        pending = counts.get("Pending Review", {})
+        # Rows compacted out of the sheets were Completed: they still count as done
+        archived = self.job_store.archived_counts(self.sheet_url)
+        applicants_archived = archived.get("Applicants", {}).get("rows", 0)
+        pending_archived = archived.get("Pending Review", {}).get("rows", 0)
+        orders_placed = (self.job_store.get_meta(self.sheet_url, "orders_placed")
+                         + archived.get("Pending Review", {}).get("orders_placed", 0))
+        eta = self.estimate_eta(
+            applicants.get("total", 0) - applicants.get("completed", 0) - applicants.get("invalid", 0),
+            pending.get("total", 0) - pending.get("completed", 0) - pending.get("invalid", 0),
+        )
         return {
-            "applicants_total": self.applicants_total,
-            "applicants_processed": self.applicants_processed,
-            "pending_total": self.pending_total,
-            "pending_processed": self.pending_processed,
-            "orders_placed": self.orders_placed,
+            "pipeline": self.name,
+            "applicants_total": applicants.get("total", 0) + applicants_archived,
+            "applicants_processed": applicants.get("completed", 0) + applicants_archived,
+            "pending_total": pending.get("total", 0) + pending_archived,
+            "pending_processed": pending.get("completed", 0) + pending_archived,
+            "applicants_archived": applicants_archived,
+            "pending_archived": pending_archived,
+            "applicants_invalid": applicants.get("invalid", 0),
+            "pending_invalid": pending.get("invalid", 0),
+            "orders_placed": orders_placed,
             "client_id": self.CLIENT_ID,
             "user_id": self.USER_ID,
             "sheet_url": self.sheet_url,
-            "status": self.status
+            "status": self.status,
+            "last_row_timing": self.last_timing,
+            "next_run": self._next_run_iso(),
+            **eta
         }
 
+    def estimate_eta(self, applicants_remaining, pending_remaining):
+        """
+        Seconds until the remaining Applicants and Pending Review rows are done, from
+        the measured per-row durations, current concurrency and the run windows.
+        Pending Review only runs once Applicants is empty, so its ETA comes after.
+        """
+        now = self.scheduler.now()
+        out = {}
+        work = 0.0
+        for name, key, remaining in (("Applicants", "applicants", applicants_remaining),
+                                     ("Pending Review", "pending", pending_remaining)):
+            seconds_per_row = effective_seconds_per_row(self.throughput[name], self.concurrency, self.orders_per_minute)
+            work += max(remaining, 0) * seconds_per_row
+            finish = finish_time(self.scheduler, now, work, forced=self.forced)
+            out[f"eta_{key}_seconds"] = (finish - now).total_seconds() if finish else None
+            out[f"eta_{key}_finish"] = finish.isoformat() if finish else None
+            out[f"eta_{key}_rolls_over"] = bool(finish and finish.date() != now.date())
+            out[f"seconds_per_row_{key}"] = round(seconds_per_row, 1)
+        return out
+
+    def _next_run_iso(self):
+        next_run = self.scheduler.next_scheduled_run()
+        return next_run.isoformat() if next_run else None
+
     def update_credentials(self, client_id, user_id, password, sec_question, sheet_url):
+        if sheet_url != self.sheet_url:
+            self.sheets_client.invalidate(self.sheet_url)
+        if (client_id, user_id) != (self.CLIENT_ID, self.USER_ID) and self.USER_ID:
+            self.session_state.discard(self.CLIENT_ID, self.USER_ID)  # the old account's saved login
         self.CLIENT_ID = client_id
         self.USER_ID = user_id
         self.PASSWORD = password
         self.SEC_QUESTION = sec_question
         self.sheet_url = sheet_url
+        self._wakeup.set()  # let an idle worker pick up the new sheet right away
+
+    def apply_settings(self, settings):
+        """Applies this pipeline's section of the settings file (see pipeline_config)."""
+        self.location_map = location_map(settings)
+        schedule = settings.get("schedule")
+        if schedule:
+            try:
+                self.scheduler.configure(schedule.get("windows") or DEFAULT_WINDOWS, schedule.get("holidays") or [])
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"Pipeline {self.name}: bad schedule in the settings file ({e!r})")
+            print(f"[INFO] Pipeline {self.name}: {len(self.scheduler.windows)} run windows, "
+                  f"{len(self.scheduler.holidays)} holidays.")
+
+    def start(self):
+        """
+        Start button: run now if inside a run window, otherwise stop and schedule a
+        single resume at the next window start.
+        """
+        if self.scheduler.is_open():
+            self.run()
+        else:
+            self.stop()  # Ensure any existing process stops
+            self.scheduler.schedule_resume(self.run)
+            self.set_status(self.scheduler.describe_next_open())
 
     def run(self, force=False):
         # NEW: reentrancy guard so we can't start two workers
@@ -124,32 +219,20 @@ class FirstAdvantageAutomation:
                 return
             self.running = True
 
-        self.status = "Running" if not force else "Running (Forced)"
+        # We're running now, so any pending resume is obsolete
+        self.scheduler.cancel_resume()
+        self._wakeup.clear()
+        self._cancel.clear()
+
         self.forced = force
+        self.set_status("Running" if not force else "Running (Forced)")
 
-        # On start, do an initial load to set counters (best-effort)
+        # Counters come from the job store, so there is no sheet rescan on start.
+        # Nothing is in flight yet: any open lease belongs to a crashed run and is reclaimable.
         try:
-            sheets = self.load_sheets()
-            # Applicants
-            applicants_data = sheets["Applicants"].get_all_records()
-            self.applicants_total = len(applicants_data)
-            self.applicants_processed = sum(
-                1 for row in applicants_data
-                if str(row.get("Status", "")).strip().lower() == "completed"
-            )
-            # Pending
-            pending_data = sheets["Pending Review"].get_all_records()
-            self.pending_total = len(pending_data)
-            self.pending_processed = sum(
-                1 for row in pending_data
-                if str(row.get("Status", "")).strip().lower() == "completed"
-            )
-            self.orders_placed = sum(
-                1 for row in pending_data
-                if str(row.get("OrderStatus", "")).strip().lower() == "placed"
-            )
+            self.job_store.expire_leases(self.sheet_url)
         except Exception as e:
-            print("Error loading initial sheet counts:", e)
+            print("Error expiring stale leases:", e)
 
         # Start processing in a background thread
         self.thread = threading.Thread(target=self.process, daemon=True)
@@ -158,35 +241,49 @@ class FirstAdvantageAutomation:
 
     def stop(self):
         self.running = False
-        self.status = "Stopped"
         self.forced = False  # Add this line
+        self.set_status("Stopped")
+        self.scheduler.cancel_resume()
+        self._wakeup.set()
+        self._cancel.set()  # kill in-flight browser processes instead of waiting for their rows
         if self.thread:
             self.thread.join()
         self.thread = None
     def process(self):
+        # Each pool worker owns its browser process and closes it when the pool shuts down
+        self.status_writer.start()
+        if self.shared_pool is not None:
+            self.pool = self.shared_pool.tenant(self.name, self._handle_job, on_worker_exit=self.close_browser)
+        else:
+            self.pool = WorkerPool(self._handle_job, self.concurrency, on_worker_exit=self.close_browser).start()
+        try:
+            self._process_loop()
+        finally:
+            self.pool.shutdown()
+            self.pool = None
+            # Durable flush: whatever workers wrote must reach the sheet before we exit
+            try:
+                self.status_writer.close()
+            except Exception as e:
+                print(f"[ERROR] Final status flush failed ({self.status_writer.pending_count()} cells): {e}")
+
+    def _process_loop(self):
         while self.running:
             try:
                 forced_mode = self.forced
 
                 # Time window logic
-                est = pytz.timezone('US/Eastern')
-                current_time = datetime.now(est)
-                within_hours = 8 <= current_time.hour < 20
+                current_time = self.scheduler.now()
+                within_hours = self.scheduler.is_open(current_time)
 
                 print(f"[DEBUG] current_time={current_time}, forced_mode={forced_mode}, "
                     f"within_hours={within_hours}, running={self.running}")
 
-                # Outside hours and NOT forced → schedule resume at 8am and stop this worker
+                # Outside hours and NOT forced → schedule resume at the next window and stop this worker
                 if (not forced_mode) and (not within_hours):
-                    self.set_status("Sleeping until 8am EST")
-                    next_run = est.localize(datetime.combine(
-                        current_time.date() + timedelta(days=1 if current_time.hour >= 20 else 0),
-                        time(8, 0)
-                    ))
-                    wait_seconds = (next_run - current_time).total_seconds()
-                    print(f"[DEBUG] Scheduling next run in {wait_seconds} seconds")
-                    threading.Timer(wait_seconds, self.run).start()
+                    self.set_status(self.scheduler.describe_next_open(current_time))
                     self.running = False
+                    self.scheduler.schedule_resume(self.run, current_time)
                     break
 
                 # If we were forced but we’re now within hours, revert to normal
@@ -195,6 +292,21 @@ class FirstAdvantageAutomation:
                     self.forced = False
                     forced_mode = False
 
+                # Statuses from the previous batch must be on the sheet before we re-read it
+                self.status_writer.flush()
+
+                # FADV keeps failing: hold every row until the breaker lets a trial through
+                if self.breaker.is_open():
+                    wait = self.breaker.retry_in()
+                    self._paused = True
+                    self.set_status(f"Paused: FADV unavailable, retrying in {int(wait)}s")
+                    if self._wakeup.wait(max(wait, 1)):
+                        self._wakeup.clear()
+                    continue
+                if self._paused:
+                    self._paused = False
+                    self.set_status("Running (Forced)" if self.forced else "Running")
+
                 # ---- Sheet handles and column indices (do this FIRST every loop) ----
                 sheets = self.load_sheets()
 
@@ -202,336 +314,613 @@ class FirstAdvantageAutomation:
                 pending_sheet = sheets["Pending Review"]
                 false_positive_sheet = sheets["False Positives"]
 
-                applicants_headers = applicants_sheet.row_values(1)
-                pending_headers = pending_sheet.row_values(1)
+                # Nothing is in flight and every status is flushed: rows may move now
+                self._maybe_compact(sheets)
 
-                try:
-                    status_col_app = applicants_headers.index("Status") + 1
-                except ValueError:
-                    raise Exception("'Status' column not found in Applicants")
+                # One narrow fingerprint read per sheet; full rows only when something changed
+                applicants_reader = self._reader("Applicants", applicants_sheet, needs_work=True)
+                fp_reader = self._reader("False Positives", false_positive_sheet)
+                applicants_changed = applicants_reader.refresh()
+                fp_changed = fp_reader.refresh()
 
                 try:
-                    status_col_pending = pending_headers.index("Status") + 1
+                    status_col_app = applicants_reader.headers.index("Status") + 1
                 except ValueError:
-                    raise Exception("'Status' column not found in Pending Review")
+                    raise Exception("'Status' column not found in Applicants")
 
-                # ---- False Positives pass (same logic, now uses known status_col_app) ----
-                fp_updates = []
+                # ---- False Positives pass (only when either side changed) ----
                 try:
-                    fp_data = false_positive_sheet.get_all_records()
-                    if fp_data:
-                        applicants_data_for_fp = applicants_sheet.get_all_records()
-                        for i, app_row in enumerate(applicants_data_for_fp):
-                            # build a quick lookup of name/email for this app_row
-                            app_name = str(app_row.get("Full Name", "")).strip().lower()
-                            app_email = str(app_row.get("Email", "")).strip().lower()
-
-                            for fp_row in fp_data:
-                                name_to_match = str(fp_row.get("Name", "")).strip().lower()
-                                email_to_match = str(fp_row.get("Email Address", "")).strip().lower()
-
-                                if app_name == name_to_match and app_email == email_to_match:
-                                    # Only reset if currently Completed
-                                    if str(app_row.get("Status", "")).strip().lower() == "completed":
-                                        fp_updates.append({
-                                            'range': gspread.utils.rowcol_to_a1(i + 2, status_col_app),
-                                            'values': [['']]
-                                        })
-                                        print(f"[INFO] Prepared to reset status for {app_name}.")
-                                    break
-                    if fp_updates:
-                        applicants_sheet.batch_update(fp_updates)
-                        print(f"[INFO] Batch update for {len(fp_updates)} false positives completed.")
+                    applicants = applicants_reader.snapshot
+                    if len(fp_reader.snapshot) and (applicants_changed or fp_changed):
+                        fp_updates, reset_rows = self.check_false_positives(
+                            applicants, fp_reader.snapshot, status_col_app
+                        )
+                        if fp_updates:
+                            with metrics.sheets_call("batch_update"):
+                                applicants_sheet.batch_update(fp_updates)
+                            keys = column_row_keys(applicants.column("Email"), applicants.column("Full Name"))
+                            for i in reset_rows:
+                                key = order_key(applicants.record(i))
+                                if key is not None:
+                                    self.job_store.allow_redo(key, self.sheet_url, "Applicants", keys[i])
+                                applicants_reader.patch(i, "Status", "")
+                            print(f"[INFO] Batch update for {len(fp_updates)} false positives completed.")
                 except Exception as e:
                     print(f"[WARN] False positives phase skipped due to error: {e}")
 
                 # ---- Applicants phase (two-step status: Processing → Completed/Error) ----
-                applicants_data = applicants_sheet.get_all_records()
-                self.applicants_total = len(applicants_data)
-                self.applicants_processed = sum(
-                    1 for row in applicants_data
-                    if str(row.get("Status", "")).strip().lower() == "completed"
+                to_process_applicants = self._select_work(
+                    "Applicants", applicants_reader.snapshot, applicants_changed
+                )
+                to_process_applicants = self._reject_invalid(
+                    "Applicants", applicants_sheet, applicants_reader, status_col_app, to_process_applicants
                 )
-
-                to_process_applicants = [
-                    (i, row) for i, row in enumerate(applicants_data)
-                    if str(row.get("Status", "")).strip().lower() not in ("completed", "processing")
-                ]
 
                 did_any = False
+                did_work = False
                 if to_process_applicants:
                     did_any = True
-                    for i, row in to_process_applicants:
-                        if not self.running:
-                            break
-                        row_index = i + 2  # account for header
-
-                        # Phase 1: immediately mark as Processing to avoid duplicate work on crashes
-                        try:
-                            applicants_sheet.update_cell(row_index, status_col_app, "Processing")
-                        except Exception as e:
-                            print(f"[WARN] Applicants row {i} could not be marked Processing: {e}")
-
-                        success = False
-                        try:
-                            success = self.process_row(i, row, is_pending_review=False)
-                        except Exception as e:
-                            print(f"[ERROR] Applicants row {i} crashed: {e}")
-
-                        # Phase 2: finalize
-                        try:
-                            if success:
-                                applicants_sheet.update_cell(row_index, status_col_app, "Completed")
-                                self.applicants_processed += 1
-                            else:
-                                applicants_sheet.update_cell(row_index, status_col_app, "Error")
-                        except Exception as e:
-                            print(f"[WARN] Applicants row {i} final status write failed: {e}")
-
-                        t.sleep(2)  # small pacing
+                    did_work = True
+                    self.pool.run_batch(
+                        ((applicants_sheet, status_col_app, i, key, row, False) for i, key, row in to_process_applicants),
+                        is_running=self._feeding,
+                    )
 
                 # ---- Pending Review phase (only if nothing pending in Applicants) ----
                 if not did_any:
-                    pending_data = pending_sheet.get_all_records()
-
-                    self.pending_total = len(pending_data)
-                    self.pending_processed = sum(
-                        1 for row in pending_data
-                        if str(row.get("Status", "")).strip().lower() == "completed"
+                    pending_reader = self._reader("Pending Review", pending_sheet, needs_work=True)
+                    pending_changed = pending_reader.refresh()
+                    try:
+                        status_col_pending = pending_reader.headers.index("Status") + 1
+                    except ValueError:
+                        raise Exception("'Status' column not found in Pending Review")
+                    pending = pending_reader.snapshot
+                    to_process_pending = self._select_work("Pending Review", pending, pending_changed)
+                    to_process_pending = self._reject_invalid(
+                        "Pending Review", pending_sheet, pending_reader, status_col_pending, to_process_pending
                     )
-
-                    to_process_pending = [
-                        (i, row) for i, row in enumerate(pending_data)
-                        if str(row.get("Status", "")).strip().lower() not in ("completed", "processing")
-                    ]
-
-                    for i, row in to_process_pending:
-                        if not self.running:
-                            break
-                        row_index = i + 2
-
-                        # Phase 1
-                        try:
-                            pending_sheet.update_cell(row_index, status_col_pending, "Processing")
-                        except Exception as e:
-                            print(f"[WARN] Pending row {i} could not be marked Processing: {e}")
-
-                        success = False
-                        try:
-                            success = self.process_row(i, row, is_pending_review=True)
-                        except Exception as e:
-                            print(f"[ERROR] Pending row {i} crashed: {e}")
-
-                        # Phase 2
-                        try:
-                            if success:
-                                pending_sheet.update_cell(row_index, status_col_pending, "Completed")
-                                self.pending_processed += 1
-                            else:
-                                pending_sheet.update_cell(row_index, status_col_pending, "Error")
-                        except Exception as e:
-                            print(f"[WARN] Pending row {i} final status write failed: {e}")
-
-                        t.sleep(2)
+                    if pending_changed:
+                        self.job_store.set_meta(self.sheet_url, "orders_placed",
+                                                pending.count_value("OrderStatus", "placed"))
+
+                    did_work = bool(to_process_pending)
+                    if self.pending_batch_min and len(to_process_pending) >= self.pending_batch_min:
+                        # One search per worker instead of one per row; each worker orders its share
+                        workers = min(self.concurrency, len(to_process_pending))
+                        self.pool.run_batch(
+                            ((PENDING_BATCH, pending_sheet, status_col_pending, to_process_pending[n::workers])
+                             for n in range(workers)),
+                            is_running=self._feeding,
+                        )
+                    else:
+                        self.pool.run_batch(
+                            ((pending_sheet, status_col_pending, i, key, row, True) for i, key, row in to_process_pending),
+                            is_running=self._feeding,
+                        )
 
             except Exception as e:
+                did_work = False
                 print(f"[ERROR] process loop: {e}")
+                if self.sheets_client.handle_error(e, self.sheet_url):
+                    print("[INFO] Sheet handles invalidated; they will be reopened next loop.")
 
             # Loop pacing
-            t.sleep(10)
+            self._wait_for_next_poll(did_work)
 
-    def check_false_positives(self, sheets):
+    def _wait_for_next_poll(self, did_work):
         """
-        Checks the 'False Positives' sheet and returns a list of updates
-        for the 'Applicants' sheet.
+        Sleeps until the next poll is due, instead of a fixed 10s: idle polls back off
+        exponentially up to max_idle_interval, the wait never runs past the end of the
+        current run window, and stop()/update_credentials() wake it immediately.
         """
-        print("[INFO] Checking for false positives...")
-        updates = []
+        if did_work:
+            self._idle_polls = 0
+            delay = self.poll_interval
+        else:
+            self._idle_polls += 1
+            delay = min(self.poll_interval * 2 ** (self._idle_polls - 1), self.max_idle_interval)
+        if not self.forced:
+            window_end = self.scheduler.current_window_end()
+            if window_end is not None:
+                delay = min(delay, max((window_end - self.scheduler.now()).total_seconds(), 0))
+        if self._wakeup.wait(delay):
+            self._wakeup.clear()
+            self._idle_polls = 0
+
+    def _maybe_compact(self, sheets):
+        """
+        Every compact_interval, moves rows Completed more than archive_after_days ago
+        out of Applicants and Pending Review (see archive.compact_worksheet). Only
+        called between batches, so no queued status write points at a row that
+        moves. A worksheet whose snapshot isn't synced yet waits for the next pass.
+        """
+        if not self.archive_after_days or t.monotonic() < self._next_compaction:
+            return
+        self._next_compaction = t.monotonic() + self.compact_interval
+        older_than = t.time() - self.archive_after_days * 86400
+        for name in ("Applicants", "Pending Review"):
+            reader = self._readers.get(name)
+            keys = self._row_keys.get(name)
+            if reader is None or reader.worksheet is not sheets[name] or keys is None \
+                    or len(keys) != len(reader.snapshot):
+                continue
+            try:
+                moved = compact_worksheet(self.job_store, self.archive, self.sheet_url, name, sheets[name],
+                                          reader.snapshot, keys, older_than, max_rows=self.compact_max_rows)
+            except Exception as e:
+                print(f"[WARN] Compaction of {name} skipped: {e}")
+                moved = None  # the sheet may have changed under us either way
+            if moved == 0:
+                continue
+            if moved:
+                print(f"[INFO] Archived {moved} completed rows from {name}.")
+            # Row numbers moved: start over from a full read of the (now smaller) sheet
+            self._readers.pop(name, None)
+            self._row_keys.pop(name, None)
+
+    def _reader(self, name, worksheet, needs_work=False):
+        """
+        Returns the IncrementalSheet for a worksheet, starting a fresh one whenever
+        the cached handle was replaced (new sheet URL or invalidated client).
+        """
+        reader = self._readers.get(name)
+        if reader is None or reader.worksheet is not worksheet:
+            columns = FINGERPRINT_COLUMNS[name]
+            reader = IncrementalSheet(worksheet, columns, actionable=NEEDS_WORK if needs_work else None)
+            self._readers[name] = reader
+        return reader
+
+    def _handle_job(self, job):
+        """
+        Runs one sheet row on the calling pool worker: rate limit, mark Processing,
+        drive the portal, then write Completed/Error. Pending Review batches
+        (PENDING_BATCH jobs) go to _handle_pending_batch.
+        """
+        if job[0] == PENDING_BATCH:
+            return self._handle_pending_batch(*job[1:])
+        sheet, status_col, i, row_key, row, is_pending_review = job
+        if not self.running:
+            return
+        label = "Pending" if is_pending_review else "Applicants"
+        worksheet = "Pending Review" if is_pending_review else "Applicants"
+        row_index = i + 2  # account for header
+
+        # Idempotency: an order already submitted (from any row or sheet) is never sent twice
+        order = None if is_pending_review else order_key(row)
+        decision = SUBMIT
+        if order is not None:
+            decision = self.job_store.claim_order(order, self.sheet_url, worksheet, row_key)
+            if decision == DUPLICATE:
+                self._skip_duplicate(sheet, status_col, i, row_key, row)
+                return
+            if decision == BUSY:
+                # A duplicate row is placing this order right now; look again once it is done
+                self.job_store.finish(self.sheet_url, worksheet, row_key, False, "Same order in flight on another row",
+                                      retry_at=t.time() + 60)
+                return
+
+        # Held rows stay pending; in the half-open state exactly one row probes FADV. The breaker
+        # goes first, so while it is open queued rows return at once instead of each waiting
+        # out a rate-limit slot first
+        if not self._acquire_turn():
+            if decision == SUBMIT and order is not None:
+                self.job_store.release_order(order)  # never reached the portal
+            return
+
+        # Phase 1: take a lease locally and mark as Processing (flushed within a few seconds)
+        attempt = self.job_store.claim(self.sheet_url, worksheet, row_key, row_index)
+        self.status_writer.set(sheet, row_index, status_col, "Processing")
+
+        success = False
+        self._local.last_error = None
+        self._local.last_exception = None
+        self._local.last_result = None
         try:
-            false_positive_sheet = sheets["False Positives"]
-            if not false_positive_sheet:
-                print("[WARNING] 'False Positives' sheet not found. Skipping check.")
-                return updates
-
-            false_positive_data = false_positive_sheet.get_all_records()
-            if not false_positive_data:
-                print("[INFO] 'False Positives' sheet is empty.")
-                return updates
-
-            applicants_sheet = sheets["Applicants"]
-            applicants_data = applicants_sheet.get_all_records() 
-            applicants_headers = applicants_sheet.row_values(1)
-            status_col_app = applicants_headers.index("Status") + 1
-
-            reset_count = 0
-            for fp_row in false_positive_data:
-                name_to_match = fp_row.get("Name", "").strip().lower()
-                email_to_match = fp_row.get("Email Address", "").strip().lower()
-
-                for i, app_row in enumerate(applicants_data):
-                    if (
-                        app_row.get("Full Name", "").strip().lower() == name_to_match
-                        and app_row.get("Email", "").strip().lower() == email_to_match
-                    ):
-                        # The value of row_index needs to be adjusted for the API call
-                        row_index = i + 2 
-                        current_status = applicants_sheet.cell(row_index, status_col_app).value
-                        if str(current_status).strip().lower() == "completed":
-                            # Add the update to a list instead of applying it immediately
-                            updates.append({'range': gspread.utils.rowcol_to_a1(row_index, status_col_app), 'values': [['']]})
-                            reset_count += 1
-                            print(f"[INFO] Prepared to reset status for {name_to_match}.")
-                            break
-
-            print(f"[INFO] Completed false positive check. Found {reset_count} row(s) to reset.")
-            return updates
+            with browser_slot():
+                started = t.monotonic()
+                success = self.process_row(i, row, is_pending_review=is_pending_review,
+                                           verify_existing=decision != SUBMIT)
+                self.throughput[worksheet].update(t.monotonic() - started)
+        except RowCancelled:
+            # Stopped mid-row: hand the row back untouched rather than calling it failed
+            self.breaker.release_trial()
+            self.status_writer.set(sheet, row_index, status_col, "")
+            self.job_store.finish(self.sheet_url, worksheet, row_key, False, "cancelled", retry_at=t.time())
+            print(f"[INFO] {label} row {row_index} cancelled; it will be picked up on the next run.")
+            return
         except Exception as e:
-            print(f"[ERROR] Failed to check false positives: {e}")
-            return updates
-
-    def check_checkbox_by_caption(self, page, caption_text: str, timeout: int = 10000):
+            self._local.last_error = str(e)
+            self._local.last_exception = e
+            print(f"[ERROR] {label} row {i} crashed: {e}")
+
+        result = self._local.last_result
+        if order is not None:
+            if success:
+                self.job_store.confirm_order(order)
+            elif result is not None and result.get("review"):
+                self.job_store.hold_order(order)
+            elif decision == SUBMIT and result is not None and not result.get("sent"):
+                self.job_store.release_order(order)
+            # Otherwise Send may have gone through: the next attempt looks the subject up first
+
+        if result is not None and result.get("review"):
+            self._hold_for_review(sheet, status_col, i, row_key, row, result["error"])
+            return
+
+        # Phase 2: finalize (Completed, Error, or back to pending after a backoff)
+        self._finish_row(sheet, status_col, worksheet, i, row_key, row, attempt, success, self._local.last_exception)
+
+    def _acquire_turn(self):
+        """
+        Lets one row (or pending batch) at the portal: first the circuit breaker, then
+        the account's rate limiter. Gives up while waiting for a slot if the worker
+        stops or the breaker opens meanwhile. Returns False if the caller must not go on.
+        """
+        if not self.breaker.allow():
+            return False
+        trial = self.breaker.is_open()  # is_open() is also true while this half-open trial runs
+        limiter = account_limiter((self.CLIENT_ID, self.USER_ID), self.orders_per_minute)
+        if limiter.acquire(lambda: self.running and (trial or not self.breaker.is_open())):
+            return True
+        if trial:
+            self.breaker.release_trial()
+        return False
+
+    def _feeding(self):
+        """run_batch keeps handing out rows only while the worker runs and the breaker is closed."""
+        return self.running and not self.breaker.is_open()
+
+    def _breaker_opened(self):
+        """Shows the pause as soon as the breaker opens, not only once the current batch has drained."""
+        wait = int(self.breaker.retry_in())
+        print(f"[WARN] FADV failing repeatedly; pausing for {wait}s.")
+        self._paused = True
+        self.set_status(f"Paused: FADV unavailable, retrying in {wait}s")
+
+    def _finish_row(self, sheet, status_col, worksheet, i, row_key, row, attempt, success, error=None,
+                    feed_breaker=True):
         """
-        Finds a checkbox by the visible caption (e.g., 'CC: Recruiter on Invitation Email')
-        and ensures it's checked. Works even with duplicated IDs.
+        Writes a claimed row's outcome: Completed, "Retrying (n/max)" with a backoff,
+        or Error once the error is permanent or the attempts are used up.
+        Also feeds the circuit breaker, unless the caller already did.
         """
-        # Prefer robust CSS :has() (Playwright supports it)
-        locator = page.locator(
-            f"tr:has(div.GOIVD5ICIOC:has-text('{caption_text}')) input[type='checkbox']"
-        ).first
+        label = "Pending" if worksheet == "Pending Review" else "Applicants"
+        row_index = i + 2
+        last_error = str(error) if error is not None else None
+        retry_at = None
+        if success:
+            result = "Completed"
+            self.breaker.record_success()
+        else:
+            if not feed_breaker:
+                pass
+            elif error is not None and classify(error) == PERMANENT:
+                self.breaker.record_success()  # FADV answered; the row itself is the problem
+            elif self.breaker.record_failure():
+                self._breaker_opened()
+            if error is None or self.retry_policy.should_retry(error, attempt):
+                delay = self.retry_policy.backoff.delay(attempt)
+                retry_at = t.time() + delay
+                result = f"Retrying ({attempt}/{self.retry_policy.max_attempts})"
+                print(f"[INFO] {label} row {row_index} will be retried in {int(delay)}s: {last_error}")
+            else:
+                result = "Error"
+        self.status_writer.set(sheet, row_index, status_col, result)
+        self.job_store.finish(self.sheet_url, worksheet, row_key, success, last_error, retry_at=retry_at)
+        broadcaster.publish("row", {
+            "pipeline": self.name,
+            "worksheet": worksheet,
+            "row": row_index,
+            "name": str(row.get("Full Name", "")).strip(),
+            "result": result,
+            "error": last_error,
+        })
+        broadcaster.touch()
+
+    def _skip_duplicate(self, sheet, status_col, i, row_key, row):
+        """Completes a row whose order is already in the submitted-orders index, without a browser."""
+        note = "Already ordered (same email, package and company)"
+        self.job_store.finish(self.sheet_url, "Applicants", row_key, True)
+        self.status_writer.set(sheet, i + 2, status_col, "Completed")
+        metrics.inc("fadv_duplicate_orders_total", source="index")
+        broadcaster.publish("row", {
+            "pipeline": self.name,
+            "worksheet": "Applicants",
+            "row": i + 2,
+            "name": str(row.get("Full Name", "")).strip(),
+            "result": "Completed",
+            "error": None,
+            "note": note,
+        })
+        broadcaster.touch()
+        print(f"[INFO] Applicants row {i + 2} skipped: {note}.")
+
+    def _hold_for_review(self, sheet, status_col, i, row_key, row, reason):
+        """
+        Parks a row whose lookup found the subject already in FADV: "Review: <reason>"
+        isn't picked up again until a person changes it. Clearing it lets the order
+        be sent once (see JobStore.sync); Completed means they found it placed.
+        """
+        self.breaker.record_success()  # FADV answered the lookup
+        result = f"{REVIEW_PREFIX}{reason}"
+        self.status_writer.set(sheet, i + 2, status_col, result)
+        self.job_store.finish(self.sheet_url, "Applicants", row_key, False, reason)
+        broadcaster.publish("row", {
+            "pipeline": self.name,
+            "worksheet": "Applicants",
+            "row": i + 2,
+            "name": str(row.get("Full Name", "")).strip(),
+            "result": result,
+            "error": reason,
+        })
+        broadcaster.touch()
+        print(f"[WARN] Applicants row {i + 2} held for review: {reason}")
+
+    def _handle_pending_batch(self, sheet, status_col, items):
+        """
+        Runs Pending Review rows [(index, row_key, row)] through one Find Subject
+        search in this worker's browser process. Matched rows are claimed, ordered
+        one after another and finalized as their results stream in. Rows the search
+        doesn't return then get a search of their own (the per-row flow), so a
+        results page the batch couldn't read never fails a row; a second row with
+        the same email goes to Error.
+        """
+        if not self.running:
+            return
+        worksheet = "Pending Review"
+        # Same pacing as the per-row limiter, split between the workers running batches
+        interval = 60.0 / self.orders_per_minute * self.concurrency if self.orders_per_minute else 0.0
+        if not self._acquire_turn():
+            return
+
+        by_index = {i: (key, row) for i, key, row in items}
+        claimed = {}  # index -> attempt, until the row is finalized
+        searched = []  # non-empty once the search came back
+        unmatched = []  # rows the search didn't return, for the per-row flow afterwards
+
+        def on_message(kind, payload):
+            if kind == "matched":
+                searched.append(True)
+                observe = metrics.step_observer("pending_review")
+                for name, seconds, failed in payload["steps"]:
+                    observe(name, seconds, failed)
+                self._flag_duplicates(sheet, status_col, by_index, payload["duplicates"])
+                unmatched.extend(payload["missing"])
+                if not payload["found"]:
+                    self.breaker.record_success()  # the search worked; nothing left to order
+                for i in payload["found"]:
+                    key, _ = by_index[i]
+                    claimed[i] = self.job_store.claim(self.sheet_url, worksheet, key, i + 2)
+                    self.status_writer.set(sheet, i + 2, status_col, "Processing")
+            elif kind == "row":
+                i = payload["index"]
+                key, row = by_index[i]
+                self.throughput[worksheet].update(payload["total"])
+                success = self._record_result("pending_review", payload, "")
+                error = None if success else row_error(payload)
+                self._finish_row(sheet, status_col, worksheet, i, key, row, claimed.pop(i), success, error)
 
         try:
-            locator.wait_for(state="attached", timeout=timeout)
-        except Exception:
-            # Fallback to XPath if needed
-            locator = page.locator(
-                "xpath=//div[contains(@class,'GOIVD5ICIOC') and "
-                f"normalize-space()='{caption_text}']/ancestor::tr[1]//input[@type='checkbox']"
-            ).first
-            locator.wait_for(state="attached", timeout=timeout)
-
-        if not locator.is_checked():
-            locator.check()
-
-    def process_row(self, index, row, is_pending_review=False):
-        try:
-            full_name = row["Full Name"].strip()
-            split = full_name.split(" ", 1)
-            first_name = split[0]
-            last_name = split[1] if len(split) > 1 else ""
-            email = row["Email"]
-            company_id = row.get("Company ID", "")
-            location = row.get("Location", "").strip().lower()
-            position_type = row.get("Position Type", "")
-            csp_id = row.get("CSP ID", "")
-            package_text = row.get("Package", "")
-
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context()
-                page = context.new_page()
-                page.goto("https://enterprise.fadv.com/")
-                t.sleep(5)
-
-                frame = page.frame_locator("#new-login-iframe")
-                self.fill_shadow_input("fadv-input#login-client-id-input", self.CLIENT_ID, frame)
-                self.fill_shadow_input("fadv-input#login-user-id-input", self.USER_ID, frame)
-                self.fill_shadow_input("fadv-input#login-password-input", self.PASSWORD, frame)
-                frame.locator("fadv-button#login-button").click()
-                t.sleep(2)
-                self.fill_shadow_input("fadv-input#security-question-input", self.SEC_QUESTION, frame)
-                frame.locator("fadv-button#security-question-submit-button").click()
-                t.sleep(2)
-
-                try:
-                    page.frame_locator("#new-login-iframe").get_by_text("Proceed", exact=True).click(timeout=10000)
-                except:
-                    pass
-                try:
-                    frame.locator("fadv-button#notice-agree-button").click()
-                except:
-                    page.evaluate("document.getElementById('agreeBtn').click()")
-
-                # Wait for main menu to load
-                t.sleep(30)
-                page.locator("div#EE_MENU_PROFILE_ADVANTAGE > table > tbody > tr:first-child a").click()
-
-                if not is_pending_review:
-                    # Applicants flow
-                    page.locator("div#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span", has_text="New Subject").wait_for(state="visible")
-                    page.locator("div#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span", has_text="New Subject").click()
-                    t.sleep(20)
-                    page.locator("input#CDC_NEW_SUBJECT_FIRST_NAME").fill(first_name)
-                    page.locator("input#CDC_NEW_SUBJECT_LAST_NAME").fill(last_name)
-                    page.locator("input#CDC_NEW_SUBJECT_EMAIL_ADDRESS").fill(email)
-                    self.check_checkbox_by_caption(page, "CC: Recruiter on Invitation Email")
-
-                    t.sleep(25)
-                    page.locator("select#Order\\.Info\\.RefID3").select_option(str(csp_id))
-                    t.sleep(3)
-
-                    package_options = page.locator("select#CDC_NEW_SUBJECT_PACKAGE_LABEL option").all_text_contents()
-                    for option in package_options:
-                        if package_text in option:
-                            value = page.locator(
-                                "select#CDC_NEW_SUBJECT_PACKAGE_LABEL option", has_text=option
-                            ).get_attribute("value")
-                            page.locator("select#CDC_NEW_SUBJECT_PACKAGE_LABEL").select_option(value)
-                            break
-                    t.sleep(3)
-                    page.locator("select#Company\\ ID").select_option(label=company_id)
-
-                    location_map = {
-                        "wilson": "00256 - WILSON, NC",
-                        "new hill": "00250 - NEW HILL, NC",
-                        "greenville": "00278 - EAST CAROLINA, NC"
-                    }
-                    facility_option = location_map.get(location)
-                    if facility_option:
-                        page.locator("select#Facility\\ ID").select_option(label=facility_option)
-                        t.sleep(3)
-                    page.locator("select#Position\\ Type").select_option(label=position_type)
-                    t.sleep(3)
-                    page.get_by_text("Send", exact=True).click()
-                    try:
-                        page.get_by_text("Send", exact=True).click()
-                    except:
-                        pass
-                    t.sleep(15)
-                else:
-                    # Pending Review flow
-                    page.get_by_text("Find Subject", exact=True).click()
-                    page.locator("input#CDC_SEARCH_SUBJECT_EMAIL_ADDRESS_LBL").fill(email)
-                    page.locator("select#CDC_SEARCH_SUBJECT_PROFILE_STATUS_LBL").select_option(label="Pending For Review")
-                    t.sleep(3)
-                    page.locator("div.html-face", has_text="Search").first.wait_for(state="visible", timeout=10000)
-                    page.locator("div.html-face", has_text="Search").first.click()
-
-                    # Wait for results & click the row by email/name (robust)
-                    found = self._click_pending_result_row(page, email=email, name=full_name)
-                    if not found:
-                        # No result – treat as soft failure so the row becomes "Error" and doesn't loop forever
-                        raise Exception(f"No pending result row found for email '{email}'")
-
-                    page.locator("select#CDC_SUBJECT_DETAIL_ACTIONS").select_option("REVIEW_AND_PLACE_ORDER")
-                    t.sleep(1)
-                    ok_button = page.locator("div.eePushButtonSmall-up >> div.html-face", has_text="OK")
-                    ok_button.wait_for(state="visible", timeout=10000)
-                    ok_button.click()
-                    t.sleep(10)
+            with browser_slot():
+                self._get_browser().run_pending_batch([(i, row) for i, _, row in items], on_message,
+                                                      min_interval=interval, cancel=self._cancel)
+        except RowCancelled:
+            self.breaker.release_trial()
+            for i in claimed:
+                key, _ = by_index[i]
+                self.status_writer.set(sheet, i + 2, status_col, "")
+                self.job_store.finish(self.sheet_url, worksheet, key, False, "cancelled", retry_at=t.time())
+            print(f"[INFO] Pending batch cancelled; {len(claimed)} rows will be picked up on the next run.")
+        except Exception as e:
+            print(f"[ERROR] Pending batch failed: {e}")
+            # One failed search or browser process is one failure for the breaker, however many
+            # rows it takes down with it; the rows still each count an attempt
+            if classify(e) != PERMANENT and self.breaker.record_failure():
+                self._breaker_opened()
+            if not searched:
+                # The search itself failed (or came back empty), so a search that never works ends in Error
+                for i, key, row in items:
+                    attempt = self.job_store.claim(self.sheet_url, worksheet, key, i + 2)
+                    self._finish_row(sheet, status_col, worksheet, i, key, row, attempt, False, e,
+                                     feed_breaker=False)
+            for i, attempt in list(claimed.items()):
+                key, row = by_index[i]
+                self._finish_row(sheet, status_col, worksheet, i, key, row, attempt, False, e, feed_breaker=False)
+
+        for i in unmatched:
+            key, row = by_index[i]
+            self._handle_job((sheet, status_col, i, key, row, True))
+
+    def _flag_duplicates(self, sheet, status_col, by_index, duplicates):
+        """
+        Marks batch rows whose email an earlier row of the batch is ordering as
+        Error. The cells go through the status buffer: this runs while the browser
+        process is mid-batch, so it must not make Sheets calls of its own.
+        """
+        if not duplicates:
+            return
+        for i, reason in duplicates:
+            key, row = by_index[i]
+            self.status_writer.set(sheet, i + 2, status_col, "Error")
+            self.job_store.finish(self.sheet_url, "Pending Review", key, False, reason)
+            broadcaster.publish("row", {
+                "pipeline": self.name,
+                "worksheet": "Pending Review",
+                "row": i + 2,
+                "name": str(row.get("Full Name", "")).strip(),
+                "result": "Error",
+                "error": reason,
+            })
+            print(f"[WARN] Pending row {i + 2}: {reason}")
+        broadcaster.touch()
+
+    def _select_work(self, worksheet, snapshot, changed):
+        """
+        Mirrors the snapshot into the job store (when it changed) and returns
+        [(index, row_key, row)] to process: rows not Completed/Processing/Error and
+        not waiting out a retry backoff, plus Processing rows whose lease is gone
+        (left behind by a crashed run). Error is final until the row is reset on the sheet.
+        Only the returned rows are turned into dicts.
+        """
+        keys = self._row_keys.get(worksheet)
+        if changed or keys is None or len(keys) != len(snapshot):
+            keys = column_row_keys(snapshot.column("Email"), snapshot.column("Full Name"))
+            self.job_store.sync(self.sheet_url, worksheet, keys, snapshot.job_states())
+            self._row_keys[worksheet] = keys
+
+        deferred = self.job_store.deferred(self.sheet_url, worksheet)
+        todo, stuck = [], []
+        for i in snapshot.rows_with(NEEDS_WORK | {PROCESSING}):
+            if keys[i] in deferred:
+                continue
+            (stuck if snapshot.status[i] == PROCESSING else todo).append(i)
+
+        stale = self.job_store.stale_processing(self.sheet_url, worksheet, [keys[i] for i in stuck])
+        for i in stuck:
+            if keys[i] in stale:
+                print(f"[INFO] Reclaiming stale Processing row {i + 2} in {worksheet}.")
+                todo.append(i)
+        todo.sort()
+        return [(i, keys[i], snapshot.record(i)) for i in todo]
+
+    def _validate(self, worksheet, row):
+        if worksheet == "Pending Review":
+            return validate_pending(row)
+        return validate_applicant(row, self.location_map, self.option_index)
+
+    def _reject_invalid(self, worksheet, sheet, reader, status_col, todo):
+        """
+        Drops rows that can't succeed from `todo` before any browser is used.
+        Their Status becomes "Invalid: <reason>" in a single batch_update; rows
+        already showing the same reason are not rewritten. A row that is fixed on
+        the sheet passes validation on a later poll and is processed normally.
+        """
+        keep, updates, rejected = [], [], []
+        for i, key, row in todo:
+            reason = self._validate(worksheet, row)
+            if reason is None:
+                keep.append((i, key, row))
+                continue
+            status = invalid_status(reason)
+            if str(row.get("Status", "")).strip() != status:
+                updates.append({'range': gspread.utils.rowcol_to_a1(i + 2, status_col), 'values': [[status]]})
+                rejected.append((i, key, status, reason))
+
+        if updates:
+            with metrics.sheets_call("batch_update"):
+                sheet.batch_update(updates)
+            for i, key, status, reason in rejected:
+                reader.patch(i, "Status", status)
+                self.job_store.reject(self.sheet_url, worksheet, key, i + 2, reason)
+                print(f"[WARN] {worksheet} row {i + 2} rejected: {reason}")
+            broadcaster.touch()
+        return keep
+
+    def check_false_positives(self, applicants, false_positives, status_col_app):
+        """
+        Matches the Applicants snapshot against the 'False Positives' snapshot
+        and returns (batch_update ranges clearing Status, 0-based row indices) for every
+        Completed applicant listed as a false positive. No per-match API calls.
+        An order is only redone once: a row that stays on the False Positives sheet
+        isn't reset again after its redo completed.
+        """
+        reset_rows = []
+        for i in FalsePositiveIndex(false_positives).rows_to_reset(applicants):
+            key = order_key(applicants.record(i))
+            if key is None or self.job_store.can_redo(key):
+                reset_rows.append(i)
+        updates = []
+        for i in reset_rows:
+            updates.append({'range': gspread.utils.rowcol_to_a1(i + 2, status_col_app), 'values': [['']]})
+            print(f"[INFO] Prepared to reset status for {applicants.value(i, 'Full Name').strip()}.")
+        return updates, reset_rows
 
-                browser.close()
-                return True
+    def process_row(self, index, row, is_pending_review=False, verify_existing=False):
+        """
+        Runs one row in this worker's browser process and records its timings and
+        metrics here. Returns True on success; the error and the raw result are
+        left in self._local.
+        """
+        flow = "pending_review" if is_pending_review else "applicants"
+        csp_id = row.get("CSP ID", "")
+        browser = self._get_browser()
+        try:
+            result = browser.run_row(index, row, is_pending_review, options=self.option_index.export(csp_id),
+                                     cancel=self._cancel, verify_existing=verify_existing)
+        except RowCancelled:
+            raise
         except Exception as e:
+            # Hung or crashed browser process: it has already been killed and is restarted on the next row
             print(f"Row {index} failed: {e}")
+            self._local.last_error = str(e)
+            self._local.last_exception = e
+            metrics.inc("fadv_rows_total", flow=flow, result="error")
             return False
 
-    def fill_shadow_input(self, component, value, frame):
-        shadow_input = frame.locator(component).evaluate_handle("el => el.shadowRoot.querySelector('input')")
-        shadow_input.as_element().fill(value)
+        self._local.last_result = result
+        if result.get("review"):
+            metrics.inc("fadv_orders_held_for_review_total")
+        success = self._record_result(flow, result, csp_id)
+        if not success:
+            self._local.last_exception = row_error(result)
+            self._local.last_error = str(self._local.last_exception)
+        return success
+
+    def _record_result(self, flow, result, csp_id):
+        """Records a browser result's step timings, metrics and dropdown options; returns its success."""
+        observe = metrics.step_observer(flow)
+        for name, seconds, failed in result["steps"]:
+            observe(name, seconds, failed)
+        metrics.observe("fadv_row_duration_seconds", result["total"], flow=flow)
+        metrics.inc("fadv_rows_total", flow=flow, result="completed" if result["success"] else "error")
+        self.last_timing = result["timing"]
+        if result["options"]:
+            self.option_index.merge(csp_id, result["options"])  # lets row validation see the dropdowns
+        return result["success"]
+
+    def _browser_config(self):
+        return {
+            "client_id": self.CLIENT_ID,
+            "user_id": self.USER_ID,
+            "password": self.PASSWORD,
+            "sec_question": self.SEC_QUESTION,
+            "headless": self.headless,
+            "portal_url": self.portal_url,
+            "timeouts": dict(self.step_timeouts),
+            "location_map": dict(self.location_map),
+            "browser_profile": self.browser_profile,
+            "state_dir": self.session_state.directory,
+            "slot": f"{self.name}-{threading.current_thread().name}",  # browser profiles never cross accounts
+        }
+
+    def _get_browser(self):
+        """
+        Returns the calling thread's BrowserProcess, replacing it if the credentials
+        or browser settings changed (e.g. through update_credentials) since it started.
+        """
+        config = self._browser_config()
+        browser = getattr(self._local, "browser", None)
+        if browser is not None and browser.config != config:
+            self.close_browser()
+            browser = None
+        if browser is None:
+            browser = BrowserProcess(config, row_deadline=self.row_deadline, recycle_after=self.recycle_after_rows,
+                                     rss_limit_mb=self.browser_rss_limit_mb)
+            self._local.browser = browser
+        return browser
+
+    def close_browser(self):
+        """Closes the calling thread's BrowserProcess, if it has one."""
+        browser = getattr(self._local, "browser", None)
+        if browser is not None:
+            if self._cancel.is_set():
+                browser.kill()
+            else:
+                browser.close()
+            self._local.browser = None
 
     def __del__(self):
         self.CLIENT_ID = ""
         self.PASSWORD = ""
         self.SEC_QUESTION = ""
         self.stop()
-automation_instance = FirstAdvantageAutomation()
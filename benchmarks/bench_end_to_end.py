@@ -0,0 +1,137 @@
+"""
+End-to-end throughput benchmark: pushes synthetic rows through the real worker
+(pool, portal session, status buffer, job store) against the offline fake
+portal and in-memory worksheets, then reports rows/minute, per-step latency
+and memory.
+
+Run from the repository root (needs Playwright's Chromium installed):
+    python -m benchmarks.bench_end_to_end --applicants 20 --pending 10 --concurrency 2 --latency 100
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time as t
+
+from automation_worker import FirstAdvantageAutomation
+from benchmarks.fake_portal import COMPANIES, CSP_IDS, PACKAGES, POSITIONS, FakePortal, serve
+from benchmarks.fake_sheet import FakeSheetsClient, FakeWorksheet
+from job_store import JobStore
+from metrics import metrics
+
+APPLICANT_HEADERS = ["Full Name", "Email", "Company ID", "Location", "Position Type", "CSP ID", "Package", "Status"]
+PENDING_HEADERS = ["Full Name", "Email", "Status", "OrderStatus"]
+LOCATIONS = ["Wilson", "New Hill", "Greenville"]
+
+
+def synthetic_applicants(n):
+    rows = [APPLICANT_HEADERS]
+    for i in range(n):
+        csp = CSP_IDS[i % len(CSP_IDS)]
+        package = list(PACKAGES[csp].values())[i % 2]
+        rows.append([
+            f"Bench Applicant{i}", f"bench.applicant{i}@example.com", COMPANIES[i % len(COMPANIES)],
+            LOCATIONS[i % len(LOCATIONS)], POSITIONS[i % len(POSITIONS)], csp, package.split(" (")[0], "",
+        ])
+    return rows
+
+
+def synthetic_pending(n, portal):
+    rows = [PENDING_HEADERS]
+    for i in range(n):
+        name, email = f"Bench Pending{i}", f"bench.pending{i}@example.com"
+        portal.seed_pending(name, email)
+        rows.append([name, email, "", ""])
+    return rows
+
+
+def peak_rss_mb():
+    scale = 1024.0 * 1024.0 if sys.platform == "darwin" else 1024.0  # ru_maxrss is bytes on macOS, KiB on Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    return own, children
+
+
+def wait_until_done(automation, sheets, timeout):
+    """Polls the Applicants and Pending Review sheets until every row is Completed or Error."""
+    deadline = t.monotonic() + timeout
+    while t.monotonic() < deadline:
+        automation.status_writer.flush()
+        statuses = [s.lower() for ws in sheets[:2] for s in ws.column("Status")]
+        if statuses and all(s in ("completed", "error") for s in statuses):
+            return True
+        t.sleep(0.5)
+    return False
+
+
+def report(elapsed, sheets, portal, automation):
+    rows = {ws.title: ws.column("Status") for ws in sheets[:2]}
+    done = sum(1 for statuses in rows.values() for s in statuses if s.lower() in ("completed", "error"))
+    completed = sum(1 for statuses in rows.values() for s in statuses if s.lower() == "completed")
+    print(f"\nRows finished: {done} ({completed} completed) in {elapsed:.1f}s "
+          f"-> {done / elapsed * 60 if elapsed else 0:.1f} rows/min")
+    print(f"Portal logins: {portal.logins}, new subjects: {len(portal.orders)}, orders placed: {len(portal.placed)}")
+    print("Sheets calls:", {ws.title: ws.calls for ws in sheets})
+
+    print(f"\n{'flow':<15} {'step':<18} {'p50_s':>7} {'p95_s':>7} {'p99_s':>7}")
+    for flow in ("applicants", "pending_review"):
+        for step in ("browser_launch", "login", "menu_load", "new_subject_form", "form_fill", "csp_select",
+                     "package_select", "company_select", "facility_select", "position_select", "send",
+                     "search", "place_order", "back_to_menu"):
+            q = metrics.quantiles("fadv_step_duration_seconds", flow=flow, step=step)
+            if q:
+                print(f"{flow:<15} {step:<18} {q[0.5]:>7.2f} {q[0.95]:>7.2f} {q[0.99]:>7.2f}")
+
+    own, children = peak_rss_mb()
+    print(f"\nPeak RSS: worker process {own:.0f} MB, child processes (max single) {children:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end worker benchmark against the fake FADV portal")
+    parser.add_argument("--applicants", type=int, default=20)
+    parser.add_argument("--pending", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--latency", type=int, default=100, help="fake portal latency per step (ms)")
+    parser.add_argument("--timeout", type=int, default=900, help="give up after this many seconds")
+    parser.add_argument("--headed", action="store_true", help="show the browsers")
+    args = parser.parse_args()
+
+    portal = FakePortal(latency_ms=args.latency)
+    server, url = serve(portal)
+    sheets = [
+        FakeWorksheet("Applicants", synthetic_applicants(args.applicants)),
+        FakeWorksheet("Pending Review", synthetic_pending(args.pending, portal)),
+        FakeWorksheet("False Positives", [["Name", "Email Address"]]),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        automation = FirstAdvantageAutomation(
+            job_store=JobStore(os.path.join(tmp, "bench_state.db")),
+            sheets_client=FakeSheetsClient(sheets),
+            portal_url=url,
+            headless=not args.headed,
+        )
+        automation.update_credentials("BENCH", "bench-user", "secret", "answer", "fake://bench")
+        automation.concurrency = args.concurrency
+        automation.orders_per_minute = 0  # no rate limit against the local fake
+        automation.poll_interval = 1
+        automation.max_idle_interval = 1
+
+        print(f"Fake portal at {url} (latency {args.latency} ms); "
+              f"{args.applicants} applicants + {args.pending} pending rows, concurrency {args.concurrency}")
+        started = t.monotonic()
+        automation.run(force=True)
+        finished = wait_until_done(automation, sheets, args.timeout)
+        elapsed = t.monotonic() - started
+        automation.stop()
+        automation.job_store.close()
+        server.shutdown()
+
+    if not finished:
+        print(f"[WARN] Timed out after {args.timeout}s; partial results below.")
+    report(elapsed, sheets, portal, automation)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Benchmark for the false-positive reconciliation engine.
+
+Run from the repository root:
+    python -m benchmarks.bench_false_positives
+
+Times FalsePositiveIndex on growing sheet sizes up to 10k applicants x 5k
+false positives; the per-row cost should stay flat (linear scaling), where the
+old nested loop grew with applicants * false positives.
+"""
+import random
+import time as t
+
+from false_positives import FalsePositiveIndex
+from sheet_snapshot import SheetSnapshot
+
+SIZES = [(1250, 625), (2500, 1250), (5000, 2500), (10000, 5000)]
+
+
+def make_rows(n_applicants, n_false_positives, seed=7):
+    rng = random.Random(seed)
+    applicants = SheetSnapshot(["Full Name", "Email", "Status"], (
+        [f" Applicant {i} ", f"Applicant{i}@Example.com", rng.choice(["Completed", "Completed", "", "Error"])]
+        for i in range(n_applicants)
+    ))
+    picks = rng.sample(range(n_applicants * 2), n_false_positives)  # about half match
+    false_positives = SheetSnapshot(["Name", "Email Address"], (
+        [f"applicant {i}", f"applicant{i}@example.com"] for i in picks
+    ))
+    return applicants, false_positives
+
+
+def run_once(applicants, false_positives):
+    start = t.perf_counter()
+    rows = FalsePositiveIndex(false_positives).rows_to_reset(applicants)
+    return t.perf_counter() - start, len(rows)
+
+
+def main(repeats=5):
+    print(f"{'applicants':>10} {'false_pos':>10} {'resets':>7} {'best_ms':>9} {'us/row':>8}")
+    for n_app, n_fp in SIZES:
+        applicants, false_positives = make_rows(n_app, n_fp)
+        timings = [run_once(applicants, false_positives) for _ in range(repeats)]
+        best = min(seconds for seconds, _ in timings)
+        resets = timings[0][1]
+        print(f"{n_app:>10} {n_fp:>10} {resets:>7} {best * 1000:>9.2f} {best * 1e6 / (n_app + n_fp):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark for the column-oriented sheet snapshot.
+
+Run from the repository root:
+    python -m benchmarks.bench_snapshot
+
+Builds Applicants sheets of growing size (mostly Completed history, a few rows
+still to do) and compares the old representation, a list of dicts with numericised
+values as get_all_records returns, against SheetSnapshot: memory held, and the
+CPU of one poll's bookkeeping (status counts plus the to-do list).
+"""
+import random
+import time as t
+import tracemalloc
+
+import gspread
+
+from sheet_snapshot import NEEDS_WORK, SheetSnapshot
+
+SIZES = [5000, 20000, 50000]
+HEADERS = ["Full Name", "Email", "Company ID", "Location", "Position Type", "CSP ID", "Package", "Status", "Notes"]
+
+
+def make_values(n, seed=11):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        status = "Completed" if rng.random() < 0.97 else rng.choice(["", "Error", "Retrying (1/3)", "Processing"])
+        rows.append([f"Applicant {i}", f"applicant{i}@example.com", str(1000 + i % 40), "Wilson",
+                     "Full Time", str(20 + i % 5), "Standard Package", status, ""])
+    return [HEADERS] + rows
+
+
+def as_records(values):
+    headers = values[0]
+    return [dict(zip(headers, gspread.utils.numericise_all(list(row)))) for row in values[1:]]
+
+
+def poll_records(records):
+    counts = {}
+    todo = []
+    for i, row in enumerate(records):
+        status = str(row.get("Status", "")).strip().lower()
+        counts[status] = counts.get(status, 0) + 1
+        if status not in ("completed", "processing", "error"):
+            todo.append((i, row))
+    return counts, todo
+
+
+def poll_snapshot(snapshot):
+    counts = snapshot.status_counts()
+    todo = [(i, snapshot.record(i)) for i in snapshot.rows_with(NEEDS_WORK)]
+    return counts, todo
+
+
+def measure(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def best_of(fn, arg, repeats=5):
+    best = None
+    for _ in range(repeats):
+        start = t.perf_counter()
+        result = fn(arg)
+        elapsed = t.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    print(f"{'rows':>7} {'dicts_MB':>9} {'snap_MB':>8} {'dicts_poll_ms':>14} {'snap_poll_ms':>13} {'todo':>6}")
+    for n in SIZES:
+        values = make_values(n)
+        records, records_bytes = measure(lambda: as_records(values))
+        snapshot, snapshot_bytes = measure(lambda: SheetSnapshot(values[0], values[1:]))
+        records_s, (_, records_todo) = best_of(poll_records, records)
+        snapshot_s, (_, snapshot_todo) = best_of(poll_snapshot, snapshot)
+        assert len(records_todo) == len(snapshot_todo)
+        print(f"{n:>7} {records_bytes / 2 ** 20:>9.1f} {snapshot_bytes / 2 ** 20:>8.1f} "
+              f"{records_s * 1000:>14.2f} {snapshot_s * 1000:>13.2f} {len(snapshot_todo):>6}")
+
+
+if __name__ == "__main__":
+    main()
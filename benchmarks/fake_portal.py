@@ -0,0 +1,342 @@
+"""
+Offline stand-in for enterprise.fadv.com, mimicking the pages process_row drives:
+
+- the #new-login-iframe login with fadv-input/fadv-button shadow-DOM components,
+  security question, Proceed and notice-agree steps
+- the Profile Advantage menu (New Subject / Find Subject)
+- the New Subject form with its dependent select elements and Send
+- Find Subject results (table.GOIVD5ICHFF tr.standard, or "No subjects found"),
+  paged with a "Next Page" arrow, and Review & Place Order
+
+Every /api call sleeps `latency_ms`, and dependent dropdowns are filled through
+those calls, so waits behave like the real GWT app. Run standalone with
+    python -m benchmarks.fake_portal --port 5050 --latency 200
+"""
+import argparse
+import secrets
+import threading
+import time as t
+
+from flask import Flask, jsonify, make_response, request
+
+CSP_IDS = ["CSP-100", "CSP-200"]
+PACKAGES = {
+    "CSP-100": {"2426": "A - NON CDL DRIVER PKG + PHYSICAL AND DRUG (MC)", "2427": "B - CDL DRIVER PKG (MC)"},
+    "CSP-200": {"3100": "C - WAREHOUSE PKG", "3101": "D - OFFICE PKG"},
+}
+COMPANIES = ["300 - ISP Pickup & Delivery", "400 - Linehaul"]
+FACILITIES = ["00256 - WILSON, NC", "00250 - NEW HILL, NC", "00278 - EAST CAROLINA, NC"]
+POSITIONS = ["A - P&D Non-CDL Driver", "B - CDL Driver", "C - Warehouse"]
+
+COMPONENTS_JS = """
+class FadvInput extends HTMLElement {
+  constructor() { super(); this.attachShadow({mode: 'open'}).innerHTML = '<input type="text">'; }
+  get value() { return this.shadowRoot.querySelector('input').value; }
+}
+class FadvButton extends HTMLElement {
+  constructor() { super(); this.attachShadow({mode: 'open'}).innerHTML = '<button><slot></slot></button>'; }
+}
+customElements.define('fadv-input', FadvInput);
+customElements.define('fadv-button', FadvButton);
+"""
+
+LOGIN_FRAME = """<!DOCTYPE html><html><body>
+<script>%(components)s</script>
+<div id="step-login">
+  <fadv-input id="login-client-id-input"></fadv-input>
+  <fadv-input id="login-user-id-input"></fadv-input>
+  <fadv-input id="login-password-input"></fadv-input>
+  <fadv-button id="login-button">Log In</fadv-button>
+</div>
+<div id="step-question" style="display:none">
+  <fadv-input id="security-question-input"></fadv-input>
+  <fadv-button id="security-question-submit-button">Submit</fadv-button>
+</div>
+<div id="step-proceed" style="display:none"><span id="proceed">Proceed</span></div>
+<div id="step-notice" style="display:none"><fadv-button id="notice-agree-button">I Agree</fadv-button></div>
+<script>
+const $ = id => document.getElementById(id);
+const show = id => { for (const s of ['step-login','step-question','step-proceed','step-notice'])
+  $(s).style.display = s === id ? '' : 'none'; };
+let creds = {};
+$('login-button').addEventListener('click', () => {
+  creds = {client_id: $('login-client-id-input').value, user_id: $('login-user-id-input').value,
+           password: $('login-password-input').value};
+  setTimeout(() => show('step-question'), %(latency)d);
+});
+$('security-question-submit-button').addEventListener('click', async () => {
+  creds.answer = $('security-question-input').value;
+  const res = await fetch('/api/login', {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                         body: JSON.stringify(creds)});
+  if (res.ok) show('step-proceed');
+});
+$('proceed').addEventListener('click', () => show('step-notice'));
+$('notice-agree-button').addEventListener('click', () => { window.top.location = '/'; });
+</script></body></html>"""
+
+LOGIN_PAGE = """<!DOCTYPE html><html><body>
+<iframe id="new-login-iframe" src="/login-frame" style="width:600px;height:400px"></iframe>
+</body></html>"""
+
+APP_PAGE = """<!DOCTYPE html><html><head><style>.hidden{display:none}</style></head><body>
+<div id="EE_MENU_PROFILE_ADVANTAGE"><table><tbody>
+  <tr><td><a href="#" id="pa-toggle">Profile Advantage</a></td></tr>
+  <tr><td><div id="pa-items" class="hidden">
+    <div id="EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT"><span>New Subject</span></div>
+    <div id="EE_MENU_PROFILE_ADVANTAGE_FIND_SUBJECT"><span>Find Subject</span></div>
+  </div></td></tr>
+</tbody></table></div>
+<input type="hidden" id="agreeBtn">
+
+<div id="new-subject" class="hidden">
+  <input id="CDC_NEW_SUBJECT_FIRST_NAME"><input id="CDC_NEW_SUBJECT_LAST_NAME">
+  <input id="CDC_NEW_SUBJECT_EMAIL_ADDRESS">
+  <table><tr><td><div class="GOIVD5ICIOC">CC: Recruiter on Invitation Email</div></td>
+             <td><input type="checkbox" id="cc"></td></tr></table>
+  <select id="Order.Info.RefID3"></select>
+  <select id="CDC_NEW_SUBJECT_PACKAGE_LABEL"></select>
+  <select id="Company ID"></select>
+  <select id="Facility ID"></select>
+  <select id="Position Type"></select>
+  <div class="html-face" id="send">Send</div>
+</div>
+
+<div id="find-subject" class="hidden">
+  <input id="CDC_SEARCH_SUBJECT_EMAIL_ADDRESS_LBL">
+  <select id="CDC_SEARCH_SUBJECT_PROFILE_STATUS_LBL">
+    <option value="">Any</option><option value="PENDING">Pending For Review</option>
+  </select>
+  <div class="html-face" id="search">Search</div>
+  <div id="results"></div>
+</div>
+
+<div id="subject-detail" class="hidden">
+  <select id="CDC_SUBJECT_DETAIL_ACTIONS"><option value="">Actions...</option>
+    <option value="REVIEW_AND_PLACE_ORDER">Review and Place Order</option></select>
+  <div id="ok-dialog" class="hidden"><div class="eePushButtonSmall-up"><div class="html-face">OK</div></div></div>
+</div>
+
+<script>
+const $ = id => document.getElementById(id);
+const panels = ['new-subject', 'find-subject', 'subject-detail'];
+const showPanel = id => panels.forEach(p => $(p).classList.toggle('hidden', p !== id));
+const api = (path, body) => fetch(path, body ? {method: 'POST', headers: {'Content-Type': 'application/json'},
+                                                body: JSON.stringify(body)} : undefined)
+  .then(r => { if (r.status === 401) { window.location = '/'; throw new Error('expired'); } return r.json(); });
+const fill = (id, options) => {
+  const el = $(id);
+  el.innerHTML = '<option value="">Select...</option>' +
+    options.map(([v, l]) => `<option value="${v}">${l}</option>`).join('');
+};
+const clear = id => { $(id).innerHTML = ''; };
+let subject = null;
+
+$('pa-toggle').addEventListener('click', e => { e.preventDefault(); $('pa-items').classList.toggle('hidden'); });
+document.querySelector('#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span').addEventListener('click', async () => {
+  showPanel(null);
+  for (const id of ['CDC_NEW_SUBJECT_FIRST_NAME', 'CDC_NEW_SUBJECT_LAST_NAME', 'CDC_NEW_SUBJECT_EMAIL_ADDRESS']) $(id).value = '';
+  $('cc').checked = false;
+  ['Order.Info.RefID3', 'CDC_NEW_SUBJECT_PACKAGE_LABEL', 'Company ID', 'Facility ID', 'Position Type'].forEach(clear);
+  const data = await api('/api/form');
+  showPanel('new-subject');
+  setTimeout(() => fill('Order.Info.RefID3', data.csp_ids.map(c => [c, c])), %(latency)d);
+});
+$('Order.Info.RefID3').addEventListener('change', async e => {
+  const data = await api('/api/packages?csp=' + encodeURIComponent(e.target.value));
+  fill('CDC_NEW_SUBJECT_PACKAGE_LABEL', Object.entries(data.packages));
+});
+$('CDC_NEW_SUBJECT_PACKAGE_LABEL').addEventListener('change', async () => {
+  const data = await api('/api/org');
+  fill('Company ID', data.companies.map(c => [c, c]));
+  fill('Facility ID', data.facilities.map(c => [c, c]));
+  fill('Position Type', data.positions.map(c => [c, c]));
+});
+$('send').addEventListener('click', async () => {
+  // Not debounced: a second click while the first is in flight is a second order
+  if ($('new-subject').classList.contains('hidden')) return;
+  const order = {
+    first_name: $('CDC_NEW_SUBJECT_FIRST_NAME').value, last_name: $('CDC_NEW_SUBJECT_LAST_NAME').value,
+    email: $('CDC_NEW_SUBJECT_EMAIL_ADDRESS').value, cc: $('cc').checked,
+    csp_id: $('Order.Info.RefID3').value, package: $('CDC_NEW_SUBJECT_PACKAGE_LABEL').value,
+    company: $('Company ID').value, facility: $('Facility ID').value, position: $('Position Type').value,
+  };
+  await api('/api/subjects', order);
+  showPanel(null);
+});
+
+document.querySelector('#EE_MENU_PROFILE_ADVANTAGE_FIND_SUBJECT span').addEventListener('click', () => {
+  $('results').innerHTML = '';
+  showPanel('find-subject');
+});
+let query = '';
+const showResults = async page => {
+  const data = await api('/api/search?' + query + '&page=' + page);
+  $('results').innerHTML = '<table class="GOIVD5ICHFF"><tbody>' + (data.subjects.length ? data.subjects.map(s =>
+    `<tr class="standard"><td><div class="pointer" data-email="${s.email}">${s.name}</div></td>` +
+    `<td><img class="gwt-Image pointer" title="${s.email}" src="data:,"></td><td>${s.status}</td></tr>`
+  ).join('') : '<tr><td>No subjects found</td></tr>') + '</tbody></table>' +
+    (data.has_next ? '<img class="gwt-Image pointer" title="Next Page" id="next-page" src="data:,">' : '');
+  document.querySelectorAll('#results div.pointer').forEach(el => el.addEventListener('click', () => {
+    subject = el.dataset.email;
+    $('CDC_SUBJECT_DETAIL_ACTIONS').value = '';
+    $('ok-dialog').classList.add('hidden');
+    showPanel('subject-detail');
+  }));
+  if (data.has_next) $('next-page').addEventListener('click', () => showResults(page + 1));
+};
+$('search').addEventListener('click', () => {
+  const status = $('CDC_SEARCH_SUBJECT_PROFILE_STATUS_LBL').selectedOptions[0].text;
+  query = 'email=' + encodeURIComponent($('CDC_SEARCH_SUBJECT_EMAIL_ADDRESS_LBL').value) +
+          '&status=' + encodeURIComponent(status);
+  showResults(0);
+});
+$('CDC_SUBJECT_DETAIL_ACTIONS').addEventListener('change', e => {
+  if (e.target.value === 'REVIEW_AND_PLACE_ORDER') setTimeout(() => $('ok-dialog').classList.remove('hidden'), %(latency)d);
+});
+document.querySelector('#ok-dialog div.html-face').addEventListener('click', async () => {
+  await api('/api/place-order', {email: subject});
+  $('ok-dialog').classList.add('hidden');
+  showPanel(null);
+});
+</script></body></html>"""
+
+
+class FakePortal:
+    """
+    The fake portal's state: sessions, subjects (by email) and placed orders.
+    `latency_ms` is added to every API call and to the client-side async steps.
+    """
+
+    def __init__(self, latency_ms=100, session_ttl=3600, page_size=25):
+        self.latency_ms = latency_ms
+        self.session_ttl = session_ttl
+        self.page_size = page_size  # search results per page; a "Next Page" arrow leads to the rest
+        self.sessions = {}
+        self.subjects = {}  # email -> {"name", "email", "status"}
+        self.orders = []
+        self.placed = []
+        self.logins = 0
+        self._lock = threading.Lock()
+
+    def seed_pending(self, name, email):
+        with self._lock:
+            self.subjects[email.lower()] = {"name": name, "email": email, "status": "Pending For Review"}
+
+    def _delay(self):
+        if self.latency_ms:
+            t.sleep(self.latency_ms / 1000.0)
+
+    def _authorized(self):
+        token = request.cookies.get("fadv_session")
+        expires = self.sessions.get(token)
+        return expires is not None and expires > t.time()
+
+    def create_app(self):
+        app = Flask(__name__)
+        portal = self
+
+        @app.route("/")
+        def index():
+            if portal._authorized():
+                return APP_PAGE % {"latency": portal.latency_ms}
+            return LOGIN_PAGE
+
+        @app.route("/login-frame")
+        def login_frame():
+            return LOGIN_FRAME % {"components": COMPONENTS_JS, "latency": portal.latency_ms}
+
+        @app.route("/api/login", methods=["POST"])
+        def login():
+            portal._delay()
+            data = request.get_json(force=True)
+            if not all(data.get(k) for k in ("client_id", "user_id", "password", "answer")):
+                return jsonify({"error": "missing credentials"}), 403
+            token = secrets.token_hex(16)
+            with portal._lock:
+                portal.sessions[token] = t.time() + portal.session_ttl
+                portal.logins += 1
+            response = make_response(jsonify({"ok": True}))
+            response.set_cookie("fadv_session", token)
+            return response
+
+        @app.before_request
+        def require_session():
+            if request.path.startswith("/api/") and request.path != "/api/login" and not portal._authorized():
+                return jsonify({"error": "session expired"}), 401
+
+        @app.route("/api/form")
+        def form():
+            portal._delay()
+            return jsonify({"csp_ids": CSP_IDS})
+
+        @app.route("/api/packages")
+        def packages():
+            portal._delay()
+            return jsonify({"packages": PACKAGES.get(request.args.get("csp", ""), {})})
+
+        @app.route("/api/org")
+        def org():
+            portal._delay()
+            return jsonify({"companies": COMPANIES, "facilities": FACILITIES, "positions": POSITIONS})
+
+        @app.route("/api/subjects", methods=["POST"])
+        def new_subject():
+            portal._delay()
+            order = request.get_json(force=True)
+            with portal._lock:
+                portal.orders.append(order)
+                email = str(order.get("email", "")).lower()
+                portal.subjects[email] = {
+                    "name": f"{order.get('first_name', '')} {order.get('last_name', '')}".strip(),
+                    "email": order.get("email", ""),
+                    "status": "Invitation Sent",
+                }
+            return jsonify({"ok": True})
+
+        @app.route("/api/search")
+        def search():
+            portal._delay()
+            email = request.args.get("email", "").strip().lower()
+            status = request.args.get("status", "")
+            page = int(request.args.get("page", 0))
+            with portal._lock:
+                found = [
+                    s for key, s in portal.subjects.items()
+                    if (not email or key == email) and (status in ("", "Any") or s["status"] == status)
+                ]
+            start = page * portal.page_size
+            return jsonify({"subjects": found[start:start + portal.page_size],
+                            "has_next": len(found) > start + portal.page_size})
+
+        @app.route("/api/place-order", methods=["POST"])
+        def place_order():
+            portal._delay()
+            email = str(request.get_json(force=True).get("email", "")).lower()
+            with portal._lock:
+                if email in portal.subjects:
+                    portal.subjects[email]["status"] = "Order Placed"
+                portal.placed.append(email)
+            return jsonify({"ok": True})
+
+        return app
+
+
+def serve(portal, host="127.0.0.1", port=0):
+    """Starts the fake portal on a background thread; returns (server, base_url)."""
+    from werkzeug.serving import make_server
+
+    server = make_server(host, port, portal.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name="fake-portal", daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline fake FADV portal")
+    parser.add_argument("--port", type=int, default=5050)
+    parser.add_argument("--latency", type=int, default=100, help="artificial latency per step (ms)")
+    args = parser.parse_args()
+    FakePortal(latency_ms=args.latency).create_app().run(port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
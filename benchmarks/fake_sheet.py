@@ -0,0 +1,149 @@
+"""
+In-memory stand-ins for gspread worksheets and for SheetsClient, covering the
+calls the worker makes: get_all_values, batch_get, batch_update, update_cell,
+row_values, append_rows, and row deletion through spreadsheet.batch_update. Every call is counted so benchmarks can report API usage.
+"""
+import re
+import threading
+
+_A1_RANGE = re.compile(r"^([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?$")
+
+
+def _col_number(letters):
+    n = 0
+    for ch in letters:
+        n = n * 26 + ord(ch) - 64
+    return n
+
+
+class FakeSpreadsheet:
+    """Routes deleteDimension requests to the FakeWorksheet with that sheetId."""
+
+    def __init__(self):
+        self.worksheets = {}
+
+    def batch_update(self, body):
+        for request in body["requests"]:
+            target = request["deleteDimension"]["range"]
+            self.worksheets[target["sheetId"]].delete_rows(target["startIndex"] + 1, target["endIndex"])
+
+
+class FakeWorksheet:
+    _ids = 0
+
+    def __init__(self, title, values, spreadsheet=None):
+        FakeWorksheet._ids += 1
+        self.id = FakeWorksheet._ids
+        self.spreadsheet = spreadsheet or FakeSpreadsheet()
+        self.spreadsheet.worksheets[self.id] = self
+        self.title = title
+        self.values = [list(row) for row in values]
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def _count(self, op):
+        self.calls[op] = self.calls.get(op, 0) + 1
+
+    def _cell(self, row, col):
+        if row - 1 < len(self.values) and col - 1 < len(self.values[row - 1]):
+            return self.values[row - 1][col - 1]
+        return ""
+
+    def _set(self, row, col, value):
+        width = max(len(self.values[0]) if self.values else 0, col)
+        while len(self.values) < row:
+            self.values.append([""] * width)
+        line = self.values[row - 1]
+        line.extend([""] * (col - len(line)))
+        line[col - 1] = value
+
+    def _read(self, a1):
+        match = _A1_RANGE.match(a1.split("!")[-1])
+        c1, r1, c2, r2 = match.group(1), match.group(2), match.group(3) or match.group(1), match.group(4)
+        r1 = int(r1) if r1 else 1
+        r2 = int(r2) if r2 else (len(self.values) if match.group(3) or not match.group(2) else r1)
+        out = []
+        for row in range(r1, r2 + 1):
+            cells = [self._cell(row, col) for col in range(_col_number(c1), _col_number(c2) + 1)]
+            while cells and cells[-1] == "":
+                cells.pop()
+            out.append(cells)
+        while out and not out[-1]:
+            out.pop()  # the API trims trailing empty rows
+        return out
+
+    def get_all_values(self):
+        with self._lock:
+            self._count("get_all_values")
+            return [list(row) for row in self.values]
+
+    def get_all_records(self):
+        with self._lock:
+            self._count("get_all_records")
+            headers = self.values[0]
+            return [dict(zip(headers, row + [""] * (len(headers) - len(row)))) for row in self.values[1:]]
+
+    def row_values(self, row):
+        with self._lock:
+            self._count("row_values")
+            return list(self.values[row - 1]) if row - 1 < len(self.values) else []
+
+    def batch_get(self, ranges):
+        with self._lock:
+            self._count("batch_get")
+            return [self._read(a1) for a1 in ranges]
+
+    def batch_update(self, updates):
+        with self._lock:
+            self._count("batch_update")
+            for update in updates:
+                match = _A1_RANGE.match(update["range"])
+                row, col = int(match.group(2)), _col_number(match.group(1))
+                for dr, line in enumerate(update["values"]):
+                    for dc, value in enumerate(line):
+                        self._set(row + dr, col + dc, value)
+
+    def update_cell(self, row, col, value):
+        with self._lock:
+            self._count("update_cell")
+            self._set(row, col, value)
+
+    def append_rows(self, rows, value_input_option="RAW"):
+        with self._lock:
+            self._count("append_rows")
+            self.values.extend([list(row) for row in rows])
+
+    def delete_rows(self, start, end):
+        with self._lock:
+            self._count("delete_rows")
+            del self.values[start - 1:end]
+
+    def add_cols(self, n):
+        self._count("add_cols")
+
+    def column(self, name):
+        """Convenience for benchmarks: all data values of one column."""
+        with self._lock:
+            index = self.values[0].index(name)
+            return [row[index] if index < len(row) else "" for row in self.values[1:]]
+
+
+class FakeSheetsClient:
+    """Drop-in for sheets_client.SheetsClient backed by FakeWorksheets."""
+
+    def __init__(self, worksheets):
+        self._worksheets = {ws.title: ws for ws in worksheets}
+
+    def worksheets(self, sheet_url, names):
+        return {name: self._worksheets[name] for name in names}
+
+    def worksheet_or_create(self, sheet_url, name, headers):
+        if name not in self._worksheets:
+            self._worksheets[name] = FakeWorksheet(name, [list(headers)])
+        return self._worksheets[name]
+
+    def invalidate(self, sheet_url=None, reauthorize=False):
+        pass
+
+    def handle_error(self, error, sheet_url=None):
+        return False
@@ -0,0 +1,256 @@
+"""
+Supervised browser processes.
+
+Playwright and Chromium run in a child process per pool worker instead of inside
+the Flask process, so a leaking or hung browser can be killed without touching
+the dashboard. The supervising thread sends one row (or one Pending Review batch)
+at a time over a pipe and:
+
+- enforces a per-row deadline (hang detection): the child is killed and the row
+  fails with a transient RowTimeout; a batch gets the same deadline per order;
+- recycles the child after `recycle_after` rows or once the process group
+  (Python + Playwright driver + Chromium) goes over `rss_limit_mb`;
+- kills the child as soon as the cancel event is set (the /stop button).
+
+The child is a session leader, so killing its process group also takes down the
+Playwright driver and every Chromium process it started.
+"""
+import multiprocessing
+import os
+import signal
+import time as t
+
+from retry import PERMANENT, TRANSIENT, classify
+
+ROW_DEADLINE_SECONDS = 300
+RECYCLE_AFTER_ROWS = 50
+RSS_LIMIT_MB = 1500
+POLL_SECONDS = 0.25
+STOP_GRACE_SECONDS = 15
+
+_context = multiprocessing.get_context("spawn")  # never fork a process holding Flask/SQLite/threads
+
+
+class RowError(Exception):
+    """A row failure reported by the browser process, keeping its retry classification."""
+
+    def __init__(self, message, retry_kind=TRANSIENT):
+        super().__init__(message)
+        self.retry_kind = retry_kind
+
+
+class RowTimeout(RowError):
+    pass
+
+
+class WorkerCrashed(RowError):
+    pass
+
+
+class RowCancelled(Exception):
+    """The row was abandoned because the worker is stopping; it was not attempted to completion."""
+
+
+def process_group_rss_mb(pgid):
+    """Resident memory of every process in a process group (Linux /proc); None if unavailable."""
+    if not os.path.isdir("/proc"):
+        return None
+    page_kb = os.sysconf("SC_PAGE_SIZE") / 1024.0
+    total_kb = 0.0
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+            # Fields after the parenthesised command: state ppid pgrp ...
+            fields = stat[stat.rindex(")") + 2:].split()
+            if int(fields[2]) != pgid:
+                continue
+            with open(f"/proc/{entry}/statm") as f:
+                total_kb += int(f.read().split()[1]) * page_kb
+        except (OSError, ValueError, IndexError):
+            continue  # the process went away while we were reading
+    return total_kb / 1024.0
+
+
+def _child_main(conn, config):
+    """Entry point of a browser process: runs rows until told to stop or the pipe closes."""
+    if hasattr(os, "setsid"):
+        os.setsid()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is the supervisor's to handle
+    from portal_worker import PortalWorker  # imported here so the parent never loads Playwright for this
+
+    worker = PortalWorker(**config)
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message[0] == "stop":
+                break
+            if message[0] == "pending_batch":
+                _, rows, min_interval = message
+                try:
+                    worker.process_pending_batch(rows, lambda kind, payload: conn.send((kind, payload)), min_interval)
+                except Exception as e:
+                    conn.send(("failed", {"error": str(e), "error_kind": classify(e)}))
+                else:
+                    conn.send(("done", None))
+                continue
+            _, index, row, is_pending_review, options, verify_existing = message
+            if options:
+                worker.option_index.merge(row.get("CSP ID", ""), options)
+            conn.send(("done", worker.process_row(index, row, is_pending_review, verify_existing)))
+    finally:
+        worker.close()
+
+
+class BrowserProcess:
+    """Parent-side handle of one browser process, owned by a single pool worker thread."""
+
+    def __init__(self, config, row_deadline=ROW_DEADLINE_SECONDS, recycle_after=RECYCLE_AFTER_ROWS,
+                 rss_limit_mb=RSS_LIMIT_MB, target=_child_main):
+        self.config = config
+        self.target = target  # child entry point, target(conn, config); must be importable by name
+        self.row_deadline = row_deadline
+        self.recycle_after = recycle_after
+        self.rss_limit_mb = rss_limit_mb
+        self.rows = 0
+        self.restarts = 0
+        self._process = None
+        self._conn = None
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._discard()
+        parent_conn, child_conn = _context.Pipe()
+        self._process = _context.Process(target=self.target, args=(child_conn, self.config),
+                                         name=f"browser-{self.config.get('slot')}", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+        self.rows = 0
+        self.restarts += 1
+
+    def run_row(self, index, row, is_pending_review, options=None, cancel=None, verify_existing=False):
+        """
+        Runs one row in the browser process and returns its result dict. Raises
+        RowTimeout/WorkerCrashed (transient) or RowCancelled instead of waiting forever.
+        """
+        result = self._exchange(("row", index, row, is_pending_review, options, verify_existing), f"row {index}",
+                                cancel)
+        self.rows += 1
+        self._maybe_recycle()
+        return result
+
+    def run_pending_batch(self, rows, on_message, min_interval=0.0, cancel=None):
+        """
+        Runs a batch of Pending Review rows ([(index, row)]) from one portal search.
+        on_message(kind, payload) gets the "matched" summary and each "row" result
+        as they arrive; the deadline applies to the gap between two messages. A
+        failed search raises RowError; the hang/crash/cancel errors are as in run_row.
+        """
+        def on_progress(kind, payload):
+            if kind == "row":
+                self.rows += 1
+            on_message(kind, payload)
+
+        self._exchange(("pending_batch", rows, min_interval), "pending batch", cancel, on_progress)
+        self._maybe_recycle()
+
+    def _exchange(self, message, label, cancel, on_progress=None):
+        """Sends one request and waits for its "done" reply, passing progress messages to on_progress."""
+        self._ensure_started()
+        try:
+            self._conn.send(message)
+        except (OSError, EOFError) as e:
+            self.kill()
+            raise WorkerCrashed(f"Browser process unreachable: {e}")
+
+        deadline = t.monotonic() + self.row_deadline
+        while True:
+            if cancel is not None and cancel.is_set():
+                self.kill()
+                raise RowCancelled(f"{label.capitalize()} cancelled")
+            try:
+                if self._conn.poll(POLL_SECONDS):
+                    kind, payload = self._conn.recv()
+                    if kind == "done":
+                        return payload
+                    if kind == "failed":
+                        raise row_error(payload)
+                    try:
+                        on_progress(kind, payload)
+                    except Exception:
+                        # Nobody would read the rest of this request; its leftover replies
+                        # must not be taken for the next request's
+                        self.kill()
+                        raise
+                    deadline = t.monotonic() + self.row_deadline
+                    continue
+            except (OSError, EOFError):
+                pass  # the child died; reported below
+            if not self._process.is_alive():
+                code = self._process.exitcode
+                self._discard()
+                raise WorkerCrashed(f"Browser process exited with code {code} during {label}")
+            if t.monotonic() > deadline:
+                self.kill()
+                raise RowTimeout(f"{label.capitalize()} exceeded the {self.row_deadline}s deadline; browser process killed")
+
+    def _maybe_recycle(self):
+        reason = None
+        if self.recycle_after and self.rows >= self.recycle_after:
+            reason = f"{self.rows} rows"
+        elif self.rss_limit_mb:
+            rss = process_group_rss_mb(self._process.pid)
+            if rss is not None and rss > self.rss_limit_mb:
+                reason = f"RSS {rss:.0f} MB > {self.rss_limit_mb} MB"
+        if reason:
+            print(f"[INFO] Recycling browser process {self._process.name} ({reason}).")
+            self.close()
+
+    def close(self):
+        """Asks the child to log off and exit; kills it if it doesn't within the grace period."""
+        if self._process is None:
+            return
+        if self._process.is_alive():
+            try:
+                self._conn.send(("stop",))
+            except (OSError, EOFError):
+                pass
+            self._process.join(STOP_GRACE_SECONDS)
+        self.kill()
+
+    def kill(self):
+        """Kills the child and everything it started, immediately."""
+        if self._process is None:
+            return
+        pid = self._process.pid
+        if hasattr(os, "killpg"):
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        if self._process.is_alive():
+            self._process.kill()
+        self._process.join(5)
+        self._discard()
+
+    def _discard(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+        self._conn = None
+        self._process = None
+
+
+def row_error(result):
+    """The RowError for a failed result dict from the browser process."""
+    kind = result.get("error_kind") if result.get("error_kind") in (TRANSIENT, PERMANENT) else TRANSIENT
+    return RowError(result.get("error") or "Row failed", kind)
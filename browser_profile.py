@@ -0,0 +1,190 @@
+"""
+Lightweight Chromium profile for the portal workers.
+
+The portal needs its own HTML, scripts, stylesheets and images (the results
+table's email icons are images the workers look for); fonts, media and
+third-party hosts (analytics, chat widgets, CDNs for marketing assets) are dead
+weight on every login. Trimming happens at two levels:
+
+- Launch flags: remote fonts are never fetched and Chromium runs with its
+  background services and GPU off to keep per-browser memory down. With
+  block_hosts, every host but the portal's domain and the allowlist also resolves
+  to nothing; that is opt-in, as a login that needs some other host (an SSO page,
+  a CDN) would fail without saying why.
+- URL blocklist (on by default): each page gets DEFAULT_BLOCKED_URLS (font and
+  media files, well-known analytics and ad hosts) through the DevTools protocol's
+  Network.setBlockedURLs. Unlike a Playwright route this leaves the HTTP cache on;
+  blocked requests are counted in /metrics.
+- Request routing (optional): per-request filtering on resource type (and on host
+  with block_hosts), also counted in /metrics. Playwright disables the HTTP cache
+  while any route is installed, so this is off by default.
+
+Each worker gets its own persistent profile directory so the HTTP cache (the GWT
+bundle is the bulk of a login) survives browser restarts. Cookies are cleared on
+launch and replaced by the session's saved storage state, if it has one.
+"""
+import json
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+from metrics import metrics
+
+CACHE_DIR = ".browser-cache"  # one subdirectory per worker thread
+BLOCKED_RESOURCE_TYPES = ("media", "font")
+# Hosts (and their subdomains) the browser may reach besides the portal's own domain, with block_hosts
+DEFAULT_ALLOWED_HOSTS = ()
+# Network.setBlockedURLs patterns ("*" matches anything). Never images, scripts or stylesheets of the portal.
+DEFAULT_BLOCKED_URLS = (
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+    "*://fonts.googleapis.com/*", "*://fonts.gstatic.com/*",
+    "*google-analytics.com/*", "*googletagmanager.com/*", "*doubleclick.net/*",
+    "*connect.facebook.net/*", "*hotjar.com/*", "*nr-data.net/*", "*js-agent.newrelic.com/*",
+)
+
+LAUNCH_ARGS = [
+    "--disable-dev-shm-usage",  # /dev/shm is tiny on most VMs and containers
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-site-isolation-trials",  # the login iframe would otherwise get its own renderer
+    "--disable-features=Translate,MediaRouter,OptimizationHints,BackForwardCache",
+    "--renderer-process-limit=2",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-remote-fonts",
+]
+
+_IP_ADDRESS = re.compile(r"^[\d.]+$|^\[?[0-9a-fA-F:]+\]?$")
+
+
+def base_domain(host):
+    """'enterprise.fadv.com' -> 'fadv.com'; IPs and single-label hosts are returned as-is."""
+    host = (host or "").lower()
+    if not host or _IP_ADDRESS.match(host) or host.count(".") < 1:
+        return host
+    return ".".join(host.split(".")[-2:])
+
+
+def host_allowed(host, allowed):
+    host = (host or "").lower()
+    return any(host == entry or host.endswith("." + entry) for entry in allowed)
+
+
+def apply_storage_state(context, state):
+    """
+    Loads a storage_state() dict into an existing context: persistent contexts
+    can't take storage_state at creation, so cookies are added and localStorage
+    is seeded by an init script on the matching origin.
+    """
+    if state.get("cookies"):
+        context.add_cookies(state["cookies"])
+    origins = {o["origin"]: o.get("localStorage", []) for o in state.get("origins", []) if o.get("localStorage")}
+    if origins:
+        context.add_init_script(
+            "(() => { const items = (%s)[location.origin]; if (!items) return;"
+            " for (const {name, value} of items) { if (localStorage.getItem(name) === null)"
+            " localStorage.setItem(name, value); } })();" % json.dumps(origins)
+        )
+
+
+class BrowserProfile:
+    def __init__(self, allowed_hosts=DEFAULT_ALLOWED_HOSTS, blocked_types=BLOCKED_RESOURCE_TYPES,
+                 cache_dir=CACHE_DIR, route_requests=False, block_hosts=False, enabled=True,
+                 blocked_urls=DEFAULT_BLOCKED_URLS):
+        self.allowed_hosts = tuple(allowed_hosts)
+        self.blocked_urls = tuple(blocked_urls)  # per page over CDP; () turns the blocklist off
+        self.block_hosts = block_hosts  # only the portal's domain and allowed_hosts resolve
+        self.blocked_types = tuple(blocked_types)
+        self.cache_dir = cache_dir  # None launches a throwaway (in-memory cache) context
+        self.route_requests = route_requests
+        self.enabled = enabled
+
+    def allowlist(self, portal_url):
+        """The portal's own domain plus the configured extra hosts."""
+        return (base_domain(urlsplit(portal_url).hostname),) + tuple(h.lower() for h in self.allowed_hosts)
+
+    def launch_args(self, portal_url):
+        if not self.enabled:
+            return []
+        if not self.block_hosts:
+            return list(LAUNCH_ARGS)
+        # Every hostname not excluded resolves to NXDOMAIN; IP literals are never resolved
+        rules = ["MAP * ~NOTFOUND"]
+        for host in self.allowlist(portal_url):
+            if not _IP_ADDRESS.match(host):
+                rules += [f"EXCLUDE {host}", f"EXCLUDE *.{host}"]
+        return LAUNCH_ARGS + ["--host-resolver-rules=" + ", ".join(rules)]
+
+    def profile_dir(self, slot=None):
+        slot = slot or threading.current_thread().name
+        return os.path.abspath(os.path.join(self.cache_dir, re.sub(r"[^\w.-]", "_", slot)))
+
+    def launch(self, playwright, headless, portal_url, storage_state=None, slot=None):
+        """
+        Returns (browser, context), starting from `storage_state` (Playwright's
+        cookies/origins dict) if given. With a cache dir the context is persistent
+        and browser is None (Playwright owns it through the context).
+        """
+        args = self.launch_args(portal_url)
+        if self.cache_dir:
+            context = playwright.chromium.launch_persistent_context(
+                self.profile_dir(slot), headless=headless, args=args,
+            )
+            context.clear_cookies()
+            if storage_state:
+                apply_storage_state(context, storage_state)
+            browser = None
+        else:
+            browser = playwright.chromium.launch(headless=headless, args=args)
+            context = browser.new_context(storage_state=storage_state)
+        if self.enabled and self.blocked_urls:
+            self.install_url_blocklist(context)
+        if self.enabled and self.route_requests:
+            self.install_routes(context, portal_url)
+        return browser, context
+
+    def install_url_blocklist(self, context):
+        """Blocks blocked_urls on every page of the context, present and future, without a route."""
+        patterns = list(self.blocked_urls)
+
+        def on_failed(event):
+            if event.get("blockedReason") == "inspector":
+                metrics.inc("fadv_blocked_requests_total", reason="url", type=str(event.get("type", "other")).lower())
+
+        def block(page):
+            try:
+                session = context.new_cdp_session(page)
+                session.on("Network.loadingFailed", on_failed)
+                session.send("Network.enable")
+                session.send("Network.setBlockedURLs", {"urls": patterns})
+            except Exception as e:
+                print(f"[WARN] URL blocklist not installed on a page: {e}")
+
+        for page in context.pages:
+            block(page)
+        context.on("page", block)
+
+    def install_routes(self, context, portal_url):
+        allowed = self.allowlist(portal_url)
+        blocked_types = set(self.blocked_types)
+
+        def handle(route):
+            request = route.request
+            host = urlsplit(request.url).hostname
+            if request.resource_type in blocked_types:
+                metrics.inc("fadv_blocked_requests_total", reason="type", type=request.resource_type)
+                route.abort()
+            elif self.block_hosts and host and not host_allowed(host, allowed):
+                metrics.inc("fadv_blocked_requests_total", reason="host", type=request.resource_type)
+                route.abort()
+            else:
+                route.continue_()
+
+        context.route("**/*", handle)
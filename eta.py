@@ -0,0 +1,84 @@
+"""
+Throughput tracking and ETA estimation for /status.
+Per-row durations feed an EWMA per flow; the ETA turns remaining rows into work
+seconds (accounting for concurrency and the per-account rate limit) and lays that
+work onto the scheduler's run windows, so work that spills past closing time
+shows up as finishing in the next window.
+"""
+import threading
+from datetime import timedelta
+
+DEFAULT_SECONDS_PER_ROW = 75.0  # prior until real rows have been measured
+
+
+class Ewma:
+    """Exponentially weighted moving average of per-row durations (seconds)."""
+
+    def __init__(self, alpha=0.2, initial=DEFAULT_SECONDS_PER_ROW):
+        self.alpha = alpha
+        self.value = initial
+        self.samples = 0
+        self._lock = threading.Lock()
+
+    def update(self, seconds):
+        with self._lock:
+            if self.samples == 0:
+                self.value = seconds
+            else:
+                self.value = self.alpha * seconds + (1 - self.alpha) * self.value
+            self.samples += 1
+
+
+def effective_seconds_per_row(ewma, concurrency, per_minute):
+    """Wall-clock seconds per row with `concurrency` workers, never faster than the rate limit allows."""
+    parallel = ewma.value / max(int(concurrency), 1)
+    rate_floor = 60.0 / per_minute if per_minute else 0.0
+    return max(parallel, rate_floor)
+
+
+def finish_time(scheduler, now, work_seconds, forced=False, horizon_windows=400):
+    """
+    When `work_seconds` of processing will be done if it only runs inside run windows.
+    A forced run keeps going from now through the end of the next window.
+    Returns None if no window within the horizon can absorb the work.
+    Sums of pytz times are normalized, so an estimate across a DST change keeps
+    the right offset.
+    """
+    if work_seconds <= 0:
+        return now
+    tz = scheduler.tz
+    cursor = now
+    remaining = float(work_seconds)
+    for _ in range(horizon_windows):
+        end = scheduler.current_window_end(cursor)
+        if end is None and forced and cursor == now:
+            next_start = scheduler.next_open(cursor)
+            if next_start is None:
+                return tz.normalize(now + timedelta(seconds=remaining))
+            end = scheduler.current_window_end(next_start)
+        elif end is None:
+            cursor = scheduler.next_open(cursor)
+            if cursor is None:
+                return None
+            end = scheduler.current_window_end(cursor)
+        if end is None:
+            return None
+        available = (end - cursor).total_seconds()
+        if remaining <= available:
+            return tz.normalize(cursor + timedelta(seconds=remaining))
+        remaining -= available
+        cursor = end
+    return None
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "n/a"
+    minutes = int(seconds // 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d {hours}h {minutes}m"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
@@ -0,0 +1,125 @@
+"""
+Server-sent events for the dashboard.
+
+One Broadcaster per process: producers call touch() when status may have changed
+and publish() for one-off events (per-row results). A single publisher thread
+builds the status snapshot once per change and fans the same pre-encoded message
+out to every subscriber, so N open tabs cost the same as one. Each subscriber has
+a bounded buffer; a slow client drops its oldest messages instead of growing.
+"""
+import json
+import queue
+import threading
+import time as t
+
+BUFFER_SIZE = 50  # messages buffered per client
+HEARTBEAT_SECONDS = 15  # keep-alive comment so proxies don't drop idle streams
+REFRESH_SECONDS = 30  # re-check the snapshot even without touch() (ETA drifts with time)
+DEBOUNCE_SECONDS = 0.5  # coalesce bursts of touch() into one snapshot
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class Broadcaster:
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.version = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._snapshot_source = None
+        self._ignore_keys = set()
+        self._last_snapshot = None
+        self._last_message = None
+        self._publisher = None
+
+    def set_snapshot_source(self, source, ignore_keys=()):
+        """`source()` returns the status dict; keys in `ignore_keys` don't count as a change."""
+        self._snapshot_source = source
+        self._ignore_keys = set(ignore_keys)
+
+    def touch(self):
+        """Signals that the status snapshot may have changed."""
+        self._changed.set()
+
+    def publish(self, event, data):
+        with self._lock:
+            self.version += 1
+            message = format_event(event, data, self.version)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            self._offer(subscriber, message)
+        return message
+
+    def _offer(self, subscriber, message):
+        while True:
+            try:
+                subscriber.put_nowait(message)
+                return
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()  # drop the oldest message for this slow client
+                except queue.Empty:
+                    pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def stream(self, heartbeat=HEARTBEAT_SECONDS):
+        """Generator for a Flask streaming response; unsubscribes when the client goes away."""
+        subscriber = queue.Queue(maxsize=self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            first = self._last_message
+        self._ensure_publisher()
+        self.touch()  # make sure the newcomer's snapshot is current
+        try:
+            if first is not None:
+                yield first
+            while True:
+                try:
+                    yield subscriber.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def _ensure_publisher(self):
+        with self._lock:
+            if self._publisher is None or not self._publisher.is_alive():
+                self._publisher = threading.Thread(target=self._publish_loop, name="sse-publisher", daemon=True)
+                self._publisher.start()
+
+    def _publish_loop(self):
+        while True:
+            if self._changed.wait(REFRESH_SECONDS):
+                t.sleep(DEBOUNCE_SECONDS)  # let a burst of touches settle
+            self._changed.clear()
+            if self._snapshot_source is None:
+                continue
+            if not self.subscriber_count():
+                # Nobody is watching: don't build snapshots, and don't serve a stale one later
+                self._last_snapshot = None
+                self._last_message = None
+                continue
+            try:
+                snapshot = self._snapshot_source()
+            except Exception as e:
+                print(f"[WARN] SSE status snapshot failed: {e}")
+                continue
+            comparable = {k: v for k, v in snapshot.items() if k not in self._ignore_keys}
+            if comparable != self._last_snapshot:
+                self._last_snapshot = comparable
+                self._last_message = self.publish("status", snapshot)
+
+
+broadcaster = Broadcaster()
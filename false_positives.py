@@ -0,0 +1,34 @@
+"""
+False-positive reconciliation: finds Applicants rows that were marked Completed
+but appear on the 'False Positives' sheet, so their Status can be cleared and
+the order redone. Pure Python on already-fetched sheet snapshots, no API calls.
+"""
+from sheet_snapshot import COMPLETED
+
+
+def normalize(value):
+    return str(value).strip().lower()
+
+
+class FalsePositiveIndex:
+    """Set of normalized (name, email) pairs from the False Positives sheet, built once per poll."""
+
+    def __init__(self, fp_snapshot):
+        self.keys = {
+            (normalize(name), normalize(email))
+            for name, email in zip(fp_snapshot.column("Name"), fp_snapshot.column("Email Address"))
+        }
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rows_to_reset(self, applicants):
+        """0-based indices of Completed rows of the Applicants snapshot that are listed as false positives."""
+        if not self.keys:
+            return []
+        names = applicants.column("Full Name")
+        emails = applicants.column("Email")
+        return [
+            i for i in applicants.rows_with((COMPLETED,))
+            if (normalize(names[i]), normalize(emails[i])) in self.keys
+        ]
@@ -1,15 +1,27 @@
-from flask import Flask, render_template, request, redirect, jsonify
-from automation_worker import automation_instance
+from flask import Flask, Response, abort, render_template, request, redirect, jsonify
+from automation_worker import DEFAULT_PIPELINE
+from pipelines import registry
+from eta import format_duration
+from events import broadcaster
+from metrics import metrics
 import pytz
-import threading
-from datetime import datetime, timedelta, time
+from datetime import datetime
 
 app = Flask(__name__)
 
+def _pipeline():
+    """The pipeline a request is about: the 'pipeline' form/query field, else the default one."""
+    try:
+        return registry.get(request.values.get("pipeline") or DEFAULT_PIPELINE)
+    except KeyError:
+        abort(404, "Unknown pipeline")
+
+
 @app.route('/')
 def index():
-    status_data = automation_instance.get_status()
+    status_data = _pipeline().get_status()
     return render_template("index.html",
+        pipeline=status_data["pipeline"],
         client_id=status_data["client_id"],
         user_id=status_data["user_id"],
         processed=status_data["applicants_processed"],
@@ -20,36 +32,24 @@ def index():
 
 @app.route('/update', methods=['POST'])
 def update():
-    automation_instance.update_credentials(
-        request.form['client_id'],
-        request.form['user_id'],
-        request.form['password'],
-        request.form['security_question'],
-        request.form['sheet_url']
-    )
+    # A new pipeline name creates that pipeline
+    try:
+        registry.configure(
+            request.form.get('pipeline') or DEFAULT_PIPELINE,
+            request.form['client_id'],
+            request.form['user_id'],
+            request.form['password'],
+            request.form['security_question'],
+            request.form['sheet_url']
+        )
+    except ValueError as e:
+        return str(e), 400
     return redirect("/")
 
 @app.route('/start', methods=['POST'])
 def start_now():
-    est = pytz.timezone('US/Eastern')
-    now = datetime.now(est)
-    
-    if 8 <= now.hour < 20:
-        automation_instance.run()
-    else:
-        # Remove this line: automation_instance.set_status("Sleeping until 8am GMT-5")
-        automation_instance.stop()  # Ensure any existing process stops
-        automation_instance.set_status("Sleeping until 8am EST")
-        
-        # Calculate time until next 8am
-        next_run = est.localize(datetime.combine(
-            now.date() + timedelta(days=1 if now.hour >= 20 else 0),
-            time(8, 0)
-        ))
-        wait_seconds = (next_run - now).total_seconds()
-        
-        threading.Timer(wait_seconds, automation_instance.run).start()
-    
+    # Runs now inside business hours, otherwise schedules a single resume
+    _pipeline().start()
     return redirect("/")
 
 
@@ -59,32 +59,61 @@ def internal_error(error):
 
 @app.route('/stop', methods=['POST'])
 def stop_now():
-    automation_instance.stop()
+    _pipeline().stop()
     return redirect("/")
 
 @app.route('/force-start', methods=['POST'])
 def force_start():
-    automation_instance.run(force=True)
+    _pipeline().run(force=True)
+    return redirect("/")
+
+@app.route('/remove', methods=['POST'])
+def remove_pipeline():
+    try:
+        registry.remove(request.form['pipeline'])
+    except ValueError as e:
+        return str(e), 400
+    except KeyError:
+        abort(404, "Unknown pipeline")
     return redirect("/")
 
 @app.route('/status')
 def status():
-    status_data = automation_instance.get_status()
-    remaining = max(status_data["applicants_total"] - status_data["applicants_processed"], 0)
-    est = pytz.timezone('US/Eastern')
-    current_time = datetime.now(est).strftime("%Y-%m-%d %H:%M:%S ET")
-    estimated_seconds = remaining * 75
-    eta_minutes = estimated_seconds // 60
-    eta_seconds = estimated_seconds % 60
-    eta = f"{int(eta_minutes)}m {int(eta_seconds)}s" if remaining else "0m 0s"
+    return jsonify(status_payload())
 
-    status_data = automation_instance.get_status()
 
-    eta_applicants = f"{(max(status_data['applicants_total'] - status_data['applicants_processed'], 0) * 75) // 60}m"
-    eta_pending = f"{(max(status_data['pending_total'] - status_data['pending_processed'], 0) * 75) // 60}m"
+@app.route('/events')
+def events():
+    # One shared broadcaster builds each snapshot once for every connected tab
+    return Response(
+        broadcaster.stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
-    return jsonify({
+def status_payload():
+    """
+    The default pipeline's status at the top level (as before pipelines existed),
+    plus every pipeline's under "pipelines".
+    """
+    est = pytz.timezone('US/Eastern')
+    current_time = datetime.now(est).strftime("%Y-%m-%d %H:%M:%S ET")
+    statuses = registry.statuses()
+    default = statuses[0]
+    return {
         "current_time": current_time,
+        **_pipeline_payload(default),
+        "eta_applicants_finish": default["eta_applicants_finish"],
+        "eta_pending_finish": default["eta_pending_finish"],
+        "pipelines": [_pipeline_payload(status_data) for status_data in statuses],
+    }
+
+
+def _pipeline_payload(status_data):
+    # No finish timestamps here: they move every second and would make each snapshot look new
+    return {
+        "pipeline": status_data["pipeline"],
         "client_id": status_data["client_id"],
         "user_id": status_data["user_id"],
         "sheet_url": status_data["sheet_url"],
@@ -93,11 +122,39 @@ def status():
         "applicants_total": status_data["applicants_total"],
         "pending_processed": status_data["pending_processed"],
         "pending_total": status_data["pending_total"],
+        "applicants_invalid": status_data["applicants_invalid"],
+        "pending_invalid": status_data["pending_invalid"],
+        "applicants_archived": status_data["applicants_archived"],
+        "pending_archived": status_data["pending_archived"],
         "orders_placed": status_data["orders_placed"],
-        "eta_applicants": eta_applicants,
-        "eta_pending": eta_pending
-    })
+        "eta_applicants": _eta_text(status_data, "applicants"),
+        "eta_pending": _eta_text(status_data, "pending"),
+        "seconds_per_row_applicants": status_data["seconds_per_row_applicants"],
+        "seconds_per_row_pending": status_data["seconds_per_row_pending"],
+        "next_run": status_data["next_run"]
+    }
+
+
+# Fields that change on every call; they don't make a snapshot "new" for /events
+broadcaster.set_snapshot_source(
+    status_payload, ignore_keys=("current_time", "eta_applicants_finish", "eta_pending_finish")
+)
+
+
+def _eta_text(status_data, key):
+    """'42m', or '3h 10m (finishes Tue 09:40 AM)' when the work rolls over into a later window."""
+    text = format_duration(status_data[f"eta_{key}_seconds"])
+    finish = status_data[f"eta_{key}_finish"]
+    if finish and status_data[f"eta_{key}_rolls_over"]:
+        text += f" (finishes {datetime.fromisoformat(finish).strftime('%a %I:%M %p')})"
+    return text
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5001)
+    app.run(host="0.0.0.0", port=5001, threaded=True)
@@ -8,7 +8,8 @@ REQUIREMENTS = [
     "gspread",
     "oauth2client",
     "apscheduler",
-    "pytz"
+    "pytz",
+    "cryptography"
 ]
 
 def run(command):
@@ -0,0 +1,463 @@
+import sqlite3
+import threading
+import time as t
+
+DEFAULT_DB_PATH = "fadv_state.db"
+DEFAULT_LEASE_SECONDS = 15 * 60
+
+# Row states mirrored from the sheet's Status column
+PENDING = "pending"
+PROCESSING = "processing"
+COMPLETED = "completed"
+ERROR = "error"
+INVALID = "invalid"  # rejected by row validation; never sent to the portal
+
+# Submitted-orders index states (one record per order_key)
+ORDER_SENDING = "sending"  # handed to the portal; outcome unknown until confirmed
+ORDER_SUBMITTED = "submitted"
+ORDER_REDO = "redo"  # a False Positives reset (or a person clearing a held row) allows one more submission
+ORDER_REVIEW = "review"  # the lookup found the subject in FADV; held until a person clears the row
+
+# claim_order() decisions
+SUBMIT = "submit"  # no known order: go ahead
+VERIFY = "verify"  # an earlier attempt may have gone through: look the subject up first
+DUPLICATE = "duplicate"  # already ordered: skip
+BUSY = "busy"  # another row with the same order is in flight right now
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    sheet_url TEXT NOT NULL,
+    worksheet TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    row_number INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    lease_expires_at REAL,
+    retry_at REAL,
+    PRIMARY KEY (sheet_url, worksheet, row_key)
+);
+CREATE TABLE IF NOT EXISTS orders (
+    order_key TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    sheet_url TEXT NOT NULL,
+    worksheet TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    redone INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    sheet_url TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (sheet_url, name)
+);
+CREATE TABLE IF NOT EXISTS archived (
+    sheet_url TEXT NOT NULL,
+    worksheet TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    archived_at REAL NOT NULL,
+    order_placed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (sheet_url, worksheet, row_key, completed_at)
+);
+"""
+
+
+def _iter_keys(pairs):
+    seen = {}
+    for i, (email, name) in enumerate(pairs):
+        email = str(email).strip().lower()
+        name = str(name).strip().lower()
+        base = f"{email}|{name}" if (email or name) else f"#row{i + 2}"
+        seen[base] = seen.get(base, 0) + 1
+        yield base if seen[base] == 1 else f"{base}|#{seen[base]}"
+
+
+def iter_row_keys(rows):
+    """
+    Stable identity for each sheet row: normalized email + full name, with an
+    occurrence suffix for repeats so duplicated rows stay distinct.
+    Rows with neither fall back to their position. Works on any iterable, one row at a time.
+    """
+    return _iter_keys((row.get("Email", ""), row.get("Full Name", "")) for row in rows)
+
+
+def column_row_keys(emails, names):
+    """iter_row_keys for a column-oriented sheet: the Email and Full Name columns."""
+    return list(_iter_keys(zip(emails, names)))
+
+
+def _normalize(value):
+    return " ".join(str(value).split()).lower()
+
+
+def order_key(row):
+    """
+    Idempotency key of the order an Applicants row places: normalized email,
+    package and company. None when the row has no email.
+    """
+    email = _normalize(row.get("Email", ""))
+    if not email:
+        return None
+    return "|".join((email, _normalize(row.get("Package", "")), _normalize(row.get("Company ID", ""))))
+
+
+class JobStore:
+    """
+    Local SQLite store of sheet rows and their processing state.
+    Tracks attempts, last error and a lease for rows being worked on, so a crashed
+    run's Processing rows can be reclaimed and counters survive restarts without
+    rescanning the sheets. Rows compacted out of the sheets are kept in a ledger
+    so they still count. It also keeps the index of submitted orders that makes
+    order submission idempotent across rows and sheets. Safe to share between worker threads.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, lease_seconds=DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "retry_at" not in columns:  # stores created before retries existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN retry_at REAL")
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(archived)")}
+        if "order_placed" not in columns:
+            self._conn.execute("ALTER TABLE archived ADD COLUMN order_placed INTEGER NOT NULL DEFAULT 0")
+
+    def sync(self, sheet_url, worksheet, keys, states):
+        """
+        Mirrors the sheet's current rows (their keys and states, in sheet order) into
+        the store: inserts new rows, refreshes row numbers and states, and drops rows
+        no longer on the sheet. Attempts, errors and leases are kept, except that a
+        row reset on the sheet after Error/Invalid starts over with no attempts, and
+        an order held for review on a row a person reset may be sent once.
+        """
+        now = t.time()
+        params = [
+            (sheet_url, worksheet, key, i + 2, state, now, now)
+            for i, (key, state) in enumerate(zip(keys, states))
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen (row_key TEXT PRIMARY KEY)")
+                self._conn.execute("DELETE FROM seen")
+                self._conn.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((k,) for k in keys))
+                self._conn.executemany(
+                    """
+                    UPDATE orders SET state = ?, updated_at = ?
+                    WHERE state = ? AND sheet_url = ? AND worksheet = ? AND row_key = ? AND EXISTS (
+                        SELECT 1 FROM jobs WHERE sheet_url = ? AND worksheet = ? AND row_key = ? AND state = 'error')
+                    """,
+                    ((ORDER_REDO, now, ORDER_REVIEW, sheet_url, worksheet, key, sheet_url, worksheet, key)
+                     for key, state in zip(keys, states) if state == PENDING),
+                )
+                self._conn.executemany(
+                    """
+                    INSERT INTO jobs (sheet_url, worksheet, row_key, row_number, state, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (sheet_url, worksheet, row_key) DO UPDATE SET
+                        row_number = excluded.row_number,
+                        updated_at = CASE WHEN jobs.state != excluded.state
+                                          THEN excluded.updated_at ELSE jobs.updated_at END,
+                        attempts = CASE WHEN jobs.state IN ('error', 'invalid') AND excluded.state = 'pending'
+                                        THEN 0 ELSE jobs.attempts END,
+                        retry_at = CASE WHEN excluded.state = 'pending' THEN jobs.retry_at ELSE NULL END,
+                        state = excluded.state
+                    """,
+                    params,
+                )
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE sheet_url = ? AND worksheet = ? AND row_key NOT IN (SELECT row_key FROM seen)",
+                    (sheet_url, worksheet),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return keys
+
+    def claim(self, sheet_url, worksheet, row_key, row_number):
+        """Marks a row Processing under a fresh lease, counts the attempt and returns the attempt number."""
+        now = t.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (sheet_url, worksheet, row_key, row_number, state, attempts,
+                                  created_at, updated_at, lease_expires_at)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT (sheet_url, worksheet, row_key) DO UPDATE SET
+                    row_number = excluded.row_number,
+                    state = excluded.state,
+                    attempts = jobs.attempts + 1,
+                    updated_at = excluded.updated_at,
+                    lease_expires_at = excluded.lease_expires_at,
+                    retry_at = NULL
+                """,
+                (sheet_url, worksheet, row_key, row_number, PROCESSING, now, now, now + self.lease_seconds),
+            )
+            (attempts,) = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE sheet_url = ? AND worksheet = ? AND row_key = ?",
+                (sheet_url, worksheet, row_key),
+            ).fetchone()
+        return attempts
+
+    def finish(self, sheet_url, worksheet, row_key, success, error=None, retry_at=None):
+        """
+        Records a row's outcome. A failure with `retry_at` (epoch seconds) goes back
+        to pending and isn't handed out again before then; otherwise it is final.
+        """
+        if success:
+            state = COMPLETED
+        else:
+            state = PENDING if retry_at is not None else ERROR
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET state = ?, last_error = ?, updated_at = ?, lease_expires_at = NULL, retry_at = ?
+                WHERE sheet_url = ? AND worksheet = ? AND row_key = ?
+                """,
+                (state, None if success else error, t.time(), retry_at, sheet_url, worksheet, row_key),
+            )
+
+    def deferred(self, sheet_url, worksheet):
+        """Keys of rows waiting out a retry backoff."""
+        with self._lock:
+            return {
+                key for (key,) in self._conn.execute(
+                    "SELECT row_key FROM jobs WHERE sheet_url = ? AND worksheet = ? AND retry_at > ?",
+                    (sheet_url, worksheet, t.time()),
+                )
+            }
+
+    def reject(self, sheet_url, worksheet, row_key, row_number, error):
+        """Records a row that failed validation (no attempt is counted)."""
+        now = t.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs (sheet_url, worksheet, row_key, row_number, state, last_error,
+                                  created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (sheet_url, worksheet, row_key) DO UPDATE SET
+                    row_number = excluded.row_number,
+                    state = excluded.state,
+                    last_error = excluded.last_error,
+                    updated_at = excluded.updated_at,
+                    lease_expires_at = NULL
+                """,
+                (sheet_url, worksheet, row_key, row_number, INVALID, error, now, now),
+            )
+
+    def expire_leases(self, sheet_url):
+        """Called on start: nothing is in flight yet, so every open lease is from a dead run."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = 0 WHERE sheet_url = ? AND lease_expires_at IS NOT NULL",
+                (sheet_url,),
+            )
+
+    def stale_processing(self, sheet_url, worksheet, row_keys_):
+        """
+        Of the given keys (rows the sheet shows as Processing), returns those with no
+        live lease: crashed runs, or Processing written before the store existed.
+        """
+        if not row_keys_:
+            return set()
+        now = t.time()
+        with self._lock:
+            live = {
+                key for (key,) in self._conn.execute(
+                    "SELECT row_key FROM jobs WHERE sheet_url = ? AND worksheet = ? AND lease_expires_at > ?",
+                    (sheet_url, worksheet, now),
+                )
+            }
+        return set(row_keys_) - live
+
+    def counts(self, sheet_url):
+        """{worksheet: {state: n, 'total': n}} for one spreadsheet."""
+        out = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worksheet, state, COUNT(*) FROM jobs WHERE sheet_url = ? GROUP BY worksheet, state",
+                (sheet_url,),
+            ).fetchall()
+        for worksheet, state, n in rows:
+            bucket = out.setdefault(worksheet, {"total": 0})
+            bucket[state] = n
+            bucket["total"] += n
+        return out
+
+    def completed_before(self, sheet_url, worksheet, cutoff):
+        """{row_key: completed_at} for rows Completed before `cutoff` (epoch seconds)."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT row_key, updated_at FROM jobs WHERE sheet_url = ? AND worksheet = ? AND state = ? "
+                "AND updated_at < ?",
+                (sheet_url, worksheet, COMPLETED, cutoff),
+            ))
+
+    def archived_keys(self, sheet_url, worksheet):
+        """(row_key, completed_at) of every row already copied to the archive."""
+        with self._lock:
+            return set(self._conn.execute(
+                "SELECT row_key, completed_at FROM archived WHERE sheet_url = ? AND worksheet = ?",
+                (sheet_url, worksheet),
+            ))
+
+    def record_archived(self, sheet_url, worksheet, entries):
+        """
+        Adds [(row_key, completed_at, order_placed)] to the ledger of archived rows;
+        order_placed marks Pending Review rows whose OrderStatus was "placed".
+        """
+        now = t.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO archived (sheet_url, worksheet, row_key, completed_at, archived_at, order_placed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                ((sheet_url, worksheet, key, completed_at, now, int(placed)) for key, completed_at, placed in entries),
+            )
+
+    def archived_counts(self, sheet_url):
+        """
+        {worksheet: {"rows": n, "orders_placed": n}} of archived rows for one
+        spreadsheet. Rows archived but still on the sheet (their deletion failed) are
+        left out, as the sheet and the jobs table still count them.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT a.worksheet, COUNT(*), SUM(a.order_placed) FROM archived a
+                WHERE a.sheet_url = ? AND NOT EXISTS (
+                    SELECT 1 FROM jobs j
+                    WHERE j.sheet_url = a.sheet_url AND j.worksheet = a.worksheet AND j.row_key = a.row_key
+                      AND j.state = 'completed' AND j.updated_at = a.completed_at
+                )
+                GROUP BY a.worksheet
+                """,
+                (sheet_url,),
+            ).fetchall()
+        return {worksheet: {"rows": n, "orders_placed": placed or 0} for worksheet, n, placed in rows}
+
+    def claim_order(self, key, sheet_url, worksheet, row_key):
+        """
+        Decides whether a row may submit order `key` and, for SUBMIT/VERIFY, records
+        it as sending under this row. Atomic, so two duplicate rows running at the
+        same time can't both get SUBMIT. A sending record older than the lease
+        belongs to a dead run and is taken over with VERIFY, and so is an order held
+        for review (see sync for how a person releases it).
+        """
+        now = t.time()
+        owner = (sheet_url, worksheet, row_key)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                record = self._conn.execute(
+                    "SELECT state, sheet_url, worksheet, row_key, updated_at FROM orders WHERE order_key = ?", (key,)
+                ).fetchone()
+                if record is None:
+                    decision = SUBMIT
+                elif record[0] == ORDER_SUBMITTED:
+                    decision = DUPLICATE
+                elif record[0] == ORDER_REDO:
+                    decision = SUBMIT
+                elif record[0] == ORDER_REVIEW or tuple(record[1:4]) == owner \
+                        or record[4] < now - self.lease_seconds:
+                    decision = VERIFY
+                else:
+                    decision = BUSY
+                if decision in (SUBMIT, VERIFY):
+                    self._conn.execute(
+                        """
+                        INSERT INTO orders (order_key, state, sheet_url, worksheet, row_key, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (order_key) DO UPDATE SET
+                            state = excluded.state,
+                            sheet_url = excluded.sheet_url,
+                            worksheet = excluded.worksheet,
+                            row_key = excluded.row_key,
+                            updated_at = excluded.updated_at
+                        """,
+                        (key, ORDER_SENDING, sheet_url, worksheet, row_key, now, now),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return decision
+
+    def order_submitted(self, key):
+        """True if order `key` is known to be placed (read-only; see claim_order)."""
+        with self._lock:
+            row = self._conn.execute("SELECT state FROM orders WHERE order_key = ?", (key,)).fetchone()
+        return row is not None and row[0] == ORDER_SUBMITTED
+
+    def confirm_order(self, key):
+        """The portal has the order (submitted now, or found by the lookup)."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE orders SET state = ?, updated_at = ? WHERE order_key = ?", (ORDER_SUBMITTED, t.time(), key)
+            )
+
+    def hold_order(self, key):
+        """The lookup found the subject but can't tell whether it is this order: a person decides."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE orders SET state = ?, updated_at = ? WHERE order_key = ?", (ORDER_REVIEW, t.time(), key)
+            )
+
+    def release_order(self, key):
+        """The attempt failed before anything was sent: forget it (or give the redo back)."""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM orders WHERE order_key = ? AND state = ? AND redone = 0", (key, ORDER_SENDING)
+            )
+            self._conn.execute(
+                "UPDATE orders SET state = ?, updated_at = ? WHERE order_key = ? AND state = ? AND redone = 1",
+                (ORDER_REDO, t.time(), key, ORDER_SENDING),
+            )
+
+    def can_redo(self, key):
+        """True unless this order was already redone once after a False Positives reset."""
+        with self._lock:
+            row = self._conn.execute("SELECT redone FROM orders WHERE order_key = ?", (key,)).fetchone()
+        return row is None or not row[0]
+
+    def allow_redo(self, key, sheet_url, worksheet, row_key):
+        """Lets a False Positives reset submit the order once more (only the first reset counts)."""
+        now = t.time()
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO orders (order_key, state, sheet_url, worksheet, row_key, redone, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT (order_key) DO UPDATE SET state = excluded.state, redone = 1,
+                    updated_at = excluded.updated_at
+                WHERE orders.redone = 0
+                """,
+                (key, ORDER_REDO, sheet_url, worksheet, row_key, now, now),
+            )
+
+    def set_meta(self, sheet_url, name, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta VALUES (?, ?, ?) ON CONFLICT (sheet_url, name) DO UPDATE SET value = excluded.value",
+                (sheet_url, name, int(value)),
+            )
+
+    def get_meta(self, sheet_url, name, default=0):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE sheet_url = ? AND name = ?", (sheet_url, name)
+            ).fetchone()
+        return row[0] if row else default
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,128 @@
+"""
+In-process metrics (latency summaries and counters) rendered in the Prometheus
+text exposition format for the /metrics endpoint.
+
+Latencies keep a sliding window of recent samples per label set, so p50/p95/p99
+reflect current behaviour rather than the whole process lifetime.
+"""
+import threading
+import time as t
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+WINDOW = 1000  # samples kept per latency series
+
+HELP = {
+    "fadv_step_duration_seconds": "Duration of each portal automation step.",
+    "fadv_step_errors_total": "Portal automation steps that raised, by step.",
+    "fadv_row_duration_seconds": "End-to-end duration of one sheet row.",
+    "fadv_rows_total": "Rows processed, by flow and result.",
+    "fadv_sheets_api_seconds": "Latency of Google Sheets API calls.",
+    "fadv_sheets_api_calls_total": "Google Sheets API calls, by operation.",
+    "fadv_sheets_api_errors_total": "Google Sheets API calls that failed, by operation.",
+    "fadv_blocked_requests_total": "Browser requests aborted by the resource-blocking profile.",
+    "fadv_duplicate_orders_total": "Orders not resubmitted because they were already placed, by where that was found.",
+    "fadv_orders_held_for_review_total": "Orders not sent because the subject was already in FADV; held for a person.",
+    "fadv_archived_rows_total": "Completed rows moved from the hot sheets to the archive, by worksheet.",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    index = min(int(round(q * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class _Latency:
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = {}  # name -> {label_key: _Latency}
+        self._counters = {}  # name -> {label_key: float}
+
+    def observe(self, name, seconds, **labels):
+        with self._lock:
+            series = self._latencies.setdefault(name, {}).setdefault(_label_key(labels), _Latency())
+            series.samples.append(seconds)
+            series.count += 1
+            series.total += seconds
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def quantiles(self, name, **labels):
+        """{q: seconds} over the recent window for one series (empty if never observed)."""
+        with self._lock:
+            series = self._latencies.get(name, {}).get(_label_key(labels))
+            values = sorted(series.samples) if series else []
+        return {q: _quantile(values, q) for q in QUANTILES} if values else {}
+
+    @contextmanager
+    def sheets_call(self, op):
+        """Times one Sheets API call and counts it (and its failure, if it raises)."""
+        start = t.monotonic()
+        self.inc("fadv_sheets_api_calls_total", op=op)
+        try:
+            yield
+        except Exception:
+            self.inc("fadv_sheets_api_errors_total", op=op)
+            raise
+        finally:
+            self.observe("fadv_sheets_api_seconds", t.monotonic() - start, op=op)
+
+    def step_observer(self, flow):
+        """Callback for TimingProfile: records each step's latency and errors under `flow`."""
+        def observe(step, seconds, failed):
+            self.observe("fadv_step_duration_seconds", seconds, flow=flow, step=step)
+            if failed:
+                self.inc("fadv_step_errors_total", flow=flow, step=step)
+        return observe
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._latencies):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} summary")
+                for key, series in sorted(self._latencies[name].items()):
+                    values = sorted(series.samples)
+                    for q in QUANTILES:
+                        lines.append(f"{name}{_format_labels(key, [('quantile', q)])} {_quantile(values, q):.6f}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {series.total:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {series.count}")
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry, like prometheus_client's default REGISTRY
+metrics = Metrics()
@@ -0,0 +1,116 @@
+"""
+Cached label -> value index for the New Subject dropdowns.
+
+All options of the package, company, facility and position selects are read in a
+single evaluate() and kept per CSP ID (the package list depends on it; the other
+lists are read alongside). Later rows resolve labels in Python and select by value,
+so a row costs no extra browser round trips for option lookups. The index is shared
+by all workers (option values don't depend on the browser) and can also be used to
+check a row before any browser is opened.
+"""
+import threading
+
+PACKAGE_SELECT = "select#CDC_NEW_SUBJECT_PACKAGE_LABEL"
+COMPANY_SELECT = "select#Company\\ ID"
+FACILITY_SELECT = "select#Facility\\ ID"
+POSITION_SELECT = "select#Position\\ Type"
+
+SELECTS = {
+    "package": PACKAGE_SELECT,
+    "company": COMPANY_SELECT,
+    "facility": FACILITY_SELECT,
+    "position": POSITION_SELECT,
+}
+
+_READ_OPTIONS_JS = """
+(selects) => {
+  const out = {};
+  for (const [field, sel] of Object.entries(selects)) {
+    const el = document.querySelector(sel);
+    out[field] = el ? Array.from(el.options)
+      .filter(o => o.value !== '')
+      .map(o => [o.textContent.trim(), o.value]) : [];
+  }
+  return out;
+}
+"""
+
+_READY_JS = """
+([selects, n]) => selects.every(sel => {
+  const el = document.querySelector(sel); return !!el && el.options.length >= n;
+})
+"""
+
+
+def normalize_label(text):
+    return " ".join(str(text or "").split()).lower()
+
+
+class OptionIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_csp = {}  # csp id -> {field: [(normalized label, value)]}
+
+    def invalidate(self, csp_id=None):
+        with self._lock:
+            if csp_id is None:
+                self._by_csp.clear()
+            else:
+                self._by_csp.pop(str(csp_id), None)
+
+    def has(self, csp_id):
+        with self._lock:
+            return str(csp_id) in self._by_csp
+
+    def load(self, page, csp_id, timeout, fields=("package", "company", "position")):
+        """
+        Waits until the given dropdowns are populated for the selected CSP ID and
+        reads every option of every dropdown in one round trip.
+        """
+        page.wait_for_function(_READY_JS, arg=[[SELECTS[f] for f in fields], 2], timeout=timeout)
+        raw = page.evaluate(_READ_OPTIONS_JS, SELECTS)
+        with self._lock:
+            index = self._by_csp.setdefault(str(csp_id), {})
+            for field, options in raw.items():
+                if options:  # a dependent list may not be populated yet; keep what we had
+                    index[field] = [(normalize_label(label), value) for label, value in options]
+
+    def lookup(self, csp_id, field, label):
+        """
+        The option value for `label`, or None if it isn't offered (or the CSP ID
+        hasn't been indexed yet). Packages match as a substring of the option text,
+        like the sheet's short package names; other fields match the whole label.
+        """
+        with self._lock:
+            options = self._by_csp.get(str(csp_id), {}).get(field)
+        if not options:
+            return None
+        wanted = normalize_label(label)
+        if not wanted:
+            return None
+        for text, value in options:
+            if text == wanted:
+                return value
+        if field == "package":
+            for text, value in options:
+                if wanted in text:
+                    return value
+        return None
+
+    def export(self, csp_id):
+        """Plain-data copy of one CSP ID's entry, for handing to another process (empty if unknown)."""
+        with self._lock:
+            return {field: [list(option) for option in options]
+                    for field, options in self._by_csp.get(str(csp_id), {}).items()}
+
+    def merge(self, csp_id, entry):
+        """Adds an entry produced by export() elsewhere; non-empty lists replace ours."""
+        with self._lock:
+            index = self._by_csp.setdefault(str(csp_id), {})
+            for field, options in entry.items():
+                if options:
+                    index[field] = [tuple(option) for option in options]
+
+    def labels(self, csp_id, field):
+        with self._lock:
+            return [text for text, _ in self._by_csp.get(str(csp_id), {}).get(field, [])]
@@ -0,0 +1,63 @@
+"""
+Optional JSON settings file for the manager process, read once at startup.
+
+Top-level sections apply to every pipeline; a pipeline's entry under "pipelines"
+overrides them key by key. Anything left out keeps the built-in default; the
+"location_map" section adds to (or, with null, removes from) portal_worker.LOCATION_MAP.
+
+    {
+      "schedule": {
+        "windows": [{"days": [0, 1, 2, 3, 4], "start": "08:00", "end": "20:00"}],
+        "holidays": ["2026-12-25"]
+      },
+      "location_map": {"raleigh": "00261 - RALEIGH, NC"},
+      "pipelines": {
+        "nights": {"schedule": {"windows": [{"days": [0, 1, 2, 3, 4], "start": "22:00", "end": "06:00"}]}}
+      }
+    }
+"""
+import json
+
+from portal_worker import LOCATION_MAP
+
+CONFIG_PATH = "fadv_config.json"
+
+
+def load_config(path=CONFIG_PATH):
+    """The parsed settings file, or {} if there is none. A malformed file raises ValueError."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise ValueError(f"{path} is not valid JSON: {e}")
+    if not isinstance(config, dict):
+        raise ValueError(f"{path} must hold a JSON object")
+    print(f"[INFO] Loaded settings from {path}.")
+    return config
+
+
+def pipeline_settings(config, name):
+    """Settings for pipeline `name`: each top-level section updated with the pipeline's own."""
+    own = config.get("pipelines", {}).get(name, {})
+    settings = {}
+    for section in set(config) | set(own):
+        if section == "pipelines":
+            continue
+        merged = dict(config.get(section) or {})
+        merged.update(own.get(section) or {})
+        settings[section] = merged
+    return settings
+
+
+def location_map(settings):
+    """Sheet "Location" (lower-case) -> FADV facility label: the built-in map with the settings applied."""
+    mapping = dict(LOCATION_MAP)
+    for location, facility in (settings.get("location_map") or {}).items():
+        key = str(location).strip().lower()
+        if facility:
+            mapping[key] = str(facility)
+        else:
+            mapping.pop(key, None)
+    return mapping
@@ -0,0 +1,83 @@
+"""
+Named pipelines in one manager process.
+
+A pipeline is one FirstAdvantageAutomation: its own FADV account, intake
+spreadsheet, run schedule, counters and status. Every pipeline shares the
+registry's Sheets client, job store and SharedWorkerPool, so browsers are capped
+and handed out fairly across all of them instead of per copy of the app. Run
+schedules come from the settings file (pipeline_config), read once at startup.
+"""
+import re
+import threading
+
+from automation_worker import DEFAULT_PIPELINE, FirstAdvantageAutomation
+from job_store import JobStore
+from pipeline_config import load_config, pipeline_settings
+from sheets_client import SheetsClient
+from worker_pool import SharedWorkerPool
+
+_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,40}$")
+
+
+class PipelineRegistry:
+    def __init__(self, concurrency=2, job_store=None, sheets_client=None, config=None):
+        self.config = load_config() if config is None else config
+        self.job_store = job_store or JobStore()
+        self.sheets_client = sheets_client or SheetsClient()
+        self.pool = SharedWorkerPool(concurrency).start()
+        self._pipelines = {}
+        self._lock = threading.Lock()
+        self.add(DEFAULT_PIPELINE)
+
+    def add(self, name):
+        """Creates the pipeline `name` (or returns it if it already exists)."""
+        if not _NAME.match(name or ""):
+            raise ValueError("Pipeline names are 1-40 letters, digits, '.', '_' or '-'")
+        with self._lock:
+            pipeline = self._pipelines.get(name)
+            if pipeline is None:
+                pipeline = FirstAdvantageAutomation(job_store=self.job_store, sheets_client=self.sheets_client,
+                                                    name=name, shared_pool=self.pool)
+                pipeline.apply_settings(pipeline_settings(self.config, name))
+                self._pipelines[name] = pipeline
+            return pipeline
+
+    def get(self, name=DEFAULT_PIPELINE):
+        """The pipeline called `name`; KeyError if there is none."""
+        with self._lock:
+            return self._pipelines[name or DEFAULT_PIPELINE]
+
+    def all(self):
+        with self._lock:
+            return list(self._pipelines.values())
+
+    def configure(self, name, client_id, user_id, password, sec_question, sheet_url):
+        """
+        Sets a pipeline's account and spreadsheet, creating the pipeline if needed.
+        Two pipelines on one spreadsheet would order its rows twice, so that is refused.
+        """
+        for other in self.all():
+            if other.name != name and other.sheet_url == sheet_url:
+                raise ValueError(f"That spreadsheet is already used by pipeline '{other.name}'")
+        pipeline = self.add(name)
+        pipeline.update_credentials(client_id, user_id, password, sec_question, sheet_url)
+        return pipeline
+
+    def remove(self, name):
+        """Stops and forgets a pipeline. The default pipeline always exists."""
+        if name == DEFAULT_PIPELINE:
+            raise ValueError("The default pipeline can't be removed")
+        with self._lock:
+            pipeline = self._pipelines.pop(name)
+        pipeline.stop()
+
+    def statuses(self):
+        """get_status() of every pipeline, default first."""
+        return [pipeline.get_status() for pipeline in self.all()]
+
+    def stop_all(self):
+        for pipeline in self.all():
+            pipeline.stop()
+
+
+registry = PipelineRegistry()
@@ -0,0 +1,235 @@
+from playwright.sync_api import sync_playwright
+from contextlib import nullcontext
+
+from browser_profile import BrowserProfile
+
+PORTAL_URL = "https://enterprise.fadv.com/"
+LOGIN_IFRAME = "#new-login-iframe"
+MENU_LINK = "div#EE_MENU_PROFILE_ADVANTAGE > table > tbody > tr:first-child a"
+NEW_SUBJECT_ITEM = "div#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span"
+
+# Upper bounds (ms) for each readiness condition; steps return as soon as the
+# condition holds, these only cap how long a slow portal is tolerated.
+DEFAULT_TIMEOUTS = {
+    "page_load": 30000,
+    "login_step": 20000,
+    "menu": 60000,
+    "form": 45000,
+    "options": 30000,
+    "send": 30000,
+    "search": 30000,
+}
+
+
+def fill_shadow_input(component, value, frame):
+    shadow_input = frame.locator(component).evaluate_handle("el => el.shadowRoot.querySelector('input')")
+    shadow_input.as_element().fill(value)
+
+
+def wait_for_options(page, select_selector, timeout, min_count=2):
+    """
+    Waits until a <select> has been populated with at least `min_count` options
+    (GWT fills dependent dropdowns asynchronously after the parent changes).
+    """
+    page.wait_for_function(
+        "([sel, n]) => { const el = document.querySelector(sel); return !!el && el.options.length >= n; }",
+        arg=[select_selector, min_count],
+        timeout=timeout,
+    )
+
+
+def wait_for_option_value(page, select_selector, value, timeout):
+    """Waits until a <select> offers an option with the given value."""
+    page.wait_for_function(
+        "([sel, v]) => { const el = document.querySelector(sel);"
+        " return !!el && Array.from(el.options).some(o => o.value === v); }",
+        arg=[select_selector, str(value)],
+        timeout=timeout,
+    )
+
+
+class PortalSession:
+    """
+    Keeps one logged-in FADV browser session (browser, context, page) alive across rows.
+    Playwright's sync API is bound to the thread that started it, so a session must be
+    opened, used and closed from the same worker thread.
+    """
+
+    def __init__(self, client_id, user_id, password, sec_question, headless=True, timeouts=None,
+                 portal_url=PORTAL_URL, browser_profile=None, state_store=None, profile_slot=None):
+        self.client_id = client_id
+        self.user_id = user_id
+        self.password = password
+        self.sec_question = sec_question
+        self.headless = headless
+        self.portal_url = portal_url
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self.browser_profile = browser_profile or BrowserProfile()
+        self.state_store = state_store  # session_state.SessionStateStore, or None to always log in
+        self.profile_slot = profile_slot  # names this session's browser profile dir (default: thread name)
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.logged_in = False
+        self.logins = 0
+        self.restored = 0  # logins skipped thanks to the saved storage state
+
+    def matches(self, client_id, user_id, password, sec_question):
+        """True if this session was opened with the given credentials."""
+        return (self.client_id, self.user_id, self.password, self.sec_question) == \
+            (client_id, user_id, password, sec_question)
+
+    def start(self):
+        """Launches the browser/context/page if they are not already alive."""
+        if self._playwright is None:
+            self._playwright = sync_playwright().start()
+        if self.context is None or (self.browser is not None and not self.browser.is_connected()):
+            self.browser, self.context = self.browser_profile.launch(
+                self._playwright, self.headless, self.portal_url, storage_state=self._load_state(),
+                slot=self.profile_slot)
+            self.context.on("close", self._on_context_closed)
+            self.page = None
+        if self.page is None or self.page.is_closed():
+            # A persistent context opens with one blank page; use it rather than adding another
+            blank = [p for p in self.context.pages if not p.is_closed() and p.url == "about:blank"]
+            self.page = blank[0] if blank else self.context.new_page()
+            self.logged_in = False
+
+    def _credentials(self):
+        return self.client_id, self.user_id, self.password, self.sec_question
+
+    def _load_state(self):
+        if self.state_store is None:
+            return None
+        try:
+            return self.state_store.load(*self._credentials())
+        except Exception as e:
+            print(f"[WARN] Could not load saved portal session: {e}")
+            return None
+
+    def _save_state(self):
+        if self.state_store is None:
+            return
+        try:
+            self.state_store.save(*self._credentials(), self.context.storage_state())
+        except Exception as e:
+            print(f"[WARN] Could not save portal session: {e}")
+
+    def _on_context_closed(self, context):
+        if context is self.context:
+            self.context = None
+            self.browser = None
+
+    def is_expired(self):
+        """
+        A session is considered expired when the page is gone, the login iframe is
+        showing again, or the Profile Advantage menu is no longer on the page.
+        """
+        page = self.page
+        if page is None or page.is_closed():
+            return True
+        try:
+            if page.locator(LOGIN_IFRAME).count() > 0:
+                return True
+            return page.locator(MENU_LINK).count() == 0
+        except Exception:
+            return True
+
+    def ensure_logged_in(self, profile=None):
+        """Returns a page on the portal main menu, logging in again only if needed."""
+        step = profile.step if profile is not None else (lambda name: nullcontext())
+        with step("browser_launch"):
+            self.start()
+        if self.logged_in and not self.is_expired():
+            return self.page
+        if self.logged_in:
+            print("[INFO] Portal session expired, logging in again.")
+        with step("login"):
+            self.login()
+        return self.page
+
+    def login(self):
+        """
+        Opens the portal and, unless the saved storage state lands straight on the
+        main menu, goes through the full credential + security-question flow.
+        """
+        page = self.page
+        timeouts = self.timeouts
+        self.logged_in = False
+        page.goto(self.portal_url, wait_until="domcontentloaded", timeout=timeouts["page_load"])
+
+        # Whichever shows first: the login iframe (no/expired saved state) or the menu
+        page.locator(f"{LOGIN_IFRAME}, {MENU_LINK}").first.wait_for(state="visible", timeout=timeouts["menu"])
+        if page.locator(LOGIN_IFRAME).count() == 0:
+            self.logged_in = True
+            self.restored += 1
+            print(f"[INFO] Reused saved FADV session for {self.user_id}.")
+            return
+
+        frame = page.frame_locator(LOGIN_IFRAME)
+        frame.locator("fadv-input#login-client-id-input").wait_for(state="visible", timeout=timeouts["page_load"])
+        fill_shadow_input("fadv-input#login-client-id-input", self.client_id, frame)
+        fill_shadow_input("fadv-input#login-user-id-input", self.user_id, frame)
+        fill_shadow_input("fadv-input#login-password-input", self.password, frame)
+        frame.locator("fadv-button#login-button").click()
+
+        frame.locator("fadv-input#security-question-input").wait_for(state="visible", timeout=timeouts["login_step"])
+        fill_shadow_input("fadv-input#security-question-input", self.sec_question, frame)
+        frame.locator("fadv-button#security-question-submit-button").click()
+
+        try:
+            frame.get_by_text("Proceed", exact=True).click(timeout=10000)
+        except Exception:
+            pass
+        try:
+            frame.locator("fadv-button#notice-agree-button").click(timeout=timeouts["login_step"])
+        except Exception:
+            page.evaluate("document.getElementById('agreeBtn').click()")
+
+        # Wait for main menu to load
+        page.locator(MENU_LINK).wait_for(state="visible", timeout=timeouts["menu"])
+        self.logged_in = True
+        self.logins += 1
+        print(f"[INFO] Logged in to FADV as {self.user_id} (login #{self.logins}).")
+        self._save_state()
+
+    def open_profile_advantage(self):
+        """Expands the Profile Advantage menu unless it is already open."""
+        page = self.page
+        if not page.locator(NEW_SUBJECT_ITEM, has_text="New Subject").is_visible():
+            page.locator(MENU_LINK).click()
+        page.locator(NEW_SUBJECT_ITEM, has_text="New Subject").wait_for(state="visible", timeout=self.timeouts["menu"])
+
+    def back_to_menu(self):
+        """
+        Returns to the Profile Advantage menu after an order instead of closing the browser.
+        If that fails the session is marked for a fresh login on the next row.
+        """
+        try:
+            self.open_profile_advantage()
+        except Exception as e:
+            print(f"[WARN] Could not return to Profile Advantage menu: {e}")
+            self.invalidate()
+
+    def invalidate(self):
+        """Forces a fresh login on the next ensure_logged_in()."""
+        self.logged_in = False
+
+    def close(self):
+        for closer in (self.context, self.browser):
+            try:
+                if closer is not None:
+                    closer.close()
+            except Exception:
+                pass
+        try:
+            if self._playwright is not None:
+                self._playwright.stop()
+        except Exception:
+            pass
+        self._playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+        self.logged_in = False
@@ -0,0 +1,490 @@
+"""
+The per-row FADV flows (New Subject for Applicants, Place Order for Pending
+Review), driven through one PortalSession.
+
+This module only talks to the browser: no Sheets, job store or Flask state, so
+it can run inside an isolated browser process (see browser_process.py). Results
+come back as plain dicts the supervising process turns into metrics and statuses.
+
+Pending Review can also run as a batch: one Find Subject search for every subject
+"Pending For Review", parsed once into an email index, then one order per matching
+row from that results list (see process_pending_batch).
+"""
+import json
+import time as t
+
+from option_index import SELECTS, OptionIndex
+from portal_session import PORTAL_URL, PortalSession, wait_for_option_value
+from retry import PERMANENT, PermanentError, classify
+from session_state import STATE_DIR, SessionStateStore
+from timing import TimingProfile
+
+# Sheet "Location" (lower-case) -> FADV facility label
+LOCATION_MAP = {
+    "wilson": "00256 - WILSON, NC",
+    "new hill": "00250 - NEW HILL, NC",
+    "greenville": "00278 - EAST CAROLINA, NC",
+}
+
+PENDING_STATUS = "Pending For Review"
+RESULTS_TABLE = "table.GOIVD5ICHFF"
+RESULT_ROWS = "table.GOIVD5ICHFF tr.standard"
+# Neither of these two has been checked against the live portal. A wrong no-results text only makes an
+# empty search wait out its timeout (_wait_for_results); a wrong pager selector only sends batch rows
+# past the first page to a search of their own (automation_worker._handle_pending_batch).
+NO_RESULTS_TEXT = "no subjects found"  # shown in the results table when a search matches nothing
+NEXT_PAGE = "img.gwt-Image.pointer[title='Next Page']"  # the results pager's next-page arrow
+MAX_RESULT_PAGES = 50
+
+
+class PortalWorker:
+    def __init__(self, client_id, user_id, password, sec_question, headless=True, portal_url=PORTAL_URL,
+                 timeouts=None, location_map=None, browser_profile=None, state_dir=STATE_DIR, slot=None):
+        self.location_map = dict(LOCATION_MAP if location_map is None else location_map)
+        self.option_index = OptionIndex()
+        self.session = PortalSession(client_id, user_id, password, sec_question, headless=headless,
+                                     timeouts=timeouts, portal_url=portal_url, browser_profile=browser_profile,
+                                     state_store=SessionStateStore(state_dir), profile_slot=slot)
+
+    def close(self):
+        self.session.close()
+
+    def process_row(self, index, row, is_pending_review=False, verify_existing=False):
+        """
+        Runs one sheet row through the portal. Returns a dict with success, error,
+        error_kind (retry.TRANSIENT/PERMANENT), the step timings and the option
+        index entry for the row's CSP ID, plus `sent` (Send was clicked) and
+        `review` (not sent: the subject is already in FADV and a person has to check).
+
+        With verify_existing an Applicants row first looks the email up in Find
+        Subject (any status). The results don't show a subject's package or company,
+        so any subject with this email may be the earlier attempt's order: the row
+        stops there and comes back with `review` instead of risking a second order.
+        A lookup that fails fails the row.
+        """
+        steps = []
+        profile = TimingProfile(f"Row {index}", observer=lambda name, seconds, failed: steps.append(
+            (name, seconds, failed)))
+        success = False
+        sent = False
+        review = False
+        error = None
+        error_kind = None
+        csp_id = row.get("CSP ID", "")
+        session = self.session
+        try:
+            full_name = row["Full Name"].strip()
+            split = full_name.split(" ", 1)
+            first_name = split[0]
+            last_name = split[1] if len(split) > 1 else ""
+            email = row["Email"]
+            company_id = row.get("Company ID", "")
+            location = row.get("Location", "").strip().lower()
+            position_type = row.get("Position Type", "")
+            package_text = row.get("Package", "")
+
+            timeouts = session.timeouts
+            try:
+                page = session.ensure_logged_in(profile)
+                with profile.step("menu_load"):
+                    session.open_profile_advantage()
+
+                if not is_pending_review and verify_existing:
+                    with profile.step("existing_check"):
+                        try:
+                            self._find_subject(page, email, timeouts, status=None)
+                            review = email.strip().lower() in self._results_index(page, timeouts["search"])
+                        except Exception as e:
+                            # Unknown is not "not ordered": sending now could be the second order
+                            raise RuntimeError(f"Could not check FADV for an earlier order ({e}); not sending") from e
+                    if review:
+                        print(f"[WARN] Row {index}: {email} is already in FADV; holding the row for review.")
+
+                if not is_pending_review and not review:
+                    # Applicants flow
+                    with profile.step("new_subject_form"):
+                        page.locator("div#EE_MENU_PROFILE_ADVANTAGE_NEW_SUBJECT span", has_text="New Subject").click()
+                        page.locator("input#CDC_NEW_SUBJECT_FIRST_NAME").wait_for(state="visible", timeout=timeouts["form"])
+                    with profile.step("form_fill"):
+                        page.locator("input#CDC_NEW_SUBJECT_FIRST_NAME").fill(first_name)
+                        page.locator("input#CDC_NEW_SUBJECT_LAST_NAME").fill(last_name)
+                        page.locator("input#CDC_NEW_SUBJECT_EMAIL_ADDRESS").fill(email)
+                        self.check_checkbox_by_caption(page, "CC: Recruiter on Invitation Email")
+
+                    with profile.step("csp_select"):
+                        wait_for_option_value(page, "select#Order\\.Info\\.RefID3", csp_id, timeouts["options"])
+                        page.locator("select#Order\\.Info\\.RefID3").select_option(str(csp_id))
+
+                    with profile.step("package_select"):
+                        self._select_option(page, csp_id, "package", package_text, timeouts["options"])
+                    with profile.step("company_select"):
+                        self._select_option(page, csp_id, "company", company_id, timeouts["options"])
+                    facility_option = self.location_map.get(location)
+                    if facility_option:
+                        with profile.step("facility_select"):
+                            self._select_option(page, csp_id, "facility", facility_option, timeouts["options"])
+                    with profile.step("position_select"):
+                        self._select_option(page, csp_id, "position", position_type, timeouts["options"])
+
+                    with profile.step("send"):
+                        sent = True
+                        # Exactly one click: on a slow portal a second click is a second order
+                        page.get_by_text("Send", exact=True).click()
+                        self._wait_until_submitted(page, "input#CDC_NEW_SUBJECT_FIRST_NAME", timeouts["send"])
+                elif is_pending_review:
+                    # Pending Review flow
+                    with profile.step("search"):
+                        self._find_subject(page, email, timeouts)
+
+                        # Wait for results & click the row by email/name (robust)
+                        found = self._click_pending_result_row(page, email=email, name=full_name, timeout=timeouts["search"])
+                        if not found:
+                            # No result – permanent: retrying won't make the subject appear, so the row goes straight to Error
+                            raise PermanentError(f"No pending result row found for email '{email}'")
+
+                    with profile.step("place_order"):
+                        self._place_order(page, timeouts)
+            except Exception:
+                # Page state is unknown after a failure; start the next row from a fresh login
+                session.invalidate()
+                raise
+
+            # Keep the browser open and go back to the menu for the next row
+            with profile.step("back_to_menu"):
+                session.back_to_menu()
+            if review:
+                error = f"{email} is already in FADV; check whether this order was placed"
+                error_kind = PERMANENT
+            else:
+                success = True
+        except Exception as e:
+            print(f"Row {index} failed: {e}")
+            error = str(e)
+            error_kind = classify(e)
+        print(f"[TIMING] {profile.summary()}")
+        return {
+            "success": success,
+            "sent": sent,
+            "review": review,
+            "error": error,
+            "error_kind": error_kind,
+            "steps": steps,
+            "timing": profile.as_dict(),
+            "total": profile.total(),
+            "options": self.option_index.export(csp_id),
+        }
+
+    def process_pending_batch(self, rows, report, min_interval=0.0):
+        """
+        Places Pending Review orders for many rows from a single Find Subject search.
+        `rows` is [(index, row)]. Progress is streamed through report(kind, payload):
+        ("matched", {...}) once the results are joined against the rows (rows the
+        results don't show are only `missing` here, for a search of their own), then
+        ("row", result) after each order, with the same result dict as process_row.
+        Orders are spaced at least `min_interval` seconds apart.
+        """
+        steps = []
+        profile = TimingProfile("Pending batch", observer=lambda name, seconds, failed: steps.append(
+            (name, seconds, failed)))
+        session = self.session
+        try:
+            page = session.ensure_logged_in(profile)
+            with profile.step("menu_load"):
+                session.open_profile_advantage()
+            with profile.step("search"):
+                self._find_subject(page, "", session.timeouts)
+                index = self._results_index(page, session.timeouts["search"])
+            if not index:
+                # Nothing is pending for review at all: more likely a portal hiccup than
+                # every row being wrong, so no row is failed over it
+                raise RuntimeError("Pending search returned no subjects")
+        except Exception:
+            session.invalidate()
+            raise
+
+        # Join the portal's results against the sheet rows; an email is only ordered once
+        matched, missing, duplicates, first_row = [], [], [], {}
+        for i, row in rows:
+            key = str(row.get("Email", "")).strip().lower()
+            if key in first_row:
+                duplicates.append((i, f"Same email as row {first_row[key] + 2}, which is ordered instead"))
+            elif key not in index:
+                missing.append(i)
+            else:
+                first_row[key] = i
+                matched.append((i, row, index[key]))
+        print(f"[INFO] Pending search returned {len(index)} subjects; {len(matched)} of {len(rows)} rows match.")
+        report("matched", {
+            "found": [i for i, _, _ in matched],
+            "missing": missing,
+            "duplicates": duplicates,
+            "results": len(index),
+            "steps": steps,
+            "timing": profile.as_dict(),
+        })
+
+        last_order = None
+        for i, row, title in matched:
+            if min_interval and last_order is not None:
+                t.sleep(max(last_order + min_interval - t.monotonic(), 0))
+            last_order = t.monotonic()
+            report("row", self._place_pending_order(i, row, title))
+
+        with profile.step("back_to_menu"):
+            session.back_to_menu()
+
+    def _place_pending_order(self, index, row, title):
+        """One order of a batch: back to the results list, open the subject, place the order."""
+        steps = []
+        profile = TimingProfile(f"Row {index}", observer=lambda name, seconds, failed: steps.append(
+            (name, seconds, failed)))
+        success = False
+        error = None
+        error_kind = None
+        session = self.session
+        try:
+            timeouts = session.timeouts
+            try:
+                page = session.ensure_logged_in(profile)
+                with profile.step("search"):
+                    self._back_to_results(page, title, timeouts)
+                with profile.step("open_result"):
+                    self._open_pending_result(page, title)
+                with profile.step("place_order"):
+                    self._place_order(page, timeouts)
+            except Exception:
+                session.invalidate()
+                raise
+            success = True
+        except Exception as e:
+            print(f"Row {index} failed: {e}")
+            error = str(e)
+            error_kind = classify(e)
+        print(f"[TIMING] {profile.summary()}")
+        return {
+            "index": index,
+            "success": success,
+            "sent": success,
+            "review": False,
+            "error": error,
+            "error_kind": error_kind,
+            "steps": steps,
+            "timing": profile.as_dict(),
+            "total": profile.total(),
+            "options": {},
+        }
+
+    def _find_subject(self, page, email, timeouts, status=PENDING_STATUS):
+        """
+        Opens Find Subject and searches `email` ("" for everyone) with the given
+        profile status label, or with the unfiltered first entry when status is None.
+        """
+        page.get_by_text("Find Subject", exact=True).click()
+        page.locator("input#CDC_SEARCH_SUBJECT_EMAIL_ADDRESS_LBL").wait_for(state="visible", timeout=timeouts["form"])
+        page.locator("input#CDC_SEARCH_SUBJECT_EMAIL_ADDRESS_LBL").fill(email)
+        if status is None:
+            page.locator("select#CDC_SEARCH_SUBJECT_PROFILE_STATUS_LBL").select_option(index=0)
+        else:
+            page.locator("select#CDC_SEARCH_SUBJECT_PROFILE_STATUS_LBL").select_option(label=status)
+        page.locator("div.html-face", has_text="Search").first.wait_for(state="visible", timeout=10000)
+        page.locator("div.html-face", has_text="Search").first.click()
+
+    def _results_index(self, page, timeout):
+        """
+        Reads the results table, one round trip per page, following the pager:
+        lower-cased email -> the email icon's title (as the portal spells it).
+        Empty only when the portal says the search matched nothing; a table that
+        stays empty past `timeout` raises instead.
+        """
+        page.locator(RESULTS_TABLE).wait_for(state="visible", timeout=timeout)
+        index = {}
+        for _ in range(MAX_RESULT_PAGES):
+            if not self._wait_for_results(page, timeout):
+                break
+            titles = page.evaluate(
+                """(selector) => Array.from(document.querySelectorAll(selector))
+                    .map(tr => tr.querySelector('img.gwt-Image.pointer[title]'))
+                    .filter(img => img)
+                    .map(img => img.getAttribute('title'))""",
+                RESULT_ROWS,
+            )
+            index.update((title.strip().lower(), title) for title in titles if title.strip())
+            if not self._next_results_page(page, timeout):
+                break
+        return index
+
+    def _wait_for_results(self, page, timeout):
+        """
+        Waits until GWT has filled in the result rows (it renders them after the
+        table shows up) or shows its no-results text. Returns False for the latter.
+        If neither shows up within `timeout`, a table that is still there with no
+        rows once the page's requests have settled counts as empty too, so an empty
+        search is slow rather than failed should the portal word it differently.
+        """
+        try:
+            return page.wait_for_function(
+                """([rows, table, empty]) => {
+                    if (document.querySelectorAll(rows).length > 0) return "rows";
+                    const el = document.querySelector(table);
+                    return el && el.innerText.toLowerCase().includes(empty) ? "empty" : false;
+                }""",
+                arg=[RESULT_ROWS, RESULTS_TABLE, NO_RESULTS_TEXT],
+                timeout=timeout,
+            ).json_value() == "rows"
+        except Exception:
+            page.wait_for_load_state("networkidle", timeout=timeout)
+            if page.locator(RESULT_ROWS).count() > 0 or not page.locator(RESULTS_TABLE).first.is_visible():
+                raise
+            print(f"[WARN] Empty search results without '{NO_RESULTS_TEXT}'; treating them as empty.")
+            return False
+
+    def _next_results_page(self, page, timeout):
+        """Moves the results table to its next page. Returns False on the last page."""
+        button = page.locator(NEXT_PAGE).first
+        if button.count() == 0 or not button.is_visible() or button.get_attribute("aria-disabled") == "true":
+            return False
+        first = page.evaluate(
+            "(selector) => { const tr = document.querySelector(selector); return tr ? tr.innerText : null; }",
+            RESULT_ROWS,
+        )
+        button.click()
+        page.wait_for_function(
+            """([selector, first]) => {
+                const tr = document.querySelector(selector);
+                return tr !== null && tr.innerText !== first;
+            }""",
+            arg=[RESULT_ROWS, first],
+            timeout=timeout,
+        )
+        return True
+
+    def _back_to_results(self, page, title, timeouts):
+        """
+        Makes sure the results page holding `title` is on screen. After an order the
+        portal leaves the list; it is searched (and paged) again rather than trusting
+        a stale one.
+        """
+        icon = page.locator(f"{RESULTS_TABLE} img.gwt-Image.pointer[title={json.dumps(title)}]")
+        if icon.count() > 0 and icon.first.is_visible():
+            return
+        self.session.open_profile_advantage()
+        self._find_subject(page, "", timeouts)
+        page.locator(RESULTS_TABLE).wait_for(state="visible", timeout=timeouts["search"])
+        for _ in range(MAX_RESULT_PAGES):
+            if not self._wait_for_results(page, timeouts["search"]):
+                break
+            if icon.count() > 0 and icon.first.is_visible():
+                return
+            if not self._next_results_page(page, timeouts["search"]):
+                break
+        raise PermanentError(f"No pending result row found for email '{title}'")
+
+    def _open_pending_result(self, page, title):
+        """
+        Clicks the subject whose email icon carries exactly `title`. Unlike
+        _click_pending_result_row there is no fallback: in a batch, clicking some
+        other row would place someone else's order.
+        """
+        icon = page.locator(f"{RESULTS_TABLE} img.gwt-Image.pointer[title={json.dumps(title)}]").first
+        icon.locator("xpath=ancestor::tr[1]").locator("css=div.pointer").first.click()
+
+    def _place_order(self, page, timeouts):
+        page.locator("select#CDC_SUBJECT_DETAIL_ACTIONS").wait_for(state="visible", timeout=timeouts["form"])
+        page.locator("select#CDC_SUBJECT_DETAIL_ACTIONS").select_option("REVIEW_AND_PLACE_ORDER")
+        ok_button = page.locator("div.eePushButtonSmall-up >> div.html-face", has_text="OK")
+        ok_button.wait_for(state="visible", timeout=10000)
+        ok_button.click()
+        self._wait_until_submitted(page, "div.eePushButtonSmall-up >> div.html-face:has-text('OK')", timeouts["send"])
+
+    def check_checkbox_by_caption(self, page, caption_text: str, timeout: int = 10000):
+        """
+        Finds a checkbox by the visible caption (e.g., 'CC: Recruiter on Invitation Email')
+        and ensures it's checked. Works even with duplicated IDs.
+        """
+        # Prefer robust CSS :has() (Playwright supports it)
+        locator = page.locator(
+            f"tr:has(div.GOIVD5ICIOC:has-text('{caption_text}')) input[type='checkbox']"
+        ).first
+
+        try:
+            locator.wait_for(state="attached", timeout=timeout)
+        except Exception:
+            # Fallback to XPath if needed
+            locator = page.locator(
+                "xpath=//div[contains(@class,'GOIVD5ICIOC') and "
+                f"normalize-space()='{caption_text}']/ancestor::tr[1]//input[@type='checkbox']"
+            ).first
+            locator.wait_for(state="attached", timeout=timeout)
+
+        if not locator.is_checked():
+            locator.check()
+
+    def _click_pending_result_row(self, page, email, name=None, timeout=20000):
+        """
+        After 'Search', waits for results and clicks the subject row.
+        Prefers locating by the email icon's title attribute (stable).
+        Fallbacks to name text, then first row.
+        """
+        # Wait for the results table to appear
+        results = page.locator(RESULTS_TABLE)
+        results.wait_for(state="visible", timeout=timeout)
+
+        # Wait until at least one data row exists (GWT renders asynchronously); none at all is "not found"
+        if not self._wait_for_results(page, timeout):
+            return False
+
+        # 1) Preferred: locate the email icon by title (unique & stable)
+        email_icon = results.locator(f"img.gwt-Image.pointer[title='{email}']").first
+        if email_icon.count() > 0:
+            row = email_icon.locator("xpath=ancestor::tr[1]")
+            # Click the name cell inside this row (the clickable one has 'pointer')
+            name_cell = row.locator("css=div.pointer").first
+            name_cell.click()
+            return True
+
+        # 2) Fallback: locate by the subject (name) text if provided
+        if name:
+            try:
+                results.locator(f"css=div.pointer:has-text('{name}')").first.click()
+                return True
+            except Exception:
+                pass
+
+        # 3) Fallback: click the first data row's clickable cell
+        try:
+            first_row_clickable = results.locator("tr.standard >> css=div.pointer").first
+            first_row_clickable.click()
+            return True
+        except Exception:
+            return False
+
+    def _select_option(self, page, csp_id, field, label, timeout):
+        """
+        Selects `label` in one of the New Subject dropdowns by its cached value. The
+        dropdowns are (re-)read in one round trip only when this CSP ID isn't indexed
+        yet or the label is missing from the cached list.
+        """
+        value = self.option_index.lookup(csp_id, field, label)
+        if value is None:
+            self.option_index.load(page, csp_id, timeout, fields=(field,))
+            value = self.option_index.lookup(csp_id, field, label)
+            if value is None:
+                raise ValueError(f"{field.capitalize()} '{label}' is not offered for CSP ID {csp_id}")
+        try:
+            page.locator(SELECTS[field]).select_option(value, timeout=timeout)
+        except Exception:
+            self.option_index.invalidate(csp_id)  # the cached value is stale; re-read on the next row
+            raise
+
+    def _wait_until_submitted(self, page, form_selector, timeout):
+        """
+        Waits for a submitted form/dialog to go away, falling back to network idle.
+        The click already happened, so a timeout here is only logged, never raised.
+        """
+        try:
+            page.locator(form_selector).first.wait_for(state="hidden", timeout=timeout)
+        except Exception:
+            try:
+                page.wait_for_load_state("networkidle", timeout=timeout)
+            except Exception as e:
+                print(f"[WARN] Submit confirmation not observed: {e}")
@@ -0,0 +1,142 @@
+"""
+Shared retry policy: error classification, jittered exponential backoff and a
+circuit breaker.
+
+Transient failures (portal timeouts, expired sessions, dropped connections,
+Sheets 429/5xx) are worth another attempt later; permanent ones (a row that
+can't be ordered, a subject that doesn't exist, Sheets 4xx) are not. When the
+portal keeps failing transiently, the breaker opens and the worker pauses
+instead of walking every remaining row into Error.
+"""
+import random
+import threading
+import time as t
+
+import gspread
+
+TRANSIENT = "transient"
+PERMANENT = "permanent"
+
+
+class PermanentError(Exception):
+    """A failure that retrying can't fix (bad row data, no matching subject)."""
+
+
+def classify(error):
+    """TRANSIENT or PERMANENT for an exception raised while processing a row or calling Sheets."""
+    kind = getattr(error, "retry_kind", None)  # already classified, e.g. in a browser process
+    if kind in (TRANSIENT, PERMANENT):
+        return kind
+    if isinstance(error, (PermanentError, ValueError, KeyError)):
+        return PERMANENT
+    if isinstance(error, gspread.exceptions.APIError):
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        return TRANSIENT if status is None or status == 429 or status >= 500 else PERMANENT
+    if isinstance(error, (gspread.exceptions.SpreadsheetNotFound, gspread.exceptions.WorksheetNotFound)):
+        return PERMANENT
+    # Timeouts, closed targets, net::ERR_*, connection resets: the portal or the network
+    # hiccupped. Anything unrecognized is also retried; the attempt cap bounds the cost.
+    return TRANSIENT
+
+
+class Backoff:
+    """Exponential backoff with full jitter: attempt n waits uniform(0, min(cap, base * 2**(n-1)))."""
+
+    def __init__(self, base=30.0, cap=900.0):
+        self.base = base
+        self.cap = cap
+
+    def delay(self, attempt):
+        return random.uniform(0, min(self.cap, self.base * 2 ** max(attempt - 1, 0)))
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=3, backoff=None):
+        self.max_attempts = max_attempts
+        self.backoff = backoff or Backoff()
+
+    def should_retry(self, error, attempts):
+        """True if a row that failed with `error` on attempt `attempts` gets another try."""
+        return classify(error) == TRANSIENT and attempts < self.max_attempts
+
+
+def call_with_retries(fn, attempts=3, backoff=None, on_error=None):
+    """
+    Calls fn() until it succeeds, retrying transient errors with backoff.
+    `on_error(error, attempt)` runs after each failure (e.g. to drop stale handles).
+    """
+    backoff = backoff or Backoff(base=2.0, cap=30.0)
+    for attempt in range(1, attempts + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if on_error is not None:
+                on_error(e, attempt)
+            if attempt == attempts or classify(e) == PERMANENT:
+                raise
+            t.sleep(backoff.delay(attempt))
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive transient failures and stays open for
+    `cooldown` seconds (doubling on each re-trip, up to `max_cooldown`). After the
+    cooldown one trial call is let through; its result closes or re-opens it.
+    """
+
+    def __init__(self, threshold=5, cooldown=120.0, max_cooldown=1800.0):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._cooldown = cooldown
+        self._open_until = None
+        self._trial_running = False
+
+    def allow(self):
+        """True if a call may proceed now. In the half-open state only one caller gets True."""
+        with self._lock:
+            if self._open_until is None:
+                return True
+            if t.monotonic() < self._open_until or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def is_open(self):
+        with self._lock:
+            return self._open_until is not None and (t.monotonic() < self._open_until or self._trial_running)
+
+    def retry_in(self):
+        """Seconds until the next trial call is allowed (0 when closed or half-open)."""
+        with self._lock:
+            if self._open_until is None:
+                return 0.0
+            return max(self._open_until - t.monotonic(), 0.0)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._cooldown = self.base_cooldown
+            self._open_until = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """Gives up a trial slot without a verdict (the trial row never ran to completion)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        """Counts a transient failure. Returns True if this call opened (or re-opened) the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running:
+                self._trial_running = False
+                self._cooldown = min(self._cooldown * 2, self.max_cooldown)
+                self._open_until = t.monotonic() + self._cooldown
+                return True
+            if self._open_until is None and self._failures >= self.threshold:
+                self._open_until = t.monotonic() + self._cooldown
+                return True
+            return False
@@ -0,0 +1,54 @@
+"""
+Checks sheet rows before any browser time is spent on them.
+
+Each validator returns None for a usable row or a short reason that is written
+to the row's Status as "Invalid: <reason>". Dropdown values (package, company,
+position) are checked against the shared OptionIndex once it has seen the
+row's CSP ID; until then only the portal can tell, so they pass.
+"""
+import re
+
+INVALID_PREFIX = "Invalid: "
+
+# Deliberately loose: one @, no spaces, a dot in the domain
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s.]+$")
+
+APPLICANT_REQUIRED = ("Full Name", "Email", "Company ID", "Location", "Position Type", "CSP ID", "Package")
+PENDING_REQUIRED = ("Full Name", "Email")
+
+
+def _value(row, column):
+    return str(row.get(column, "")).strip()
+
+
+def _check_common(row, required):
+    missing = [column for column in required if not _value(row, column)]
+    if missing:
+        return f"missing {', '.join(missing)}"
+    email = _value(row, "Email")
+    if not _EMAIL.match(email):
+        return f"invalid email '{email}'"
+    return None
+
+
+def validate_applicant(row, location_map, option_index=None):
+    reason = _check_common(row, APPLICANT_REQUIRED)
+    if reason:
+        return reason
+    location = _value(row, "Location").lower()
+    if location not in location_map:
+        return f"unknown location '{_value(row, 'Location')}'"
+    csp_id = _value(row, "CSP ID")
+    if option_index is not None and option_index.has(csp_id):
+        for field, column in (("package", "Package"), ("company", "Company ID"), ("position", "Position Type")):
+            if option_index.labels(csp_id, field) and option_index.lookup(csp_id, field, _value(row, column)) is None:
+                return f"{column} '{_value(row, column)}' is not offered for CSP ID {csp_id}"
+    return None
+
+
+def validate_pending(row):
+    return _check_common(row, PENDING_REQUIRED)
+
+
+def invalid_status(reason):
+    return f"{INVALID_PREFIX}{reason}"
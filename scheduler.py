@@ -0,0 +1,130 @@
+import threading
+from datetime import datetime, timedelta, time, date
+import pytz
+from apscheduler.schedulers.background import BackgroundScheduler
+
+RESUME_JOB_ID = "fadv-resume"
+
+# Default business hours: every day, 8am-8pm Eastern
+DEFAULT_WINDOWS = [{"days": [0, 1, 2, 3, 4, 5, 6], "start": "08:00", "end": "20:00"}]
+
+
+def _parse_time(value):
+    if isinstance(value, time):
+        return value
+    hour, minute = str(value).split(":")
+    return time(int(hour), int(minute))
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), "%Y-%m-%d").date()
+
+
+class RunScheduler:
+    """
+    Owns the run windows (business hours per weekday, minus holidays) and the single
+    pending "resume" wakeup. Scheduling a resume replaces any earlier one, so repeated
+    Start clicks can never stack timers.
+    """
+
+    def __init__(self, timezone="US/Eastern", windows=None, holidays=None):
+        self.tz = pytz.timezone(timezone)
+        self.configure(windows or DEFAULT_WINDOWS, holidays or [])
+        self._scheduler = None
+        self._lock = threading.Lock()
+
+    def configure(self, windows, holidays):
+        """windows: [{'days': [0-6, Mon=0], 'start': 'HH:MM', 'end': 'HH:MM'}]; holidays: ['YYYY-MM-DD']."""
+        self.windows = [
+            (set(w.get("days", range(7))), _parse_time(w["start"]), _parse_time(w["end"]))
+            for w in windows
+        ]
+        self.holidays = {_parse_date(d) for d in holidays}
+
+    def now(self):
+        return datetime.now(self.tz)
+
+    def _windows_on(self, day):
+        """
+        (start, end) of the windows starting on `day`. A window whose end isn't after
+        its start (22:00-06:00) runs past midnight and ends the next day.
+        """
+        if day in self.holidays:
+            return []
+        return sorted(
+            (self.tz.localize(datetime.combine(day, start)),
+             self.tz.localize(datetime.combine(day + timedelta(days=1) if end <= start else day, end)))
+            for days, start, end in self.windows
+            if day.weekday() in days
+        )
+
+    def current_window_end(self, now=None):
+        """End of the window `now` falls in, or None when outside every window."""
+        now = now or self.now()
+        for day in (now.date() - timedelta(days=1), now.date()):  # yesterday's window may run past midnight
+            for start, end in self._windows_on(day):
+                if start <= now < end:
+                    return end
+        return None
+
+    def is_open(self, now=None):
+        return self.current_window_end(now) is not None
+
+    def next_open(self, now=None, horizon_days=31):
+        """Start of the next window (or `now` if one is open). None if nothing within the horizon."""
+        now = now or self.now()
+        if self.is_open(now):
+            return now
+        for offset in range(horizon_days + 1):
+            for start, _ in self._windows_on(now.date() + timedelta(days=offset)):
+                if start > now:
+                    return start
+        return None
+
+    def describe_next_open(self, now=None):
+        next_run = self.next_open(now)
+        if next_run is None:
+            return "Sleeping (no run window scheduled)"
+        return f"Sleeping until {next_run.strftime('%a %b %d %I:%M %p')} ET"
+
+    # ---- pending wakeup ----
+
+    def _ensure_started(self):
+        if self._scheduler is None:
+            self._scheduler = BackgroundScheduler(timezone=self.tz, daemon=True)
+            self._scheduler.start()
+        return self._scheduler
+
+    def schedule_resume(self, callback, now=None):
+        """
+        Schedules `callback` for the next window start, replacing any pending resume.
+        Returns the scheduled time (None if no window is coming up).
+        """
+        run_at = self.next_open(now)
+        with self._lock:
+            scheduler = self._ensure_started()
+            if run_at is None:
+                self._remove_job(scheduler)
+                return None
+            scheduler.add_job(callback, "date", run_date=run_at, id=RESUME_JOB_ID, replace_existing=True)
+        print(f"[INFO] Next run scheduled for {run_at}")
+        return run_at
+
+    def cancel_resume(self):
+        with self._lock:
+            if self._scheduler is not None:
+                self._remove_job(self._scheduler)
+
+    @staticmethod
+    def _remove_job(scheduler):
+        if scheduler.get_job(RESUME_JOB_ID) is not None:
+            scheduler.remove_job(RESUME_JOB_ID)
+
+    def next_scheduled_run(self):
+        with self._lock:
+            if self._scheduler is None:
+                return None
+            job = self._scheduler.get_job(RESUME_JOB_ID)
+            return job.next_run_time if job is not None else None
@@ -0,0 +1,87 @@
+"""
+Encrypted on-disk Playwright storage state (cookies + localStorage), one file per
+FADV account, so new browser contexts can skip the login/security-question flow.
+
+The key is derived from the account's password and security answer, so a file is
+useless without the credentials and silently stops decrypting when they change.
+"""
+import base64
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from cryptography.fernet import Fernet, InvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+STATE_DIR = ".fadv-session"
+KDF_ITERATIONS = 200_000
+SALT_BYTES = 16
+
+
+def _account_id(client_id, user_id):
+    return hashlib.sha256(f"{client_id}\0{user_id}".encode("utf-8")).hexdigest()[:24]
+
+
+class SessionStateStore:
+    def __init__(self, directory=STATE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._keys = {}  # (account id, salt) -> Fernet, so PBKDF2 runs once per process
+
+    def path(self, client_id, user_id):
+        return os.path.join(self.directory, f"{_account_id(client_id, user_id)}.state")
+
+    def _fernet(self, account, salt, password, sec_question):
+        cache_key = (account, salt, hashlib.sha256(f"{password}\0{sec_question}".encode("utf-8")).digest())
+        with self._lock:
+            fernet = self._keys.get(cache_key)
+        if fernet is None:
+            kdf = PBKDF2HMAC(algorithm=hashes.SHA256(), length=32, salt=salt, iterations=KDF_ITERATIONS)
+            key = kdf.derive(f"{password}\0{sec_question}".encode("utf-8"))
+            fernet = Fernet(base64.urlsafe_b64encode(key))
+            with self._lock:
+                self._keys[cache_key] = fernet
+        return fernet
+
+    def load(self, client_id, user_id, password, sec_question):
+        """The saved storage state dict, or None if there is none or it can't be decrypted."""
+        path = self.path(client_id, user_id)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except FileNotFoundError:
+            return None
+        salt, token = blob[:SALT_BYTES], blob[SALT_BYTES:]
+        try:
+            fernet = self._fernet(_account_id(client_id, user_id), salt, password, sec_question)
+            return json.loads(fernet.decrypt(token))
+        except (InvalidToken, ValueError) as e:
+            print(f"[WARN] Discarding unreadable saved session for {user_id}: {type(e).__name__}")
+            self.discard(client_id, user_id)
+            return None
+
+    def save(self, client_id, user_id, password, sec_question, state):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        salt = os.urandom(SALT_BYTES)
+        fernet = self._fernet(_account_id(client_id, user_id), salt, password, sec_question)
+        blob = salt + fernet.encrypt(json.dumps(state).encode("utf-8"))
+        path = self.path(client_id, user_id)
+        # A unique 0600 temp file per save: workers and browser processes may save concurrently,
+        # and readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def discard(self, client_id, user_id):
+        try:
+            os.remove(self.path(client_id, user_id))
+        except FileNotFoundError:
+            pass
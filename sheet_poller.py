@@ -0,0 +1,134 @@
+import hashlib
+import gspread
+from metrics import metrics
+from sheet_snapshot import SheetSnapshot
+
+
+def column_letter(col):
+    """1 -> 'A', 28 -> 'AB'."""
+    return gspread.utils.rowcol_to_a1(1, col).rstrip("0123456789")
+
+
+def row_runs(row_numbers):
+    """Groups sorted sheet row numbers into contiguous (first, last) runs."""
+    runs = []
+    for n in sorted(row_numbers):
+        if runs and n == runs[-1][1] + 1:
+            runs[-1][1] = n
+        else:
+            runs.append([n, n])
+    return runs
+
+
+class IncrementalSheet:
+    """
+    Local copy of a worksheet (a column-oriented SheetSnapshot) that is
+    refreshed incrementally.
+
+    Each refresh() makes one narrow batch_get of the fingerprint columns (with
+    their header cells). If their hash is unchanged and no row has an `actionable`
+    Status code, nothing else is fetched. Otherwise only rows that are new, whose
+    fingerprint changed, or that are actionable (still to be processed, so their
+    other cells may have been edited) are re-read, in a single batch_get. Header
+    changes trigger a full reload.
+    """
+
+    def __init__(self, worksheet, fingerprint_columns, actionable=None):
+        self.worksheet = worksheet
+        self.fingerprint_columns = tuple(fingerprint_columns)
+        self.actionable = actionable  # set of sheet_snapshot status codes, or None
+        self.snapshot = SheetSnapshot([])
+        self._fingerprints = []  # per data row: tuple of fingerprint column values
+        self._digest = None
+        self.loaded = False
+
+    @property
+    def headers(self):
+        return self.snapshot.headers
+
+    def _fingerprint_indices(self):
+        return [self.headers.index(name) for name in self.fingerprint_columns if name in self.headers]
+
+    def full_reload(self):
+        with metrics.sheets_call("get_all_values"):
+            values = self.worksheet.get_all_values()
+        self.snapshot = SheetSnapshot(values[0] if values else [], values[1:])
+        indices = self._fingerprint_indices()
+        self._fingerprints = [
+            tuple(row[i] if i < len(row) else "" for i in indices) for row in values[1:]
+        ]
+        self._digest = self._hash(self._fingerprints)
+        self.loaded = True
+
+    @staticmethod
+    def _hash(fingerprints):
+        return hashlib.sha1(repr(fingerprints).encode("utf-8")).hexdigest()
+
+    def refresh(self):
+        """Brings `snapshot` up to date. Returns True if anything changed."""
+        if not self.loaded:
+            self.full_reload()
+            return True
+
+        indices = self._fingerprint_indices()
+        if len(indices) != len(self.fingerprint_columns):
+            self.full_reload()
+            return True
+
+        letters = [column_letter(i + 1) for i in indices]
+        with metrics.sheets_call("batch_get"):
+            columns = self.worksheet.batch_get([f"{letter}1:{letter}" for letter in letters])
+        columns = [[cells[0] if cells else "" for cells in column] for column in columns]
+
+        # A renamed/moved column means our indices are wrong: start over
+        header_cells = [column[0] if column else "" for column in columns]
+        if header_cells != [self.headers[i] for i in indices]:
+            self.full_reload()
+            return True
+
+        row_count = max((len(column) - 1 for column in columns), default=0)
+        fingerprints = [
+            tuple(column[r + 1] if r + 1 < len(column) else "" for column in columns)
+            for r in range(row_count)
+        ]
+        digest = self._hash(fingerprints)
+
+        stale = set()
+        if digest != self._digest:
+            for r, fp in enumerate(fingerprints):
+                if r >= len(self._fingerprints) or self._fingerprints[r] != fp:
+                    stale.add(r)
+        if self.actionable is not None:
+            stale.update(r for r in self.snapshot.rows_with(self.actionable) if r < row_count)
+
+        # Rows removed from the bottom
+        changed = len(self.snapshot) > row_count
+        self.snapshot.truncate(row_count)
+        self._fingerprints = fingerprints
+        self._digest = digest
+
+        if stale:
+            changed = self._refetch_rows(stale) or changed
+        return changed
+
+    def _refetch_rows(self, data_rows):
+        """Re-reads the given data rows in one batch_get. Returns True if any row changed."""
+        last = column_letter(len(self.headers))
+        runs = row_runs(r + 2 for r in data_rows)  # data row 0 is sheet row 2
+        ranges = [f"A{first}:{last}{end}" for first, end in runs]
+        with metrics.sheets_call("batch_get"):
+            results = self.worksheet.batch_get(ranges)
+        snapshot = self.snapshot
+        changed = len(snapshot) < len(self._fingerprints)
+        while len(snapshot) < len(self._fingerprints):
+            snapshot.append([])  # new rows are filled in below (they are all stale)
+        for (first, end), values in zip(runs, results):
+            for offset in range(end - first + 1):
+                row_values = values[offset] if offset < len(values) else []
+                if snapshot.set_row(first - 2 + offset, row_values):
+                    changed = True
+        return changed
+
+    def patch(self, index, column, value):
+        """Applies a write we made ourselves to the local copy so it isn't stale until the next poll."""
+        self.snapshot.set(index, column, value)
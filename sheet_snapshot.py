@@ -0,0 +1,149 @@
+"""
+Column-oriented copy of a worksheet.
+
+Rows are kept as one list of cell strings per column plus a header -> column
+map, instead of one dict per row as get_all_records() returns. The Status column
+is normalized once, when a cell is stored, into a byte array of status codes, so
+counters and the rows to work on come from one pass over that array with no
+per-row str().strip().lower(). Row dicts are only built for the rows handed to a
+worker (record()).
+"""
+from array import array
+from collections import Counter
+
+from job_store import COMPLETED as JOB_COMPLETED, ERROR as JOB_ERROR, INVALID as JOB_INVALID
+from job_store import PENDING as JOB_PENDING, PROCESSING as JOB_PROCESSING
+
+# Status codes
+BLANK = 0
+PROCESSING = 1
+COMPLETED = 2
+ERROR = 3
+RETRYING = 4  # "Retrying (n/max)": waiting out a backoff, still pending
+INVALID = 5  # "Invalid: <reason>"
+OTHER = 6  # any other text; treated as pending
+REVIEW = 7  # "Review: <reason>": held for a person; final until they change it
+
+# Rows the worker may still have to do something with (re-read on every poll)
+NEEDS_WORK = frozenset((BLANK, RETRYING, INVALID, OTHER))
+
+_JOB_STATES = {
+    BLANK: JOB_PENDING,
+    PROCESSING: JOB_PROCESSING,
+    COMPLETED: JOB_COMPLETED,
+    ERROR: JOB_ERROR,
+    RETRYING: JOB_PENDING,
+    INVALID: JOB_INVALID,
+    OTHER: JOB_PENDING,
+    REVIEW: JOB_ERROR,
+}
+_EXACT = {"": BLANK, "processing": PROCESSING, "completed": COMPLETED, "error": ERROR}
+
+
+def status_code(value):
+    status = str(value).strip().lower()
+    code = _EXACT.get(status)
+    if code is not None:
+        return code
+    if status.startswith("retrying"):
+        return RETRYING
+    if status.startswith("invalid:"):
+        return INVALID
+    if status.startswith("review:"):
+        return REVIEW
+    return OTHER
+
+
+class SheetSnapshot:
+    def __init__(self, headers, rows=()):
+        self.headers = list(headers)
+        self.index = {}
+        for i, name in enumerate(self.headers):
+            self.index.setdefault(name, i)  # like get_all_records: the first column of a name wins
+        self.columns = [[] for _ in self.headers]
+        self.status = array("B")
+        self._status_col = self.index.get("Status")
+        for values in rows:
+            self.append(values)
+
+    def __len__(self):
+        return len(self.status)
+
+    def _cells(self, values):
+        width = len(self.headers)
+        cells = [str(v) for v in values[:width]]
+        return cells + [""] * (width - len(cells))
+
+    def _code(self, cells):
+        return status_code(cells[self._status_col]) if self._status_col is not None else BLANK
+
+    def append(self, values):
+        cells = self._cells(values)
+        for column, cell in zip(self.columns, cells):
+            column.append(cell)
+        self.status.append(self._code(cells))
+
+    def set_row(self, i, values):
+        """Replaces row `i` (appending if it is the next row). Returns True if it changed."""
+        if i == len(self):
+            self.append(values)
+            return True
+        cells = self._cells(values)
+        changed = False
+        for column, cell in zip(self.columns, cells):
+            if column[i] != cell:
+                column[i] = cell
+                changed = True
+        if changed:
+            self.status[i] = self._code(cells)
+        return changed
+
+    def truncate(self, n):
+        """Drops rows from n on (rows removed from the bottom of the sheet)."""
+        for column in self.columns:
+            del column[n:]
+        del self.status[n:]
+
+    def set(self, i, name, value):
+        """Applies a single cell write (e.g. a Status we wrote ourselves)."""
+        col = self.index.get(name)
+        if col is None or not 0 <= i < len(self):
+            return
+        self.columns[col][i] = str(value)
+        if col == self._status_col:
+            self.status[i] = status_code(value)
+
+    def column(self, name):
+        """The cells of one column (blanks when the sheet has no such column). Don't mutate it."""
+        col = self.index.get(name)
+        return self.columns[col] if col is not None else [""] * len(self)
+
+    def value(self, i, name, default=""):
+        col = self.index.get(name)
+        return self.columns[col][i] if col is not None else default
+
+    def record(self, i):
+        """Row `i` as a {header: cell} dict, the shape workers and validators take."""
+        record = {}
+        for name, col in self.index.items():
+            record[name] = self.columns[col][i]
+        return record
+
+    def status_counts(self):
+        """{status code: rows}."""
+        return Counter(self.status)
+
+    def rows_with(self, codes):
+        """Indices of the rows whose Status code is in `codes`, in sheet order."""
+        return [i for i, code in enumerate(self.status) if code in codes]
+
+    def count_value(self, name, value):
+        """Rows whose `name` cell, stripped and lower-cased, equals `value`."""
+        col = self.index.get(name)
+        if col is None:
+            return 0
+        return sum(1 for cell in self.columns[col] if cell.strip().lower() == value)
+
+    def job_states(self):
+        """The job_store state of every row, from the Status codes."""
+        return [_JOB_STATES[code] for code in self.status]
@@ -0,0 +1,117 @@
+import atexit
+import threading
+import weakref
+import gspread
+from metrics import metrics
+
+# Buffers that may still hold writes; a closed (or collected) buffer leaves the set
+_live_buffers = weakref.WeakSet()
+
+
+def _flush_live_buffers():
+    """Last-chance flush on interpreter exit so Processing/Completed state isn't lost."""
+    for buffer in list(_live_buffers):
+        try:
+            buffer.flush()
+        except Exception as e:
+            print(f"[ERROR] Status flush at exit failed ({buffer.pending_count()} cells): {e}")
+
+
+atexit.register(_flush_live_buffers)
+
+
+class StatusWriteBuffer:
+    """
+    Write-behind buffer for single-cell status writes.
+    Writes to the same cell are merged (last value wins) and flushed as one
+    batch_update per worksheet, either every `flush_interval` seconds from a
+    background thread or as soon as `max_pending` cells are queued.
+    Works with any worksheet-like object exposing batch_update(list_of_ranges).
+    """
+
+    def __init__(self, flush_interval=2.0, max_pending=50):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = {}  # (id(sheet), row, col) -> value
+        self._sheets = {}  # id(sheet) -> sheet
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.flushes = 0
+        _live_buffers.add(self)
+
+    def set(self, sheet, row, col, value):
+        with self._lock:
+            self._sheets[id(sheet)] = sheet
+            self._pending[(id(sheet), row, col)] = value
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wakeup.set()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """
+        Sends everything queued so far. Cells whose batch fails are put back
+        (unless a newer value was queued meanwhile) and the error is re-raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                sheets = dict(self._sheets)
+            if not pending:
+                return 0
+
+            by_sheet = {}
+            for (sheet_id, row, col), value in pending.items():
+                by_sheet.setdefault(sheet_id, []).append((row, col, value))
+
+            error = None
+            for sheet_id, cells in by_sheet.items():
+                updates = [
+                    {'range': gspread.utils.rowcol_to_a1(row, col), 'values': [[value]]}
+                    for row, col, value in sorted(cells)
+                ]
+                try:
+                    with metrics.sheets_call("batch_update"):
+                        sheets[sheet_id].batch_update(updates)
+                    self.flushes += 1
+                except Exception as e:
+                    error = e
+                    with self._lock:
+                        for row, col, value in cells:
+                            self._pending.setdefault((sheet_id, row, col), value)
+            if error is not None:
+                raise error
+            return len(pending)
+
+    def start(self):
+        _live_buffers.add(self)
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="status-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """Stops the background flusher and flushes whatever is left."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        _live_buffers.discard(self)  # only once everything is out; a failed flush stays covered at exit
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[WARN] Status batch write failed, will retry: {e}")
@@ -0,0 +1,101 @@
+import threading
+import time as t
+import gspread
+from oauth2client.service_account import ServiceAccountCredentials
+from metrics import metrics
+
+SCOPE = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
+
+# Service-account tokens live for an hour; re-authorize a bit before that
+TOKEN_REFRESH_SECONDS = 45 * 60
+
+
+def is_stale_handle_error(error):
+    """True for errors after which cached client/worksheet handles must not be reused."""
+    if isinstance(error, (gspread.exceptions.SpreadsheetNotFound, gspread.exceptions.WorksheetNotFound)):
+        return True
+    if isinstance(error, gspread.exceptions.APIError):
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        return status in (401, 403, 404)
+    return False
+
+
+class SheetsClient:
+    """
+    Long-lived gspread client with cached worksheet handles, per spreadsheet URL,
+    so several pipelines can share one client. The client is re-authorized before
+    its token expires; worksheet handles are reused until they are invalidated or
+    a call fails with an auth/not-found error.
+    """
+
+    def __init__(self, keyfile="service-account.json"):
+        self.keyfile = keyfile
+        self._lock = threading.Lock()
+        self._client = None
+        self._authorized_at = 0.0
+        self._worksheets = {}  # sheet URL -> {worksheet name: handle}
+
+    def client(self):
+        with self._lock:
+            return self._get_client()
+
+    def _get_client(self):
+        if self._client is None or t.monotonic() - self._authorized_at > TOKEN_REFRESH_SECONDS:
+            creds = ServiceAccountCredentials.from_json_keyfile_name(self.keyfile, SCOPE)
+            with metrics.sheets_call("authorize"):
+                self._client = gspread.authorize(creds)
+            self._authorized_at = t.monotonic()
+        return self._client
+
+    def worksheets(self, sheet_url, names):
+        """Returns {name: worksheet} for `names`, opening only what isn't cached yet."""
+        with self._lock:
+            cached = self._worksheets.setdefault(sheet_url, {})
+            missing = [name for name in names if name not in cached]
+            if missing:
+                client = self._get_client()
+                with metrics.sheets_call("open_by_url"):
+                    spreadsheet = client.open_by_url(sheet_url)
+                for name in missing:
+                    with metrics.sheets_call("worksheet"):
+                        cached[name] = spreadsheet.worksheet(name)
+            return {name: cached[name] for name in names}
+
+    def worksheet_or_create(self, sheet_url, name, headers):
+        """Returns worksheet `name`, adding it (with `headers` as its first row) if it doesn't exist yet."""
+        with self._lock:
+            cached = self._worksheets.setdefault(sheet_url, {})
+            if name not in cached:
+                client = self._get_client()
+                with metrics.sheets_call("open_by_url"):
+                    spreadsheet = client.open_by_url(sheet_url)
+                try:
+                    with metrics.sheets_call("worksheet"):
+                        cached[name] = spreadsheet.worksheet(name)
+                except gspread.exceptions.WorksheetNotFound:
+                    with metrics.sheets_call("add_worksheet"):
+                        worksheet = spreadsheet.add_worksheet(title=name, rows=1, cols=max(len(headers), 1))
+                    with metrics.sheets_call("append_rows"):
+                        worksheet.append_rows([list(headers)], value_input_option="RAW")
+                    cached[name] = worksheet
+            return cached[name]
+
+    def invalidate(self, sheet_url=None, reauthorize=False):
+        """
+        Drops the cached worksheet handles of one spreadsheet (all of them when
+        sheet_url is None), and the client itself if `reauthorize`.
+        """
+        with self._lock:
+            if sheet_url is None:
+                self._worksheets = {}
+            else:
+                self._worksheets.pop(sheet_url, None)
+            if reauthorize:
+                self._client = None
+
+    def handle_error(self, error, sheet_url=None):
+        """Invalidates the cache if `error` means the handles are stale. Returns True if it did."""
+        if is_stale_handle_error(error):
+            self.invalidate(sheet_url, reauthorize=True)
+            return True
+        return False
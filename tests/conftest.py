@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fake_sheet import FakeSheetsClient, FakeWorksheet  # noqa: E402
+from job_store import JobStore  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _scratch_dir(tmp_path, monkeypatch):
+    """State files (fadv_state.db, session and browser dirs) land in a temp dir, never the repo."""
+    monkeypatch.chdir(tmp_path)
+
+
+@pytest.fixture
+def job_store(tmp_path):
+    store = JobStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.monotonic() and time.time(); advance with clock.advance(seconds)."""
+    import time
+
+    class Clock:
+        def __init__(self):
+            self.now = 1_000_000.0
+
+        def advance(self, seconds):
+            self.now += seconds
+
+    fake = Clock()
+    monkeypatch.setattr(time, "monotonic", lambda: fake.now)
+    monkeypatch.setattr(time, "time", lambda: fake.now)
+    return fake
+
+
+def worksheet(title, headers, rows=()):
+    return FakeWorksheet(title, [list(headers)] + [list(row) for row in rows])
+
+
+def automation(job_store, sheets):
+    """A FirstAdvantageAutomation wired to fake sheets and a temp job store."""
+    from automation_worker import FirstAdvantageAutomation
+
+    worker = FirstAdvantageAutomation(job_store=job_store, sheets_client=FakeSheetsClient(sheets))
+    worker.sheet_url = "https://sheets.example/test"
+    return worker
+
+
+def portal_result(success=True, **fields):
+    """A result dict as PortalWorker.process_row returns it."""
+    result = {"success": success, "sent": success, "review": False, "error": None if success else "failed",
+              "error_kind": None, "steps": [], "timing": {}, "total": 1.0, "options": {}}
+    result.update(fields)
+    return result
+
+
+class StubBrowser:
+    """
+    Stands in for browser_process.BrowserProcess without Chromium. run_row answers
+    from `rows` (index -> result dict, or an exception to raise); run_pending_batch
+    calls `batch(rows, report)`.
+    """
+
+    def __init__(self, rows=None, batch=None):
+        self.rows = rows or {}
+        self.batch = batch
+        self.calls = []
+
+    def run_row(self, index, row, is_pending_review, options=None, cancel=None, verify_existing=False):
+        self.calls.append(("row", index, verify_existing))
+        outcome = self.rows.get(index, portal_result())
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def run_pending_batch(self, rows, on_progress, min_interval=0.0, cancel=None):
+        self.calls.append(("batch", [i for i, _ in rows]))
+        self.batch(rows, on_progress)
+
+    def close(self):
+        pass
+
+    def kill(self):
+        pass
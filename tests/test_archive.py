@@ -0,0 +1,165 @@
+import json
+
+import pytest
+
+from archive import SQLiteArchive, compactable_rows, delete_rows
+from conftest import automation, worksheet
+from sheet_snapshot import SheetSnapshot
+
+DAY = 86400
+APPLICANT_HEADERS = ["Full Name", "Email", "Package", "Status"]
+PENDING_HEADERS = ["Full Name", "Email", "Status", "OrderStatus"]
+
+
+@pytest.fixture
+def sheets():
+    applicants = worksheet("Applicants", APPLICANT_HEADERS, [
+        [f"A {i}", f"a{i}@x.com", "Std", "Processing" if i == 4 else ("" if i == 6 else "Completed")]
+        for i in range(8)
+    ])
+    pending = worksheet("Pending Review", PENDING_HEADERS, [
+        ["P 0", "p0@x.com", "Completed", "Placed"],
+        ["P 1", "p1@x.com", "Completed", ""],
+    ])
+    false_positives = worksheet("False Positives", ["Name", "Email Address"])
+    return applicants, pending, false_positives
+
+
+def _poll(worker, sheets_by_name):
+    """What the process loop does for each worksheet: refresh, sync, count placed orders."""
+    for name in ("Applicants", "Pending Review"):
+        reader = worker._reader(name, sheets_by_name[name], needs_work=True)
+        reader.refresh()
+        worker._select_work(name, reader.snapshot, True)
+        if name == "Pending Review":
+            worker.job_store.set_meta(worker.sheet_url, "orders_placed",
+                                      reader.snapshot.count_value("OrderStatus", "placed"))
+
+
+def _age(job_store, days):
+    job_store._conn.execute("UPDATE jobs SET updated_at = updated_at - ?", (days * DAY,))
+
+
+def _compact(worker, sheets_by_name):
+    worker._next_compaction = 0.0
+    worker._maybe_compact(sheets_by_name)
+
+
+@pytest.fixture
+def worker(job_store, sheets):
+    worker = automation(job_store, list(sheets))
+    archive = worker.archive = SQLiteArchive("archive.db")
+    yield worker
+    archive.close()
+
+
+def _status_counts(worker):
+    status = worker.get_status()
+    return {key: status[key] for key in ("applicants_total", "applicants_processed", "applicants_archived",
+                                         "pending_total", "pending_processed", "pending_archived", "orders_placed")}
+
+
+def test_compactable_rows_stop_at_the_last_processing_row():
+    snapshot = SheetSnapshot(["Email", "Status"], [
+        ["a", "Completed"], ["b", "Processing"], ["c", "Completed"], ["d", ""], ["e", "Completed"],
+    ])
+    keys = list("abcde")
+    assert compactable_rows(snapshot, keys, {"a": 0, "c": 0, "e": 0}, 100) == [2, 4]
+    assert compactable_rows(snapshot, keys, {"e": 0}, 100) == [4]
+    assert compactable_rows(snapshot, keys, {"a": 0, "c": 0, "e": 0}, 1) == [2]
+
+
+def test_delete_rows_removes_runs_bottom_first():
+    sheet = worksheet("Applicants", ["Email"], [[str(i)] for i in range(6)])
+    delete_rows(sheet, [2, 3, 5, 7])
+    assert [row[0] for row in sheet.values[1:]] == ["2", "4"]
+
+
+def test_only_old_completed_rows_below_processing_move(worker, sheets):
+    applicants, pending, _ = sheets
+    by_name = worker.load_sheets()
+    _poll(worker, by_name)
+    _compact(worker, by_name)
+    assert len(applicants.values) == 9  # nothing is old enough yet
+
+    _age(worker.job_store, 31)
+    _compact(worker, by_name)
+    # Rows above the Processing row (A 4) stay; the blank row (A 6) isn't Completed
+    assert [row[0] for row in applicants.values[1:]] == ["A 0", "A 1", "A 2", "A 3", "A 4", "A 6"]
+    assert pending.values[1:] == []
+    archived = worker.archive._conn.execute("SELECT worksheet, data FROM archived_rows").fetchall()
+    assert sorted(json.loads(data)["Full Name"] for _, data in archived) == ["A 5", "A 7", "P 0", "P 1"]
+
+
+def test_status_counters_include_archived_rows(worker, sheets):
+    by_name = worker.load_sheets()
+    _poll(worker, by_name)
+    before = _status_counts(worker)
+    assert before["orders_placed"] == 1
+
+    _age(worker.job_store, 31)
+    _compact(worker, by_name)
+    _poll(worker, by_name)
+    after = _status_counts(worker)
+    assert after == dict(before, applicants_archived=2, pending_archived=2)
+
+
+def test_failed_deletion_is_not_archived_twice_or_double_counted(worker, sheets, monkeypatch):
+    applicants, _, _ = sheets
+    by_name = worker.load_sheets()
+    _poll(worker, by_name)
+    before = _status_counts(worker)
+    _age(worker.job_store, 31)
+
+    def fail(body):
+        raise RuntimeError("503")
+
+    monkeypatch.setattr(applicants.spreadsheet, "batch_update", fail)
+    _compact(worker, by_name)
+    monkeypatch.undo()
+    _poll(worker, by_name)
+    assert len(applicants.values) == 9  # still on the sheet
+    assert _status_counts(worker)["applicants_total"] == before["applicants_total"]
+
+    _compact(worker, by_name)
+    _poll(worker, by_name)
+    (archived,) = worker.archive._conn.execute(
+        "SELECT COUNT(*) FROM archived_rows WHERE worksheet = 'Applicants'").fetchone()
+    assert archived == 2
+    assert _status_counts(worker)["applicants_total"] == before["applicants_total"]
+
+
+def test_rows_changed_since_the_last_poll_postpone_compaction(worker, sheets):
+    applicants, _, _ = sheets
+    by_name = worker.load_sheets()
+    _poll(worker, by_name)
+    _age(worker.job_store, 31)
+    applicants.values.insert(7, ["New", "new@x.com", "Std", ""])  # added by hand, above A 6
+    _compact(worker, by_name)
+    assert len(applicants.values) == 10
+    assert "Applicants" not in worker._readers  # re-read from scratch next poll
+    assert _status_counts(worker)["applicants_archived"] == 0
+
+
+def test_compaction_can_be_switched_off(worker, sheets):
+    applicants, _, _ = sheets
+    by_name = worker.load_sheets()
+    _poll(worker, by_name)
+    _age(worker.job_store, 365)
+    worker.archive_after_days = 0
+    _compact(worker, by_name)
+    assert len(applicants.values) == 9
+
+
+def test_sheet_archive_goes_to_monthly_worksheets(worker, sheets):
+    from archive import SheetArchive
+
+    worker.archive = SheetArchive(worker.sheets_client)
+    by_name = worker.load_sheets()
+    _poll(worker, by_name)
+    _age(worker.job_store, 31)
+    _compact(worker, by_name)
+    archives = {name: ws for name, ws in worker.sheets_client._worksheets.items() if "Archive" in name}
+    assert sorted(len(ws.values) - 1 for ws in archives.values()) == [2, 2]
+    for ws in archives.values():
+        assert ws.values[0] in (APPLICANT_HEADERS, PENDING_HEADERS)
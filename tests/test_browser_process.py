@@ -0,0 +1,93 @@
+"""BrowserProcess supervision against stub children (no Playwright, no Chromium)."""
+import os
+import threading
+import time
+
+import pytest
+
+from browser_process import BrowserProcess, RowCancelled, RowTimeout, WorkerCrashed
+
+
+def _serve(conn, reply):
+    """Stand-in for _child_main: answers each row with reply(message) until told to stop."""
+    os.setsid()
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "stop":
+            return
+        reply(conn, message)
+
+
+def _echo(conn, config):
+    _serve(conn, lambda conn, message: conn.send(("done", {"index": message[1], "pid": os.getpid()})))
+
+
+def _hang(conn, config):
+    _serve(conn, lambda conn, message: time.sleep(60))
+
+
+def _exit(conn, config):
+    _serve(conn, lambda conn, message: os._exit(3))
+
+
+def browser(target, **kwargs):
+    kwargs.setdefault("rss_limit_mb", 0)
+    return BrowserProcess({"slot": 1}, target=target, **kwargs)
+
+
+@pytest.fixture
+def processes():
+    started = []
+
+    def start(target, **kwargs):
+        started.append(browser(target, **kwargs))
+        return started[-1]
+
+    yield start
+    for process in started:
+        process.kill()
+
+
+def test_hung_row_times_out_and_kills_the_child(processes):
+    process = processes(_hang, row_deadline=1)
+    began = time.monotonic()
+    with pytest.raises(RowTimeout, match="Row 0 exceeded the 1s deadline"):
+        process.run_row(0, {}, False)
+    assert time.monotonic() - began < 5
+    assert process._process is None
+
+
+def test_child_exit_is_a_crash(processes):
+    process = processes(_exit)
+    with pytest.raises(WorkerCrashed, match="exited with code 3 during row 0"):
+        process.run_row(0, {}, False)
+    assert process._process is None
+
+
+def test_cancel_kills_the_child_mid_row(processes):
+    process = processes(_hang, row_deadline=60)
+    cancel = threading.Event()
+    threading.Timer(0.5, cancel.set).start()
+    began = time.monotonic()
+    with pytest.raises(RowCancelled):
+        process.run_row(0, {}, False, cancel=cancel)
+    assert time.monotonic() - began < 5
+    assert process._process is None
+
+
+def test_child_is_restarted_after_recycle_after_rows(processes):
+    process = processes(_echo, recycle_after=2)
+    pids = [process.run_row(i, {}, False)["pid"] for i in range(5)]
+    assert pids[0] == pids[1] != pids[2] == pids[3] != pids[4]
+    assert process.restarts == 3
+
+
+def test_next_row_after_a_kill_starts_a_new_child(processes):
+    process = processes(_echo)
+    first = process.run_row(0, {}, False)["pid"]
+    process.kill()
+    assert process.run_row(1, {}, False) == {"index": 1, "pid": process._process.pid}
+    assert process._process.pid != first
@@ -0,0 +1,143 @@
+from fnmatch import fnmatchcase
+
+import pytest
+
+import browser_profile
+from browser_profile import DEFAULT_BLOCKED_URLS, LAUNCH_ARGS, BrowserProfile
+from metrics import Metrics
+
+PORTAL = "https://enterprise.fadv.com/pub/l/login/userLogin.do"
+
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def send(self, method, params=None):
+        if self.fail:
+            raise RuntimeError("Target closed")
+        self.sent.append((method, params))
+
+
+class FakeContext:
+    """What BrowserProfile.launch touches on a Playwright context, recording CDP traffic per page."""
+
+    def __init__(self, pages=("about:blank",), fail=False):
+        self.pages = list(pages)
+        self.fail = fail
+        self.sessions = {}
+        self.listeners = {}
+        self.routes = []
+
+    def new_cdp_session(self, page):
+        self.sessions[page] = FakeSession(self.fail)
+        return self.sessions[page]
+
+    def on(self, event, handler):
+        self.listeners[event] = handler
+
+    def route(self, pattern, handler):
+        self.routes.append(pattern)
+
+    def clear_cookies(self):
+        pass
+
+    def open_page(self, page):
+        self.pages.append(page)
+        self.listeners["page"](page)
+
+
+class FakePlaywright:
+    def __init__(self, context):
+        self.context = context
+        self.chromium = self
+        self.launches = []
+
+    def launch_persistent_context(self, user_data_dir, headless, args):
+        self.launches.append(args)
+        return self.context
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    fresh = Metrics()
+    monkeypatch.setattr(browser_profile, "metrics", fresh)
+    return fresh
+
+
+def launch(profile, context):
+    playwright = FakePlaywright(context)
+    profile.launch(playwright, True, PORTAL, slot="worker-1")
+    return playwright.launches[0]
+
+
+def test_every_page_gets_the_blocklist_without_a_route(tmp_path):
+    context = FakeContext()
+    launch(BrowserProfile(cache_dir=str(tmp_path)), context)
+    context.open_page("page-2")
+    for page in ("about:blank", "page-2"):
+        assert context.sessions[page].sent == [
+            ("Network.enable", None),
+            ("Network.setBlockedURLs", {"urls": list(DEFAULT_BLOCKED_URLS)}),
+        ]
+    assert context.routes == []  # a route would switch the HTTP cache off
+
+
+def test_blocked_requests_are_counted(tmp_path, counters):
+    context = FakeContext()
+    launch(BrowserProfile(cache_dir=str(tmp_path)), context)
+    failed = context.sessions["about:blank"].handlers["Network.loadingFailed"]
+    failed({"type": "Font", "blockedReason": "inspector"})
+    failed({"type": "Script", "errorText": "net::ERR_ABORTED"})  # not ours
+    assert 'fadv_blocked_requests_total{reason="url",type="font"} 1' in counters.render()
+    assert counters.render().count("fadv_blocked_requests_total{") == 1
+
+
+def test_blocklist_can_be_turned_off(tmp_path):
+    context = FakeContext()
+    assert launch(BrowserProfile(cache_dir=str(tmp_path), blocked_urls=()), context) == LAUNCH_ARGS
+    assert context.sessions == {} and "page" not in context.listeners
+
+    context = FakeContext()
+    assert launch(BrowserProfile(cache_dir=str(tmp_path), enabled=False), context) == []
+    assert context.sessions == {}
+
+
+def test_a_page_the_blocklist_cannot_reach_still_works(tmp_path, capsys):
+    context = FakeContext(fail=True)
+    launch(BrowserProfile(cache_dir=str(tmp_path)), context)
+    assert "[WARN] URL blocklist not installed" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("url", [
+    PORTAL,
+    "https://enterprise.fadv.com/pub/l/gwt/ABCDEF0123.cache.js",
+    "https://enterprise.fadv.com/pub/l/images/email_icon.png",
+    "https://enterprise.fadv.com/pub/l/css/main.css",
+])
+def test_the_default_blocklist_leaves_the_portal_alone(url):
+    assert not any(fnmatchcase(url, pattern) for pattern in DEFAULT_BLOCKED_URLS)
+
+
+@pytest.mark.parametrize("url", [
+    "https://enterprise.fadv.com/pub/l/fonts/OpenSans.woff2",
+    "https://fonts.gstatic.com/s/roboto/v30/abc.woff2",
+    "https://fonts.googleapis.com/css?family=Roboto",
+    "https://www.googletagmanager.com/gtm.js?id=GTM-1",
+    "https://bam.nr-data.net/1/abc",
+])
+def test_the_default_blocklist_drops_fonts_and_trackers(url):
+    assert any(fnmatchcase(url, pattern) for pattern in DEFAULT_BLOCKED_URLS)
+
+
+def test_host_blocking_maps_everything_but_the_portal_to_nothing(tmp_path):
+    profile = BrowserProfile(cache_dir=str(tmp_path), block_hosts=True, allowed_hosts=["sso.example.com"])
+    args = profile.launch_args(PORTAL)
+    assert args[:-1] == LAUNCH_ARGS
+    assert args[-1] == ("--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE fadv.com, EXCLUDE *.fadv.com, "
+                        "EXCLUDE sso.example.com, EXCLUDE *.sso.example.com")
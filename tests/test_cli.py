@@ -0,0 +1,150 @@
+import csv
+import json
+import signal
+import sys
+
+import pytest
+
+import FirstAdvAutomation as cli
+from conftest import StubBrowser, portal_result
+from job_store import JobStore, iter_row_keys, order_key
+
+HEADERS = ["Full Name", "Email", "Company ID", "Location", "Position Type", "CSP ID", "Package"]
+
+
+def applicant(name, email, location="Wilson"):
+    return dict(zip(HEADERS, [name, email, "300 - ISP", location, "Driver", "CSP-100", "Std"]))
+
+
+ROWS = [
+    applicant("Ann A", "ann@x.com"),
+    applicant("Bob B", "bob@x.com", location="Nowhere"),
+    applicant("Cat C", "cat@x.com"),
+    applicant("Ann A (again)", "ANN@x.com"),
+]
+
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = tmp_path / "applicants.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, HEADERS)
+        writer.writeheader()
+        writer.writerows(ROWS)
+    return str(path)
+
+
+@pytest.fixture
+def browser(monkeypatch):
+    browser = StubBrowser()
+    monkeypatch.setattr(cli, "BrowserProcess", lambda config: browser)
+    monkeypatch.setattr(signal, "signal", lambda signum, handler: None)
+    for name in ("FADV_CLIENT_ID", "FADV_USER_ID", "FADV_PASSWORD", "FADV_SEC_QUESTION"):
+        monkeypatch.setenv(name, "x")
+    return browser
+
+
+def run(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["FirstAdvAutomation.py", *args, "--state-db", "state.db",
+                                      "--concurrency", "1", "--orders-per-minute", "0"])
+    cli.main()
+
+
+def results(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def keys():
+    return list(iter_row_keys(ROWS))
+
+
+def test_read_rows_streams_csv_and_jsonl(tmp_path, input_csv):
+    jsonl = tmp_path / "rows.jsonl"
+    jsonl.write_text('{"Full Name": "Ann A", "Email": "ann@x.com", "Age": 30}\n\n{"Email": null}\n')
+    assert list(cli.read_rows(str(jsonl))) == [{"Full Name": "Ann A", "Email": "ann@x.com", "Age": "30"},
+                                                {"Email": ""}]
+    assert list(cli.read_rows(input_csv)) == ROWS
+
+
+def test_finished_keys_are_final_results_only(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text("\n".join([
+        json.dumps({"key": "a", "result": "Completed"}),
+        json.dumps({"key": "b", "result": "Review"}),
+        json.dumps({"key": "c", "result": "Retrying"}),
+        '{"key": "d", "resu',  # cut short by a crash
+    ]) + "\n")
+    assert cli.finished_keys(str(output)) == {"a", "b"}
+    assert cli.finished_keys(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_dry_run_reports_without_a_browser_or_an_output_file(monkeypatch, capsys, input_csv, tmp_path):
+    monkeypatch.setattr(cli, "BrowserProcess", None)  # would fail if used
+    store = JobStore("state.db")
+    store.claim_order(order_key(ROWS[2]), "elsewhere", "Applicants", "cat")
+    store.confirm_order(order_key(ROWS[2]))
+    store.close()
+
+    run(monkeypatch, input_csv, "--dry-run")
+    out = capsys.readouterr().out
+    assert "Row 3 (Bob B): invalid – unknown location 'Nowhere'" in out
+    assert "Row 4 (Cat C): already ordered by an earlier run; would be skipped" in out
+    assert "Row 5 (Ann A (again)): already ordered by row 2; would be skipped" in out
+    assert "Dry run: 1 rows would be submitted, 1 rejected, 2 duplicate orders, 0 already done." in out
+    assert not (tmp_path / "applicants.results.jsonl").exists()
+
+
+def test_run_writes_one_final_result_per_row(monkeypatch, browser, input_csv, tmp_path):
+    run(monkeypatch, input_csv)
+    records = results(tmp_path / "applicants.results.jsonl")
+    assert [(r["row"], r["result"]) for r in records] == [(2, "Completed"), (3, "Invalid"), (4, "Completed"),
+                                                          (5, "Completed")]
+    assert records[3]["note"].startswith("Already ordered")
+    assert browser.calls == [("row", 0, False), ("row", 2, False)]
+
+
+def test_resume_skips_rows_with_a_final_result(monkeypatch, browser, input_csv, tmp_path):
+    output = tmp_path / "applicants.results.jsonl"
+    k = keys()
+    output.write_text(json.dumps({"key": k[0], "result": "Completed"}) + "\n"
+                      + json.dumps({"key": k[1], "result": "Invalid"}) + "\n"
+                      + '{"key": "' + k[2])  # the run was killed while writing row 4
+    run(monkeypatch, input_csv, "--resume")
+    assert browser.calls == [("row", 2, False), ("row", 3, False)]  # row 5's order wasn't recorded as placed
+    assert [r["key"] for r in results_after_crash(output)] == [k[0], k[1], k[2], k[3]]
+
+
+def test_rerun_after_an_unconfirmed_send_looks_the_order_up_first(monkeypatch, browser, tmp_path):
+    single = tmp_path / "single.jsonl"
+    single.write_text(json.dumps(ROWS[0]) + "\n")
+    browser.rows[0] = portal_result(False, sent=True, error="Send clicked; no confirmation", error_kind="permanent")
+    run(monkeypatch, str(single))
+    assert results(tmp_path / "single.results.jsonl")[0]["result"] == "Error"
+
+    browser.rows[0] = portal_result()
+    run(monkeypatch, str(single), "--output", str(tmp_path / "rerun.jsonl"))  # "Error" is final for --resume
+    assert browser.calls == [("row", 0, False), ("row", 0, True)]
+    store = JobStore("state.db")
+    assert store.order_submitted(order_key(ROWS[0]))
+    store.close()
+
+
+def results_after_crash(path):
+    """results() that skips the line the crash cut short."""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def test_locations_from_the_settings_file_are_valid(monkeypatch, capsys, input_csv, tmp_path):
+    config = tmp_path / "settings.json"
+    config.write_text(json.dumps({"location_map": {"nowhere": "00999 - NOWHERE, NC"}}))
+    run(monkeypatch, input_csv, "--dry-run", "--config", str(config))
+    out = capsys.readouterr().out
+    assert "Dry run: 3 rows would be submitted, 0 rejected, 1 duplicate orders, 0 already done." in out
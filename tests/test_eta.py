@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from eta import Ewma, effective_seconds_per_row, finish_time, format_duration
+from scheduler import RunScheduler
+
+
+def _at(scheduler, *args):
+    return scheduler.tz.localize(datetime(*args))
+
+
+def test_finish_time_across_a_window_past_midnight():
+    scheduler = RunScheduler(windows=[{"start": "22:00", "end": "06:00"}])
+    # 1h left tonight after 05:00, the other 2h from 22:00
+    assert finish_time(scheduler, _at(scheduler, 2026, 10, 21, 5), 3 * 3600) == _at(scheduler, 2026, 10, 22, 0)
+
+
+def test_finish_time_spills_into_the_next_window():
+    scheduler = RunScheduler(windows=[{"start": "08:00", "end": "20:00"}])
+    now = _at(scheduler, 2026, 10, 20, 19)
+    assert finish_time(scheduler, now, 2 * 3600) == _at(scheduler, 2026, 10, 21, 9)
+    assert finish_time(scheduler, now, 0) == now
+
+
+def test_forced_run_works_through_the_night():
+    scheduler = RunScheduler(windows=[{"start": "08:00", "end": "20:00"}])
+    now = _at(scheduler, 2026, 10, 20, 21)
+    assert finish_time(scheduler, now, 3600, forced=True) == _at(scheduler, 2026, 10, 20, 22)
+    assert finish_time(scheduler, now, 3600) == _at(scheduler, 2026, 10, 21, 9)
+
+
+def test_finish_time_across_a_dst_change_keeps_the_real_offset():
+    scheduler = RunScheduler(windows=[{"start": "00:00", "end": "06:00"}])
+    now = _at(scheduler, 2026, 11, 1, 0, 30)  # EDT; clocks fall back at 02:00
+    finish = finish_time(scheduler, now, 3 * 3600)
+    assert finish - now == timedelta(hours=3)
+    assert finish.utcoffset() == timedelta(hours=-5)
+    assert (finish.hour, finish.minute) == (2, 30)
+
+
+def test_rate_limit_floors_the_seconds_per_row():
+    ewma = Ewma(initial=60)
+    ewma.update(40)
+    assert ewma.value == 40
+    ewma.update(90)
+    assert ewma.value == 50
+    assert effective_seconds_per_row(ewma, 2, 0) == 25
+    assert effective_seconds_per_row(ewma, 2, 1) == 60
+
+
+def test_format_duration():
+    assert format_duration(None) == "n/a"
+    assert format_duration(125) == "2m"
+    assert format_duration(3 * 3600 + 600) == "3h 10m"
+    assert format_duration(26 * 3600) == "1d 2h 0m"
@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import events
+from events import Broadcaster, format_event
+
+KEEP_ALIVE = ": keep-alive\n\n"
+
+
+def subscribe(broadcaster, heartbeat=0.05):
+    """A started stream: the first next() registers the subscriber (and returns whatever came first)."""
+    stream = broadcaster.stream(heartbeat)
+    return stream, next(stream)
+
+
+def data(message):
+    return json.loads(message.split("data: ", 1)[1])
+
+
+@pytest.fixture
+def fast_publisher(monkeypatch):
+    monkeypatch.setattr(events, "DEBOUNCE_SECONDS", 0)
+    monkeypatch.setattr(events, "REFRESH_SECONDS", 0.05)
+
+
+def test_format_event():
+    assert format_event("row", {"row": 3}, 7) == 'id: 7\nevent: row\ndata: {"row": 3}\n\n'
+    assert format_event("status", {"at": 1}) == 'event: status\ndata: {"at": 1}\n\n'
+
+
+def test_published_events_reach_every_subscriber_until_it_leaves():
+    broadcaster = Broadcaster()
+    (a, first_a), (b, first_b) = subscribe(broadcaster), subscribe(broadcaster)
+    assert first_a == first_b == KEEP_ALIVE
+    assert broadcaster.subscriber_count() == 2
+
+    message = broadcaster.publish("row", {"row": 1})
+    assert next(a) == next(b) == message
+    a.close()
+    assert broadcaster.subscriber_count() == 1
+    broadcaster.publish("row", {"row": 2})
+    assert data(next(b)) == {"row": 2}
+    b.close()
+
+
+def test_a_slow_subscriber_loses_its_oldest_messages():
+    broadcaster = Broadcaster(buffer_size=2)
+    stream, _ = subscribe(broadcaster)
+    for row in range(3):
+        broadcaster.publish("row", {"row": row})
+    assert [data(next(stream)) for _ in range(2)] == [{"row": 1}, {"row": 2}]
+    assert next(stream) == KEEP_ALIVE
+    stream.close()
+
+
+def test_status_is_published_only_when_it_changes(fast_publisher):
+    status = {"processed": 0, "eta": "5 min"}
+    broadcaster = Broadcaster()
+    broadcaster.set_snapshot_source(lambda: dict(status), ignore_keys=("eta",))
+    stream = broadcaster.stream(heartbeat=0.3)
+    assert data(next(stream)) == status
+
+    status["eta"] = "4 min"  # ignored on its own
+    broadcaster.touch()
+    assert next(stream) == KEEP_ALIVE
+
+    status["processed"] = 1
+    broadcaster.touch()
+    assert data(next(stream)) == {"processed": 1, "eta": "4 min"}
+
+    late, first = subscribe(broadcaster)
+    assert data(first) == {"processed": 1, "eta": "4 min"}  # a newcomer starts from the last snapshot
+    stream.close()
+    late.close()
@@ -0,0 +1,122 @@
+from job_store import (BUSY, COMPLETED, DUPLICATE, ERROR, PENDING, PROCESSING, SUBMIT, VERIFY, JobStore,
+                       column_row_keys, order_key)
+
+URL = "https://sheets.example/test"
+
+
+def test_row_keys_tell_duplicates_apart():
+    keys = column_row_keys(["a@x.com", "A@x.com ", ""], ["Ann", "ann", ""])
+    assert keys == ["a@x.com|ann", "a@x.com|ann|#2", "#row4"]
+
+
+def test_sync_inserts_updates_and_drops_rows(job_store):
+    job_store.sync(URL, "Applicants", ["a", "b"], [PENDING, COMPLETED])
+    assert job_store.counts(URL)["Applicants"] == {"total": 2, PENDING: 1, COMPLETED: 1}
+    job_store.sync(URL, "Applicants", ["b"], [COMPLETED])
+    assert job_store.counts(URL)["Applicants"] == {"total": 1, COMPLETED: 1}
+
+
+def test_claim_counts_attempts_and_reset_starts_over(job_store):
+    job_store.sync(URL, "Applicants", ["a"], [PENDING])
+    assert job_store.claim(URL, "Applicants", "a", 2) == 1
+    job_store.finish(URL, "Applicants", "a", False, "boom")
+    assert job_store.claim(URL, "Applicants", "a", 2) == 2
+    job_store.finish(URL, "Applicants", "a", False, "boom")
+    job_store.sync(URL, "Applicants", ["a"], ["error"])
+    job_store.sync(URL, "Applicants", ["a"], [PENDING])  # Status cleared on the sheet
+    assert job_store.claim(URL, "Applicants", "a", 2) == 1
+
+
+def test_retry_backoff_defers_the_row(job_store, clock):
+    job_store.sync(URL, "Applicants", ["a"], [PENDING])
+    job_store.claim(URL, "Applicants", "a", 2)
+    job_store.finish(URL, "Applicants", "a", False, "timeout", retry_at=clock.now + 60)
+    assert job_store.deferred(URL, "Applicants") == {"a"}
+    clock.advance(61)
+    assert job_store.deferred(URL, "Applicants") == set()
+
+
+def test_lease_expiry_makes_processing_rows_reclaimable(tmp_path, clock):
+    store = JobStore(str(tmp_path / "lease.db"), lease_seconds=30)
+    store.sync(URL, "Applicants", ["a", "b"], [PENDING, PENDING])
+    store.claim(URL, "Applicants", "a", 2)
+    store.sync(URL, "Applicants", ["a", "b"], [PROCESSING, PROCESSING])  # "b" was Processing before the store
+    assert store.stale_processing(URL, "Applicants", ["a", "b"]) == {"b"}
+    clock.advance(31)
+    assert store.stale_processing(URL, "Applicants", ["a", "b"]) == {"a", "b"}
+    store.close()
+
+
+def test_expire_leases_on_start(job_store):
+    job_store.sync(URL, "Applicants", ["a"], [PENDING])
+    job_store.claim(URL, "Applicants", "a", 2)
+    assert job_store.stale_processing(URL, "Applicants", ["a"]) == set()
+    job_store.expire_leases(URL)
+    assert job_store.stale_processing(URL, "Applicants", ["a"]) == {"a"}
+
+
+def test_order_key_normalizes_and_needs_an_email():
+    row = {"Email": " Jane@X.com ", "Package": "Std  Package", "Company ID": "12"}
+    assert order_key(row) == "jane@x.com|std package|12"
+    assert order_key({"Email": "", "Package": "Std"}) is None
+
+
+def test_claim_order_state_machine(job_store):
+    key = "jane@x.com|std|12"
+    assert job_store.claim_order(key, URL, "Applicants", "row-1") == SUBMIT
+    assert job_store.claim_order(key, URL, "Applicants", "row-2") == BUSY  # same order in flight
+    assert job_store.claim_order(key, URL, "Applicants", "row-1") == VERIFY  # its own earlier attempt
+    job_store.confirm_order(key)
+    assert job_store.order_submitted(key)
+    assert job_store.claim_order(key, URL, "Applicants", "row-2") == DUPLICATE
+
+
+def test_release_forgets_an_order_that_was_never_sent(job_store):
+    key = "jane@x.com|std|12"
+    job_store.claim_order(key, URL, "Applicants", "row-1")
+    job_store.release_order(key)
+    assert job_store.claim_order(key, URL, "Applicants", "row-2") == SUBMIT
+
+
+def test_stale_sending_record_is_taken_over_with_verify(tmp_path, clock):
+    store = JobStore(str(tmp_path / "orders.db"), lease_seconds=30)
+    key = "jane@x.com|std|12"
+    store.claim_order(key, URL, "Applicants", "row-1")
+    clock.advance(31)
+    assert store.claim_order(key, URL, "Applicants", "row-2") == VERIFY
+    store.close()
+
+
+def test_false_positive_redo_is_allowed_once(job_store):
+    key = "jane@x.com|std|12"
+    job_store.claim_order(key, URL, "Applicants", "row-1")
+    job_store.confirm_order(key)
+    assert job_store.can_redo(key)
+    job_store.allow_redo(key, URL, "Applicants", "row-1")
+    assert job_store.claim_order(key, URL, "Applicants", "row-1") == SUBMIT
+    job_store.confirm_order(key)
+    assert not job_store.can_redo(key)
+    job_store.allow_redo(key, URL, "Applicants", "row-1")
+    assert job_store.claim_order(key, URL, "Applicants", "row-1") == DUPLICATE
+
+
+def test_held_order_is_looked_up_again_until_a_person_clears_the_row(job_store):
+    key = "jane@x.com|std|12"
+    job_store.sync(URL, "Applicants", ["row-1", "row-2"], [PENDING, PENDING])
+    job_store.claim_order(key, URL, "Applicants", "row-1")
+    job_store.hold_order(key)
+    assert job_store.claim_order(key, URL, "Applicants", "row-2") == VERIFY  # a duplicate row: lookup first
+    job_store.hold_order(key)
+    assert job_store.claim_order(key, URL, "Applicants", "row-2") == VERIFY  # reclaimed, never cleared
+    job_store.hold_order(key)
+
+    job_store.finish(URL, "Applicants", "row-2", False, "already in FADV")
+    job_store.sync(URL, "Applicants", ["row-1", "row-2"], [ERROR, ERROR])  # "Review: ..." on the sheet
+    job_store.sync(URL, "Applicants", ["row-1", "row-2"], [ERROR, PENDING])  # a person cleared row 2
+    assert job_store.claim_order(key, URL, "Applicants", "row-2") == SUBMIT
+
+
+def test_meta_counters(job_store):
+    assert job_store.get_meta(URL, "orders_placed") == 0
+    job_store.set_meta(URL, "orders_placed", 3)
+    assert job_store.get_meta(URL, "orders_placed") == 3
@@ -0,0 +1,68 @@
+import pytest
+
+from metrics import Metrics
+
+
+def test_render_counters_and_summaries():
+    metrics = Metrics()
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        metrics.observe("fadv_row_duration_seconds", seconds, flow="applicant")
+    metrics.inc("fadv_rows_total", flow="applicant", result="ok")
+    metrics.inc("fadv_rows_total", 2, flow="applicant", result="ok")
+
+    assert metrics.render().splitlines() == [
+        "# HELP fadv_row_duration_seconds End-to-end duration of one sheet row.",
+        "# TYPE fadv_row_duration_seconds summary",
+        'fadv_row_duration_seconds{flow="applicant",quantile="0.5"} 0.300000',
+        'fadv_row_duration_seconds{flow="applicant",quantile="0.95"} 0.400000',
+        'fadv_row_duration_seconds{flow="applicant",quantile="0.99"} 0.400000',
+        'fadv_row_duration_seconds_sum{flow="applicant"} 1.000000',
+        'fadv_row_duration_seconds_count{flow="applicant"} 4',
+        "# HELP fadv_rows_total Rows processed, by flow and result.",
+        "# TYPE fadv_rows_total counter",
+        'fadv_rows_total{flow="applicant",result="ok"} 3',
+    ]
+
+
+def test_label_values_are_escaped_and_unknown_names_get_their_own_help():
+    metrics = Metrics()
+    metrics.inc("custom_total", step='say "hi"\\\n')
+    assert metrics.render().splitlines() == [
+        "# HELP custom_total custom_total",
+        "# TYPE custom_total counter",
+        'custom_total{step="say \\"hi\\"\\\\\\n"} 1',
+    ]
+
+
+def test_quantiles_cover_the_recent_window_only(monkeypatch):
+    import metrics as module
+
+    monkeypatch.setattr(module, "WINDOW", 3)
+    metrics = Metrics()
+    for seconds in (9.0, 1.0, 2.0, 3.0):
+        metrics.observe("fadv_sheets_api_seconds", seconds, op="read")
+    assert metrics.quantiles("fadv_sheets_api_seconds", op="read") == {0.5: 2.0, 0.95: 3.0, 0.99: 3.0}
+    assert metrics.quantiles("fadv_sheets_api_seconds", op="write") == {}
+    assert "fadv_sheets_api_seconds_sum{op=\"read\"} 15.000000" in metrics.render()
+
+
+def test_sheets_call_counts_failures_and_still_times_them():
+    metrics = Metrics()
+    with metrics.sheets_call("values_get"):
+        pass
+    with pytest.raises(RuntimeError):
+        with metrics.sheets_call("values_get"):
+            raise RuntimeError("503")
+    text = metrics.render()
+    assert 'fadv_sheets_api_calls_total{op="values_get"} 2' in text
+    assert 'fadv_sheets_api_errors_total{op="values_get"} 1' in text
+    assert 'fadv_sheets_api_seconds_count{op="values_get"} 2' in text
+
+
+def test_step_observer_records_latency_and_errors_per_flow():
+    metrics = Metrics()
+    observe = metrics.step_observer("pending")
+    observe("search", 0.5, False)
+    observe("search", 1.5, True)
+    assert metrics.quantiles("fadv_step_duration_seconds", flow="pending", step="search")[0.99] == 1.5
+    assert 'fadv_step_errors_total{flow="pending",step="search"} 1' in metrics.render()
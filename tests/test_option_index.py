@@ -0,0 +1,79 @@
+from option_index import SELECTS, OptionIndex, normalize_label
+
+
+class FakePage:
+    """Answers OptionIndex.load's two browser calls from a dict of {field: [(label, value)]}."""
+
+    def __init__(self, options):
+        self.options = options
+        self.calls = []
+
+    def wait_for_function(self, script, arg=None, timeout=None):
+        self.calls.append(("wait", arg[0], timeout))
+
+    def evaluate(self, script, selects):
+        self.calls.append(("evaluate", selects))
+        return {field: [list(option) for option in self.options.get(field, [])] for field in selects}
+
+
+def loaded(options, csp_id="CSP-100"):
+    index = OptionIndex()
+    index.load(FakePage(options), csp_id, 5000)
+    return index
+
+
+def test_labels_are_normalized():
+    assert normalize_label("  Std   Package\n(Drug) ") == "std package (drug)"
+    assert normalize_label(None) == ""
+
+
+def test_load_reads_every_dropdown_in_one_evaluate():
+    page = FakePage({"package": [("Std (Drug + MVR)", "P1")], "company": [("300 - ISP", "C1")]})
+    index = OptionIndex()
+    index.load(page, "CSP-100", 5000)
+    assert page.calls == [
+        ("wait", [SELECTS["package"], SELECTS["company"], SELECTS["position"]], 5000),
+        ("evaluate", SELECTS),
+    ]
+    assert index.has("CSP-100") and not index.has("CSP-200")
+    assert index.labels("CSP-100", "package") == ["std (drug + mvr)"]
+
+
+def test_lookup_matches_whole_labels_and_package_substrings():
+    index = loaded({
+        "package": [("Std Plus (Drug + MVR)", "P2"), ("Std (Drug + MVR)", "P1")],
+        "position": [("Driver Helper", "D2"), ("Driver", "D1")],
+    })
+    assert index.lookup("CSP-100", "package", " std (drug + MVR) ") == "P1"  # exact beats substring
+    assert index.lookup("CSP-100", "package", "Plus") == "P2"
+    assert index.lookup("CSP-100", "position", "driver") == "D1"
+    assert index.lookup("CSP-100", "position", "Help") is None  # substrings are for packages only
+    assert index.lookup("CSP-100", "package", "") is None
+    assert index.lookup("CSP-200", "package", "Std") is None
+
+
+def test_an_empty_dependent_list_keeps_the_options_read_before():
+    index = loaded({"package": [("Std", "P1")], "facility": [("Wilson", "F1")]})
+    index.load(FakePage({"package": [("Std", "P9")]}), "CSP-100", 5000)
+    assert index.lookup("CSP-100", "package", "Std") == "P9"
+    assert index.lookup("CSP-100", "facility", "Wilson") == "F1"
+
+
+def test_export_and_merge_carry_an_entry_to_another_index():
+    source = loaded({"package": [("Std", "P1")], "company": [("300 - ISP", "C1")]})
+    entry = source.export("CSP-100")
+    assert entry == {"package": [["std", "P1"]], "company": [["300 - isp", "C1"]]}
+
+    target = OptionIndex()
+    target.merge("CSP-100", entry)
+    assert target.lookup("CSP-100", "company", "300 - ISP") == "C1"
+    assert source.export("CSP-404") == {}
+
+
+def test_invalidate_one_or_all():
+    index = loaded({"package": [("Std", "P1")]})
+    index.merge("CSP-200", {"package": [["std", "P2"]]})
+    index.invalidate("CSP-100")
+    assert not index.has("CSP-100") and index.has("CSP-200")
+    index.invalidate()
+    assert not index.has("CSP-200")
@@ -0,0 +1,144 @@
+import pytest
+
+from conftest import StubBrowser, automation, portal_result, worksheet
+from job_store import order_key
+
+HEADERS = ["Full Name", "Email", "Company ID", "Location", "Position Type", "CSP ID", "Package", "Status"]
+STATUS_COL = 8
+
+
+def applicant(name="Jane Doe", email="jane@x.com", status=""):
+    return [name, email, "300 - ISP", "Wilson", "Driver", "CSP-100", "Std", status]
+
+
+class SyncPool:
+    """Runs each job on the calling thread, in order."""
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    def run_batch(self, jobs, is_running=lambda: True):
+        for job in jobs:
+            if not is_running():
+                break
+            self.handler(job)
+
+
+@pytest.fixture
+def sheets():
+    return [
+        worksheet("Applicants", HEADERS, [applicant()]),
+        worksheet("Pending Review", ["Full Name", "Email", "Status", "OrderStatus"]),
+        worksheet("False Positives", ["Name", "Email Address"]),
+    ]
+
+
+@pytest.fixture
+def worker(job_store, sheets):
+    worker = automation(job_store, sheets)
+    worker.running = True
+    worker.forced = True  # no run-window checks
+    worker.orders_per_minute = 0
+    worker.browser = StubBrowser()
+    worker._get_browser = lambda: worker.browser
+    worker.pool = SyncPool(worker._handle_job)
+    worker._maybe_compact = lambda sheets: None
+    return worker
+
+
+def poll(worker):
+    """One pass of the process loop (false positives, then Applicants); returns the Status column."""
+    worker._wait_for_next_poll = lambda did_work: setattr(worker, "running", False)
+    worker.running = True
+    worker._process_loop()
+    worker.status_writer.flush()
+    return worker.load_sheets()["Applicants"].column("Status")
+
+
+def order(worker, row=None):
+    return order_key(dict(zip(HEADERS, row or applicant())))
+
+
+def test_new_order_is_submitted_and_recorded(worker):
+    assert poll(worker) == ["Completed"]
+    assert worker.browser.calls == [("row", 0, False)]
+    assert worker.job_store.order_submitted(order(worker))
+
+
+def test_duplicate_row_is_completed_without_a_browser(worker, sheets):
+    sheets[0].append_rows([applicant("Jane Doe (dup)", "JANE@x.com ")])
+    assert poll(worker) == ["Completed", "Completed"]
+    assert worker.browser.calls == [("row", 0, False)]
+
+
+def test_busy_order_defers_the_row(worker):
+    worker.job_store.claim_order(order(worker), "https://sheets.example/other", "Applicants", "elsewhere")
+    assert poll(worker) == [""]
+    assert worker.browser.calls == []
+    keys = worker._row_keys["Applicants"]
+    assert worker.job_store.deferred(worker.sheet_url, "Applicants") == {keys[0]}
+
+
+def test_failure_before_send_releases_the_order(worker):
+    worker.browser.rows[0] = portal_result(False, sent=False, error="Timeout 30000ms exceeded")
+    assert poll(worker) == ["Retrying (1/3)"]
+    worker.job_store._conn.execute("UPDATE jobs SET retry_at = NULL")
+    worker.browser.rows[0] = portal_result()
+    assert poll(worker) == ["Completed"]
+    assert worker.browser.calls == [("row", 0, False), ("row", 0, False)]
+
+
+def test_verify_not_found_sends_the_order(worker):
+    worker.browser.rows[0] = portal_result(False, sent=True, error="Timeout 30000ms exceeded")
+    assert poll(worker) == ["Retrying (1/3)"]
+    worker.job_store._conn.execute("UPDATE jobs SET retry_at = NULL")
+    worker.browser.rows[0] = portal_result()  # the lookup found nothing, so the order went out
+    assert poll(worker) == ["Completed"]
+    assert worker.browser.calls == [("row", 0, False), ("row", 0, True)]
+    assert worker.job_store.order_submitted(order(worker))
+
+
+def test_crashed_browser_process_means_verify(worker):
+    from browser_process import WorkerCrashed
+
+    worker.browser.rows[0] = WorkerCrashed("browser process exited (code -9) during row 0")
+    assert poll(worker) == ["Retrying (1/3)"]
+    worker.job_store._conn.execute("UPDATE jobs SET retry_at = NULL")
+    worker.browser.rows[0] = portal_result()
+    poll(worker)
+    assert worker.browser.calls[-1] == ("row", 0, True)
+
+
+def test_verify_found_holds_the_row_for_review(worker, sheets):
+    worker.browser.rows[0] = portal_result(False, sent=True, error="Timeout 30000ms exceeded")
+    poll(worker)
+    worker.job_store._conn.execute("UPDATE jobs SET retry_at = NULL")
+    worker.browser.rows[0] = portal_result(False, sent=False, review=True, error_kind="permanent",
+                                           error="jane@x.com is already in FADV; check whether this order was placed")
+    held = ["Review: jane@x.com is already in FADV; check whether this order was placed"]
+    assert poll(worker) == held
+    assert not worker.breaker._failures
+
+    assert poll(worker) == held  # not picked up again
+    assert len(worker.browser.calls) == 2
+
+    sheets[0].values[1][STATUS_COL - 1] = ""  # a person checked FADV and cleared the row
+    worker.browser.rows[0] = portal_result()
+    assert poll(worker) == ["Completed"]
+    assert worker.browser.calls[-1] == ("row", 0, False)
+
+
+def test_false_positive_is_redone_once(worker, sheets):
+    applicants, _, false_positives = sheets
+    applicants.values[1][STATUS_COL - 1] = "Completed"
+    key = order(worker)
+    worker.job_store.claim_order(key, worker.sheet_url, "Applicants", "jane@x.com|jane doe")
+    worker.job_store.confirm_order(key)
+    false_positives.append_rows([["Jane Doe", "jane@x.com"]])
+
+    assert poll(worker) == ["Completed"]
+    assert worker.browser.calls == [("row", 0, False)]
+
+    false_positives.append_rows([["Someone", "else@x.com"]])  # the sheet changes; Jane is still listed
+    assert poll(worker) == ["Completed"]
+    assert len(worker.browser.calls) == 1
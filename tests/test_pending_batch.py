@@ -0,0 +1,108 @@
+import pytest
+
+from conftest import StubBrowser, automation, portal_result, worksheet
+
+PENDING_HEADERS = ["Full Name", "Email", "Status", "OrderStatus"]
+STATUS_COL = 3
+
+
+@pytest.fixture
+def pending():
+    return worksheet("Pending Review", PENDING_HEADERS, [
+        ["P 0", "p0@x.com", "", ""],
+        ["P 1", "p1@x.com", "", ""],
+        ["P 0 again", "P0@x.com", "", ""],
+    ])
+
+
+@pytest.fixture
+def worker(job_store, pending):
+    worker = automation(job_store, [
+        worksheet("Applicants", ["Full Name", "Email", "Status"]),
+        pending,
+        worksheet("False Positives", ["Name", "Email Address"]),
+    ])
+    worker.running = True
+    worker.orders_per_minute = 0
+    return worker
+
+
+def run_batch(worker, browser):
+    """Hands every pending row to one batch job, as the process loop does; returns the sheet's statuses."""
+    worker._get_browser = lambda: browser
+    sheet = worker.load_sheets()["Pending Review"]
+    reader = worker._reader("Pending Review", sheet, needs_work=True)
+    reader.refresh()
+    items = worker._select_work("Pending Review", reader.snapshot, True)
+    worker._handle_job(("pending_batch", sheet, STATUS_COL, items))
+    worker.status_writer.flush()
+    return sheet.column("Status")
+
+
+def matched(found, missing=(), duplicates=()):
+    return {"found": list(found), "missing": list(missing), "duplicates": list(duplicates),
+            "results": len(found), "steps": [], "timing": {}}
+
+
+def test_matched_rows_are_ordered_and_unmatched_rows_get_their_own_search(worker):
+    def batch(rows, report):
+        assert [i for i, _ in rows] == [0, 1, 2]
+        report("matched", matched([0], missing=[1], duplicates=[(2, "Same email as row 2, which is ordered instead")]))
+        report("row", portal_result(index=0))
+
+    browser = StubBrowser(batch=batch)
+    assert run_batch(worker, browser) == ["Completed", "Completed", "Error"]
+    assert browser.calls == [("batch", [0, 1, 2]), ("row", 1, False)]
+
+
+def test_a_row_no_search_finds_ends_in_error_from_the_per_row_flow(worker):
+    def batch(rows, report):
+        report("matched", matched([0], missing=[1]))
+        report("row", portal_result(index=0))
+
+    browser = StubBrowser(rows={1: portal_result(False, error="No pending result row found for email 'p1@x.com'",
+                                                 error_kind="permanent")}, batch=batch)
+    statuses = run_batch(worker, browser)
+    assert statuses[:2] == ["Completed", "Error"]
+    assert not worker.breaker.is_open()
+
+
+def test_a_batch_that_times_out_feeds_the_breaker_once(worker):
+    from browser_process import RowTimeout
+    from retry import CircuitBreaker
+
+    worker.breaker = CircuitBreaker(threshold=2)
+
+    def batch(rows, report):
+        report("matched", matched([0, 1, 2]))
+        raise RowTimeout("pending batch took longer than 300s")
+
+    assert run_batch(worker, StubBrowser(batch=batch)) == ["Retrying (1/3)"] * 3
+    assert worker.breaker._failures == 1
+    assert not worker.breaker.is_open()
+
+
+def test_a_failed_search_feeds_the_breaker_once_and_counts_an_attempt_per_row(worker):
+    from retry import CircuitBreaker
+
+    worker.breaker = CircuitBreaker(threshold=2)
+
+    def batch(rows, report):
+        raise RuntimeError("Pending search returned no subjects")
+
+    for attempt in (1, 2):
+        assert run_batch(worker, StubBrowser(batch=batch)) == [f"Retrying ({attempt}/3)"] * 3
+        worker.job_store._conn.execute("UPDATE jobs SET retry_at = NULL")  # skip the backoff
+    assert worker.breaker.is_open()  # two failed searches, not six
+
+
+def test_cancelled_batch_hands_its_claimed_rows_back(worker):
+    from browser_process import RowCancelled
+
+    def batch(rows, report):
+        report("matched", matched([0, 1, 2]))
+        report("row", portal_result(index=0))
+        raise RowCancelled("stopped")
+
+    assert run_batch(worker, StubBrowser(batch=batch)) == ["Completed", "", ""]
+    assert worker.breaker._failures == 0
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from benchmarks.fake_sheet import FakeSheetsClient
+from pipeline_config import load_config, location_map, pipeline_settings
+
+CONFIG = {
+    "schedule": {
+        "windows": [{"days": [0, 1, 2, 3, 4], "start": "08:00", "end": "17:00"}],
+        "holidays": ["2026-12-25"],
+    },
+    "pipelines": {
+        "nights": {"schedule": {"windows": [{"days": [0, 1, 2, 3, 4], "start": "22:00", "end": "06:00"}]}},
+    },
+}
+
+
+@pytest.fixture
+def registry(job_store):
+    from pipelines import PipelineRegistry
+
+    registry = PipelineRegistry(concurrency=1, job_store=job_store, sheets_client=FakeSheetsClient([]),
+                                config=CONFIG)
+    yield registry
+    registry.pool.shutdown()
+
+
+def at(scheduler, text):
+    return scheduler.tz.localize(datetime.strptime(text, "%Y-%m-%d %H:%M"))
+
+
+def test_missing_file_means_defaults(tmp_path):
+    assert load_config(str(tmp_path / "none.json")) == {}
+
+
+@pytest.mark.parametrize("text", ["{not json", "[1, 2]"])
+def test_malformed_file_is_refused(tmp_path, text):
+    path = tmp_path / "fadv_config.json"
+    path.write_text(text)
+    with pytest.raises(ValueError, match="fadv_config.json"):
+        load_config(str(path))
+
+
+def test_file_round_trip(tmp_path):
+    path = tmp_path / "fadv_config.json"
+    path.write_text(json.dumps(CONFIG))
+    assert load_config(str(path)) == CONFIG
+
+
+def test_pipeline_sections_override_the_top_level_key_by_key():
+    assert pipeline_settings(CONFIG, "default") == {"schedule": CONFIG["schedule"]}
+    assert pipeline_settings(CONFIG, "nights") == {"schedule": {
+        "windows": [{"days": [0, 1, 2, 3, 4], "start": "22:00", "end": "06:00"}],
+        "holidays": ["2026-12-25"],
+    }}
+    assert pipeline_settings({}, "default") == {}
+
+
+def test_each_pipeline_runs_on_its_own_schedule(registry):
+    default = registry.get().scheduler
+    nights = registry.add("nights").scheduler
+    # Thursday 2026-10-22
+    assert default.is_open(at(default, "2026-10-22 09:00")) and not nights.is_open(at(nights, "2026-10-22 09:00"))
+    assert nights.is_open(at(nights, "2026-10-22 23:00")) and not default.is_open(at(default, "2026-10-22 23:00"))
+    assert not default.is_open(at(default, "2026-10-24 09:00"))  # Saturday
+    assert not nights.is_open(at(nights, "2026-12-25 23:00"))  # the holiday applies to both
+
+
+def test_bad_schedule_is_reported_at_startup(job_store):
+    from pipelines import PipelineRegistry
+
+    with pytest.raises(ValueError, match="Pipeline default: bad schedule"):
+        PipelineRegistry(concurrency=1, job_store=job_store, sheets_client=FakeSheetsClient([]),
+                         config={"schedule": {"windows": [{"days": [0], "start": "8am"}]}})
+
+
+def test_location_map_extends_the_built_in_one():
+    from portal_worker import LOCATION_MAP
+
+    mapping = location_map({"location_map": {" Raleigh ": "00261 - RALEIGH, NC", "greenville": None}})
+    assert mapping["raleigh"] == "00261 - RALEIGH, NC"
+    assert "greenville" not in mapping
+    assert mapping["wilson"] == LOCATION_MAP["wilson"]
+    assert location_map({}) == LOCATION_MAP
+
+
+def test_pipelines_validate_against_their_own_location_map(job_store):
+    from pipelines import PipelineRegistry
+
+    config = {"location_map": {"raleigh": "00261 - RALEIGH, NC"},
+              "pipelines": {"coast": {"location_map": {"wilmington": "00270 - WILMINGTON, NC"}}}}
+    registry = PipelineRegistry(concurrency=1, job_store=job_store, sheets_client=FakeSheetsClient([]), config=config)
+    try:
+        default, coast = registry.get(), registry.add("coast")
+    finally:
+        registry.pool.shutdown()
+    row = {"Full Name": "Jane Doe", "Email": "jane@x.com", "Company ID": "300 - ISP", "Position Type": "Driver",
+           "CSP ID": "CSP-100", "Package": "Std"}
+    assert default._validate("Applicants", dict(row, Location="Raleigh")) is None
+    assert default._validate("Applicants", dict(row, Location="Wilmington")) == "unknown location 'Wilmington'"
+    assert coast._validate("Applicants", dict(row, Location="Wilmington")) is None
+    assert coast._validate("Applicants", dict(row, Location="Raleigh")) is None
@@ -0,0 +1,102 @@
+"""
+Portal flows driven through a real Chromium against benchmarks/fake_portal.py.
+Skipped where Playwright's Chromium isn't installed (python -m playwright install chromium).
+"""
+import pytest
+
+from benchmarks.fake_portal import COMPANIES, CSP_IDS, PACKAGES, POSITIONS, FakePortal, serve
+
+
+@pytest.fixture(scope="module")
+def chromium():
+    from playwright.sync_api import sync_playwright
+
+    try:
+        with sync_playwright() as p:
+            p.chromium.launch().close()
+    except Exception as e:
+        pytest.skip(f"Playwright's Chromium is not available: {e}")
+
+
+@pytest.fixture
+def portal(chromium):
+    portal = FakePortal(latency_ms=20)
+    server, portal.url = serve(portal)
+    yield portal
+    server.shutdown()
+
+
+@pytest.fixture
+def worker(portal, tmp_path):
+    from portal_worker import PortalWorker
+
+    worker = PortalWorker("CLIENT", "user", "secret", "answer", portal_url=portal.url, state_dir=str(tmp_path))
+    yield worker
+    worker.close()
+
+
+def applicant(email="jane.doe@example.com"):
+    csp = CSP_IDS[0]
+    return {
+        "Full Name": "Jane Doe", "Email": email, "Company ID": COMPANIES[0], "Location": "Wilson",
+        "Position Type": POSITIONS[0], "CSP ID": csp, "Package": list(PACKAGES[csp].values())[0].split(" (")[0],
+    }
+
+
+def test_new_subject_is_sent_once(worker, portal):
+    result = worker.process_row(0, applicant())
+    assert result["success"] and result["sent"]
+    assert len(portal.orders) == 1
+
+
+def test_verify_holds_the_row_when_the_subject_is_already_there(worker, portal):
+    assert worker.process_row(0, applicant())["success"]  # the attempt that "crashed" after Send
+
+    result = worker.process_row(0, applicant(), verify_existing=True)
+    assert not result["success"]
+    assert result["review"] and not result["sent"]
+    assert "already in FADV" in result["error"]
+    assert len(portal.orders) == 1
+
+
+def test_verify_sends_when_the_search_comes_back_empty(worker, portal):
+    portal.seed_pending("Someone Else", "someone.else@example.com")
+    result = worker.process_row(0, applicant(), verify_existing=True)
+    assert result["success"] and result["sent"] and not result["review"]
+    assert [order["email"] for order in portal.orders] == ["jane.doe@example.com"]
+
+
+def test_slow_send_is_clicked_once(worker, portal):
+    portal.latency_ms = 2500  # longer than the old 2 s re-click window
+    worker.session.timeouts["send"] = 15000
+    result = worker.process_row(0, applicant())
+    assert result["success"]
+    assert len(portal.orders) == 1
+
+
+def test_pending_batch_reads_every_results_page(worker, portal):
+    portal.page_size = 2
+    rows = []
+    for i in range(5):
+        portal.seed_pending(f"Pending {i}", f"pending{i}@example.com")
+        rows.append((i, {"Full Name": f"Pending {i}", "Email": f"pending{i}@example.com"}))
+    rows.append((5, {"Full Name": "Not There", "Email": "not.there@example.com"}))
+    messages = []
+    worker.process_pending_batch(rows, lambda kind, payload: messages.append((kind, payload)))
+
+    kind, payload = messages[0]
+    assert kind == "matched" and payload["found"] == [0, 1, 2, 3, 4] and payload["missing"] == [5]
+    assert all(payload["success"] for kind, payload in messages[1:])
+    assert sorted(portal.placed) == [f"pending{i}@example.com" for i in range(5)]
+
+
+def test_empty_pending_search_is_an_error_not_an_empty_batch(worker, portal):
+    with pytest.raises(RuntimeError, match="no subjects"):
+        worker.process_pending_batch([(0, {"Full Name": "A", "Email": "a@example.com"})], lambda *_: None)
+
+
+def test_pending_row_missing_from_fadv_fails_without_waiting_out_the_search(worker, portal):
+    worker.session.timeouts["search"] = 60000
+    result = worker.process_row(0, {"Full Name": "A", "Email": "a@example.com"}, is_pending_review=True)
+    assert not result["success"] and result["error_kind"] == "permanent"
+    assert result["total"] < 30
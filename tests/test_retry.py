@@ -0,0 +1,100 @@
+import gspread
+import pytest
+
+from browser_process import RowError
+from retry import PERMANENT, TRANSIENT, CircuitBreaker, PermanentError, RetryPolicy, call_with_retries, classify
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": "", "status": ""}}
+
+
+@pytest.mark.parametrize("error, kind", [
+    (PermanentError("no subject"), PERMANENT),
+    (ValueError("bad package"), PERMANENT),
+    (TimeoutError("Timeout 30000ms exceeded"), TRANSIENT),
+    (RuntimeError("net::ERR_CONNECTION_RESET"), TRANSIENT),
+    (gspread.exceptions.APIError(_Response(429)), TRANSIENT),
+    (gspread.exceptions.APIError(_Response(503)), TRANSIENT),
+    (gspread.exceptions.APIError(_Response(400)), PERMANENT),
+    (RowError("from the browser process", PERMANENT), PERMANENT),
+])
+def test_classify(error, kind):
+    assert classify(error) == kind
+
+
+def test_retry_policy_caps_attempts_and_skips_permanent_errors():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(TimeoutError(), 1)
+    assert policy.should_retry(TimeoutError(), 2)
+    assert not policy.should_retry(TimeoutError(), 3)
+    assert not policy.should_retry(PermanentError(), 1)
+
+
+def test_call_with_retries_stops_on_permanent(monkeypatch):
+    monkeypatch.setattr("retry.t.sleep", lambda seconds: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError("slow")
+        return "ok"
+
+    assert call_with_retries(flaky, attempts=3) == "ok"
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad")
+
+    calls.clear()
+    with pytest.raises(ValueError):
+        call_with_retries(broken, attempts=3)
+    assert len(calls) == 1
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=60, max_cooldown=240)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()  # opened
+    assert breaker.is_open()
+    assert not breaker.allow()
+    assert breaker.retry_in() == 60
+
+    clock.advance(60)
+    assert breaker.allow()  # the half-open trial
+    assert not breaker.allow()  # only one
+    assert breaker.is_open()
+
+    assert breaker.record_failure()  # the trial failed: re-open for twice as long
+    assert breaker.retry_in() == 120
+    clock.advance(120)
+    assert breaker.allow()
+    breaker.record_success()
+    assert not breaker.is_open()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_cooldown_is_capped(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=100, max_cooldown=150)
+    breaker.record_failure()
+    for _ in range(3):
+        clock.advance(breaker.retry_in())
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.retry_in() == 150
+
+
+def test_released_trial_does_not_count(clock):
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()  # the slot is free again
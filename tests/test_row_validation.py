@@ -0,0 +1,62 @@
+import pytest
+
+from option_index import OptionIndex
+from row_validation import invalid_status, validate_applicant, validate_pending
+
+LOCATIONS = {"wilson": "NC-WILSON"}
+
+
+def applicant(**changes):
+    row = {"Full Name": "Jane Doe", "Email": "jane@x.com", "Company ID": "300 - ISP", "Location": "Wilson",
+           "Position Type": "Driver", "CSP ID": "CSP-100", "Package": "Std"}
+    row.update(changes)
+    return row
+
+
+@pytest.fixture
+def options():
+    index = OptionIndex()
+    index.merge("CSP-100", {
+        "package": [["std (drug + mvr)", "P1"]],
+        "company": [["300 - isp", "C1"]],
+        "position": [["driver", "D1"]],
+    })
+    return index
+
+
+def test_complete_row_is_valid(options):
+    assert validate_applicant(applicant(), LOCATIONS) is None
+    assert validate_applicant(applicant(Location=" WILSON "), LOCATIONS, options) is None
+
+
+@pytest.mark.parametrize("email", ["jane", "jane@x", "jane doe@x.com", "a@b@x.com", "jane@x."])
+def test_bad_email_is_invalid(email):
+    assert validate_applicant(applicant(Email=email), LOCATIONS) == f"invalid email '{email}'"
+
+
+def test_missing_columns_are_listed_together():
+    row = applicant(Email="  ", Package="")
+    del row["CSP ID"]
+    assert validate_applicant(row, LOCATIONS) == "missing Email, CSP ID, Package"
+
+
+def test_unknown_location_is_invalid():
+    assert validate_applicant(applicant(Location="Raleigh"), LOCATIONS) == "unknown location 'Raleigh'"
+
+
+def test_dropdown_values_are_checked_once_the_csp_id_is_indexed(options):
+    assert validate_applicant(applicant(Package="Premium"), LOCATIONS, options) == \
+        "Package 'Premium' is not offered for CSP ID CSP-100"
+    assert validate_applicant(applicant(**{"Position Type": "Pilot"}), LOCATIONS, options) == \
+        "Position Type 'Pilot' is not offered for CSP ID CSP-100"
+    # Not seen yet: only the portal can tell
+    assert validate_applicant(applicant(**{"CSP ID": "CSP-200", "Package": "Premium"}), LOCATIONS, options) is None
+
+
+def test_pending_rows_need_only_a_name_and_email():
+    assert validate_pending({"Full Name": "Jane Doe", "Email": "jane@x.com"}) is None
+    assert validate_pending({"Full Name": "", "Email": "jane@x.com"}) == "missing Full Name"
+
+
+def test_invalid_status():
+    assert invalid_status("missing Email") == "Invalid: missing Email"
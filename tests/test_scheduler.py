@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from scheduler import RunScheduler
+
+
+def _at(scheduler, *args):
+    return scheduler.tz.localize(datetime(*args))
+
+
+def test_business_hours_and_holidays():
+    scheduler = RunScheduler(windows=[{"days": [0, 1, 2, 3, 4], "start": "08:00", "end": "20:00"}],
+                             holidays=["2026-10-20"])
+    assert scheduler.is_open(_at(scheduler, 2026, 10, 19, 9))  # Monday
+    assert not scheduler.is_open(_at(scheduler, 2026, 10, 19, 21))
+    assert not scheduler.is_open(_at(scheduler, 2026, 10, 20, 9))  # holiday
+    assert scheduler.next_open(_at(scheduler, 2026, 10, 19, 21)) == _at(scheduler, 2026, 10, 21, 8)
+    assert scheduler.next_open(_at(scheduler, 2026, 10, 23, 21)) == _at(scheduler, 2026, 10, 26, 8)  # Fri -> Mon
+
+
+def test_window_past_midnight():
+    scheduler = RunScheduler(windows=[{"start": "22:00", "end": "06:00"}])
+    assert scheduler.current_window_end(_at(scheduler, 2026, 10, 20, 23)) == _at(scheduler, 2026, 10, 21, 6)
+    assert scheduler.is_open(_at(scheduler, 2026, 10, 21, 3))
+    assert not scheduler.is_open(_at(scheduler, 2026, 10, 21, 12))
+
+
+def test_no_window_within_the_horizon():
+    scheduler = RunScheduler(windows=[{"days": [0], "start": "08:00", "end": "20:00"}])
+    assert scheduler.next_open(_at(scheduler, 2026, 10, 20, 9), horizon_days=3) is None
+    assert scheduler.describe_next_open(_at(scheduler, 2026, 10, 20, 9)).startswith("Sleeping until Mon Oct 26")
@@ -0,0 +1,80 @@
+import os
+import stat
+import threading
+
+import pytest
+
+import session_state
+from session_state import SessionStateStore
+
+STATE = {"cookies": [{"name": "JSESSIONID", "value": "abc"}], "origins": []}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_state, "KDF_ITERATIONS", 1000)  # the real count only slows the tests down
+    return SessionStateStore(str(tmp_path / "sessions"))
+
+
+def test_saved_state_loads_back_with_the_same_credentials(store):
+    assert store.load("CLIENT", "user", "secret", "answer") is None
+    store.save("CLIENT", "user", "secret", "answer", STATE)
+    assert store.load("CLIENT", "user", "secret", "answer") == STATE
+    assert store.load("CLIENT", "other", "secret", "answer") is None  # one file per account
+
+
+def test_files_are_private_and_encrypted(store):
+    store.save("CLIENT", "user", "secret", "answer", STATE)
+    path = store.path("CLIENT", "user")
+    assert stat.S_IMODE(os.stat(store.directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    with open(path, "rb") as f:
+        assert b"JSESSIONID" not in f.read()
+
+
+def test_changed_credentials_discard_the_file(store):
+    store.save("CLIENT", "user", "secret", "answer", STATE)
+    assert store.load("CLIENT", "user", "new secret", "answer") is None
+    assert not os.path.exists(store.path("CLIENT", "user"))
+
+
+def test_corrupt_file_is_discarded(store):
+    store.save("CLIENT", "user", "secret", "answer", STATE)
+    path = store.path("CLIENT", "user")
+    with open(path, "rb") as f:
+        blob = f.read()
+    with open(path, "wb") as f:
+        f.write(blob[:-20])  # cut short, as by a full disk
+    assert store.load("CLIENT", "user", "secret", "answer") is None
+    assert not os.path.exists(store.path("CLIENT", "user"))
+
+
+def test_concurrent_saves_leave_one_readable_file(store):
+    def save(n):
+        for i in range(5):
+            store.save("CLIENT", "user", "secret", "answer", dict(STATE, origins=[n, i]))
+
+    threads = [threading.Thread(target=save, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.load("CLIENT", "user", "secret", "answer")["origins"][1] == 4
+    assert os.listdir(store.directory) == [os.path.basename(store.path("CLIENT", "user"))]
+
+
+def test_temp_file_names_do_not_depend_on_the_thread(store, monkeypatch):
+    # Thread idents repeat across processes; two browser processes saving at once must not share a temp file
+    monkeypatch.setattr(threading, "get_ident", lambda: 1)
+    seen = []
+    real_replace = os.replace
+
+    def replace(src, dst):
+        seen.append(src)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", replace)
+    store.save("CLIENT", "user", "secret", "answer", STATE)
+    store.save("CLIENT", "user", "secret", "answer", STATE)
+    assert len(set(seen)) == 2
+    assert all(os.path.dirname(src) == store.directory for src in seen)
@@ -0,0 +1,85 @@
+from conftest import worksheet
+from sheet_poller import IncrementalSheet, row_runs
+from sheet_snapshot import NEEDS_WORK
+
+HEADERS = ["Full Name", "Email", "Location", "Status"]
+FINGERPRINT = ("Full Name", "Email", "Status")
+
+
+def _sheet(rows):
+    return worksheet("Applicants", HEADERS, rows)
+
+
+def test_row_runs():
+    assert row_runs([5, 2, 3, 9, 4]) == [[2, 5], [9, 9]]
+
+
+def test_first_refresh_is_a_full_reload():
+    sheet = _sheet([["A", "a@x", "Wilson", "Completed"]])
+    reader = IncrementalSheet(sheet, FINGERPRINT)
+    assert reader.refresh()
+    assert sheet.calls == {"get_all_values": 1}
+    assert reader.snapshot.record(0)["Location"] == "Wilson"
+
+
+def test_unchanged_sheet_costs_one_narrow_read():
+    sheet = _sheet([["A", "a@x", "Wilson", "Completed"], ["B", "b@x", "Wilson", "Completed"]])
+    reader = IncrementalSheet(sheet, FINGERPRINT, actionable=NEEDS_WORK)
+    reader.refresh()
+    sheet.calls.clear()
+    assert not reader.refresh()
+    assert sheet.calls == {"batch_get": 1}
+
+
+def test_changed_fingerprint_rereads_only_that_row():
+    sheet = _sheet([["A", "a@x", "Wilson", "Completed"], ["B", "b@x", "Wilson", "Completed"]])
+    reader = IncrementalSheet(sheet, FINGERPRINT)
+    reader.refresh()
+    sheet.values[2][3] = ""
+    sheet.values[2][2] = "Greenville"
+    reads = []
+    batch_get = sheet.batch_get
+    sheet.batch_get = lambda ranges: reads.append(ranges) or batch_get(ranges)
+    assert reader.refresh()
+    assert reads[-1] == ["A3:D3"]
+    assert reader.snapshot.record(1)["Location"] == "Greenville"
+
+
+def test_actionable_rows_are_reread_even_without_fingerprint_changes():
+    sheet = _sheet([["A", "a@x", "", ""]])  # blank Status: still to do
+    reader = IncrementalSheet(sheet, FINGERPRINT, actionable=NEEDS_WORK)
+    reader.refresh()
+    sheet.values[1][2] = "Wilson"  # not a fingerprint column
+    assert reader.refresh()
+    assert reader.snapshot.value(0, "Location") == "Wilson"
+
+
+def test_appended_and_removed_rows():
+    sheet = _sheet([["A", "a@x", "Wilson", "Completed"]])
+    reader = IncrementalSheet(sheet, FINGERPRINT)
+    reader.refresh()
+    sheet.append_rows([["B", "b@x", "Wilson", ""]])
+    assert reader.refresh()
+    assert reader.snapshot.column("Full Name") == ["A", "B"]
+    del sheet.values[2]
+    assert reader.refresh()
+    assert reader.snapshot.column("Full Name") == ["A"]
+
+
+def test_moved_columns_force_a_full_reload():
+    sheet = _sheet([["A", "a@x", "Wilson", "Completed"]])
+    reader = IncrementalSheet(sheet, FINGERPRINT)
+    reader.refresh()
+    sheet.values = [["Email", "Full Name", "Location", "Status"], ["a@x", "A", "Wilson", "Completed"]]
+    sheet.calls.clear()
+    assert reader.refresh()
+    assert sheet.calls.get("get_all_values") == 1
+    assert reader.snapshot.value(0, "Full Name") == "A"
+
+
+def test_patch_updates_the_local_copy():
+    sheet = _sheet([["A", "a@x", "Wilson", ""]])
+    reader = IncrementalSheet(sheet, FINGERPRINT)
+    reader.refresh()
+    reader.patch(0, "Status", "Invalid: bad location")
+    assert reader.snapshot.value(0, "Status") == "Invalid: bad location"
@@ -0,0 +1,50 @@
+from sheet_snapshot import (BLANK, COMPLETED, ERROR, INVALID, NEEDS_WORK, OTHER, PROCESSING, RETRYING, REVIEW,
+                            SheetSnapshot, status_code)
+
+
+def test_status_codes():
+    assert status_code("") == BLANK
+    assert status_code(" Completed ") == COMPLETED
+    assert status_code("processing") == PROCESSING
+    assert status_code("Error") == ERROR
+    assert status_code("Retrying (1/3)") == RETRYING
+    assert status_code("Invalid: missing email") == INVALID
+    assert status_code("Review: a@x is already in FADV") == REVIEW
+    assert status_code("on hold") == OTHER
+    assert REVIEW not in NEEDS_WORK
+
+
+def test_rows_and_counts():
+    snapshot = SheetSnapshot(["Full Name", "Email", "Status"], [
+        ["A", "a@x", "Completed"],
+        ["B", "b@x"],  # trailing cells trimmed by the API
+        ["C", "c@x", "Retrying (2/3)"],
+    ])
+    assert len(snapshot) == 3
+    assert snapshot.status_counts() == {COMPLETED: 1, BLANK: 1, RETRYING: 1}
+    assert snapshot.rows_with(NEEDS_WORK) == [1, 2]
+    assert snapshot.record(1) == {"Full Name": "B", "Email": "b@x", "Status": ""}
+    assert snapshot.column("Missing") == ["", "", ""]
+
+
+def test_set_row_reports_changes_and_recodes_status():
+    snapshot = SheetSnapshot(["Email", "Status"], [["a@x", ""]])
+    assert not snapshot.set_row(0, ["a@x", ""])
+    assert snapshot.set_row(0, ["a@x", "Completed"])
+    assert snapshot.status[0] == COMPLETED
+    assert snapshot.set_row(1, ["b@x", "Error"])  # appends the next row
+    assert snapshot.status.tolist() == [COMPLETED, ERROR]
+
+
+def test_set_and_truncate():
+    snapshot = SheetSnapshot(["Email", "Status", "OrderStatus"], [["a@x", "", "placed"], ["b@x", "", "Placed "]])
+    snapshot.set(0, "Status", "Processing")
+    assert snapshot.status[0] == PROCESSING
+    assert snapshot.count_value("OrderStatus", "placed") == 2
+    snapshot.truncate(1)
+    assert len(snapshot) == 1 and snapshot.column("Email") == ["a@x"]
+
+
+def test_first_column_of_a_repeated_header_wins():
+    snapshot = SheetSnapshot(["Email", "Email", "Status"], [["first", "second", ""]])
+    assert snapshot.value(0, "Email") == "first"
@@ -0,0 +1,78 @@
+import pytest
+
+import sheet_writer
+from conftest import worksheet
+from sheet_writer import StatusWriteBuffer
+
+
+def test_writes_to_the_same_cell_coalesce():
+    sheet = worksheet("Applicants", ["Full Name", "Status"], [["A", ""], ["B", ""]])
+    buffer = StatusWriteBuffer()
+    buffer.set(sheet, 2, 2, "Processing")
+    buffer.set(sheet, 3, 2, "Processing")
+    buffer.set(sheet, 2, 2, "Completed")
+
+    assert buffer.pending_count() == 2
+    assert buffer.flush() == 2
+    assert sheet.calls == {"batch_update": 1}
+    assert [row[1] for row in sheet.values[1:]] == ["Completed", "Processing"]
+    assert buffer.flush() == 0
+
+
+def test_one_batch_update_per_worksheet():
+    applicants = worksheet("Applicants", ["Status"], [[""]])
+    pending = worksheet("Pending Review", ["Status"], [[""]])
+    buffer = StatusWriteBuffer()
+    buffer.set(applicants, 2, 1, "Completed")
+    buffer.set(pending, 2, 1, "Error")
+    buffer.flush()
+    assert applicants.calls == {"batch_update": 1}
+    assert pending.calls == {"batch_update": 1}
+
+
+def test_close_flushes_what_is_left():
+    sheet = worksheet("Applicants", ["Status"], [[""]])
+    buffer = StatusWriteBuffer(flush_interval=3600).start()
+    buffer.set(sheet, 2, 1, "Completed")
+    buffer.close()
+    assert sheet.values[1] == ["Completed"]
+    assert buffer.pending_count() == 0
+
+
+def test_max_pending_wakes_the_flusher():
+    sheet = worksheet("Applicants", ["Status"], [[""] for _ in range(3)])
+    buffer = StatusWriteBuffer(flush_interval=3600, max_pending=2).start()
+    try:
+        buffer.set(sheet, 2, 1, "Completed")
+        buffer.set(sheet, 3, 1, "Completed")
+        for _ in range(100):
+            if buffer.flushes:
+                break
+            buffer._stopped.wait(0.02)
+        assert buffer.flushes == 1
+    finally:
+        buffer.close()
+
+
+def test_failed_flush_requeues_without_overwriting_newer_values():
+    sheet = worksheet("Applicants", ["Status"], [[""]])
+    buffer = StatusWriteBuffer()
+    buffer.set(sheet, 2, 1, "Processing")
+
+    def failing(updates):
+        buffer.set(sheet, 2, 1, "Completed")  # queued while the failing batch is in flight
+        raise RuntimeError("429")
+
+    sheet.batch_update, original = failing, sheet.batch_update
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    sheet.batch_update = original
+    buffer.flush()
+    assert sheet.values[1] == ["Completed"]
+
+
+def test_closed_buffers_leave_the_exit_flush():
+    buffer = StatusWriteBuffer()
+    assert buffer in sheet_writer._live_buffers
+    buffer.close()
+    assert buffer not in sheet_writer._live_buffers
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+from worker_pool import MAX_CONCURRENCY, SWITCH_AFTER_JOBS, SharedWorkerPool, WorkerPool, browser_slot
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out")
+        time.sleep(0.01)
+
+
+def in_thread(fn, *args):
+    thread = threading.Thread(target=fn, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.fixture
+def pool():
+    pool = SharedWorkerPool(1)
+    yield pool
+    pool.shutdown()
+
+
+def test_tenants_take_turns_on_a_shared_worker(pool):
+    handled, exits = [], []
+    a = pool.tenant("a", lambda job: handled.append(("a", job)), on_worker_exit=lambda: exits.append("a"),
+                    queue_size=20)
+    b = pool.tenant("b", lambda job: handled.append(("b", job)), on_worker_exit=lambda: exits.append("b"),
+                    queue_size=20)
+    feeders = [in_thread(a.run_batch, range(12)), in_thread(b.run_batch, range(12))]
+    wait_until(lambda: len(a.jobs) == 12 and len(b.jobs) == 12)
+    pool.start()
+    for feeder in feeders:
+        feeder.join(5)
+
+    assert sorted(handled) == sorted([("a", n) for n in range(12)] + [("b", n) for n in range(12)])
+    runs = []
+    for tenant, _ in handled:
+        if runs and runs[-1][0] == tenant:
+            runs[-1][1] += 1
+        else:
+            runs.append([tenant, 1])
+    assert max(n for _, n in runs) <= SWITCH_AFTER_JOBS
+    assert len(runs) >= 4  # interleaved, not one backlog after the other
+    # Each switch closed the browser of the tenant the worker left
+    assert exits[:len(runs) - 1] == [tenant for tenant, _ in runs[:-1]]
+
+
+def test_removing_a_tenant_drops_its_queued_jobs(pool):
+    handled = []
+    a = pool.tenant("a", lambda job: handled.append(("a", job)), queue_size=20)
+    b = pool.tenant("b", lambda job: handled.append(("b", job)), queue_size=20)
+    feeder_a = in_thread(a.run_batch, range(10))
+    feeder_b = in_thread(b.run_batch, range(3))
+    wait_until(lambda: len(a.jobs) == 10 and len(b.jobs) == 3)
+
+    a.shutdown()
+    feeder_a.join(5)
+    assert not feeder_a.is_alive()  # run_batch returns instead of waiting for dropped jobs
+    pool.start()
+    feeder_b.join(5)
+    assert handled == [("b", 0), ("b", 1), ("b", 2)]
+
+    pool.tenant("a", lambda job: handled.append(("a2", job))).run_batch([0])  # the name is free again
+    assert handled[-1] == ("a2", 0)
+
+
+def test_removing_a_tenant_waits_for_its_browser_to_close(pool):
+    started, release, exits = threading.Event(), threading.Event(), []
+
+    def slow(job):
+        started.set()
+        release.wait(5)
+
+    a = pool.tenant("a", slow, on_worker_exit=lambda: exits.append(threading.current_thread().name))
+    pool.start()
+    feeder = in_thread(a.run_batch, [0])
+    started.wait(5)
+    remover = in_thread(a.shutdown)
+    time.sleep(0.1)
+    assert remover.is_alive()  # the worker is still inside a's job
+    release.set()
+    remover.join(5)
+    feeder.join(5)
+    assert exits == ["fadv-worker-1"]  # closed on the worker thread that held it
+
+
+def test_a_tenant_name_can_only_be_used_once(pool):
+    pool.tenant("a", lambda job: None)
+    with pytest.raises(ValueError):
+        pool.tenant("a", lambda job: None)
+
+
+def test_fair_share_splits_workers_between_busy_tenants():
+    pool = SharedWorkerPool(2)
+    tenants, busy, overshare = {}, {"a": 0, "b": 0}, []
+    lock = threading.Lock()
+
+    def handler(name, other):
+        def handle(job):
+            with lock:
+                busy[name] += 1
+                if busy[name] > 1 and tenants[other].jobs:
+                    overshare.append((name, job))  # took the second worker while the other tenant waited
+            time.sleep(0.02)
+            with lock:
+                busy[name] -= 1
+        return handle
+
+    try:
+        tenants["a"] = pool.tenant("a", handler("a", "b"), queue_size=20)
+        tenants["b"] = pool.tenant("b", handler("b", "a"), queue_size=20)
+        feeders = [in_thread(tenants[name].run_batch, range(10)) for name in ("a", "b")]
+        wait_until(lambda: len(tenants["a"].jobs) == 10 and len(tenants["b"].jobs) == 10)
+        pool.start()
+        for feeder in feeders:
+            feeder.join(10)
+    finally:
+        pool.shutdown()
+    assert overshare == []
+
+
+def test_pools_are_capped_and_share_the_process_wide_browser_slots():
+    assert SharedWorkerPool(10).size == MAX_CONCURRENCY
+    lock = threading.Lock()
+    state = {"in_slot": 0, "peak": 0}
+
+    def handle(job):
+        with browser_slot():
+            with lock:
+                state["in_slot"] += 1
+                state["peak"] = max(state["peak"], state["in_slot"])
+            time.sleep(0.02)
+            with lock:
+                state["in_slot"] -= 1
+
+    pools = [WorkerPool(handle, MAX_CONCURRENCY).start() for _ in range(2)]
+    try:
+        feeders = [in_thread(p.run_batch, range(20)) for p in pools]
+        for feeder in feeders:
+            feeder.join(10)
+    finally:
+        for p in pools:
+            p.shutdown()
+    assert state["peak"] == MAX_CONCURRENCY
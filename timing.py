@@ -0,0 +1,43 @@
+import time as t
+from contextlib import contextmanager
+
+
+class TimingProfile:
+    """
+    Records how long each named step of a row actually took, in order.
+    Used to see where the per-row time goes now that steps wait on conditions
+    instead of fixed sleeps.
+    """
+
+    def __init__(self, label="", observer=None):
+        self.label = label
+        self.observer = observer  # optional callback(step_name, seconds, failed)
+        self.steps = []  # [(step_name, seconds)]
+        self.started = t.monotonic()
+
+    @contextmanager
+    def step(self, name):
+        start = t.monotonic()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            seconds = t.monotonic() - start
+            self.steps.append((name, seconds))
+            if self.observer is not None:
+                self.observer(name, seconds, failed)
+
+    def total(self):
+        return t.monotonic() - self.started
+
+    def as_dict(self):
+        out = {}
+        for name, seconds in self.steps:
+            out[name] = round(out.get(name, 0.0) + seconds, 3)
+        out["total"] = round(self.total(), 3)
+        return out
+
+    def summary(self):
+        parts = ", ".join(f"{name}={seconds:.1f}s" for name, seconds in self.steps)
+        return f"{self.label} took {self.total():.1f}s ({parts})"
@@ -0,0 +1,298 @@
+import collections
+import queue
+import threading
+import time as t
+
+# Hard ceiling on browsers driving the portal at once, across every pool in the process
+MAX_CONCURRENCY = 4
+_browser_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+# A shared pool worker stays on its pipeline for at most this many jobs while another one waits
+SWITCH_AFTER_JOBS = 5
+
+_account_limiters = {}
+_account_limiters_lock = threading.Lock()
+
+
+class RateLimiter:
+    """
+    Spaces out row starts so at most `per_minute` begin in any minute.
+    Slots are handed out in order, so concurrent workers queue fairly behind each other.
+    """
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self, is_running=lambda: True):
+        """Blocks until this caller's slot comes up. Returns False if stopped while waiting."""
+        with self._lock:
+            now = t.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        while is_running():
+            delay = slot - t.monotonic()
+            if delay <= 0:
+                return True
+            t.sleep(min(delay, 0.5))
+        return False
+
+
+def account_limiter(account_key, per_minute):
+    """Returns the shared RateLimiter for one FADV account, so all workers on it share a budget."""
+    with _account_limiters_lock:
+        limiter = _account_limiters.get(account_key)
+        if limiter is None or limiter.interval != (60.0 / per_minute if per_minute else 0.0):
+            limiter = RateLimiter(per_minute)
+            _account_limiters[account_key] = limiter
+        return limiter
+
+
+class browser_slot:
+    """Context manager holding one of the process-wide MAX_CONCURRENCY browser slots."""
+
+    def __enter__(self):
+        _browser_slots.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        _browser_slots.release()
+        return False
+
+
+class WorkerPool:
+    """
+    A fixed set of worker threads pulling jobs from a shared queue.
+    Workers live for the whole run (not one batch), so each one keeps its own
+    logged-in browser session between poll cycles; `on_worker_exit` runs on the
+    worker's own thread so it can close that session.
+    """
+
+    def __init__(self, handler, size, on_worker_exit=None, name="fadv-worker", queue_size=0):
+        self.handler = handler
+        self.size = max(1, min(int(size), MAX_CONCURRENCY))
+        self.on_worker_exit = on_worker_exit
+        self.name = name
+        # A bounded queue makes run_batch pull from a generator only as fast as workers drain it
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._shutdown = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for n in range(self.size):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{n + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def run_batch(self, jobs, is_running=lambda: True):
+        """
+        Queues every job and blocks until all of them have been handled. `jobs` may be
+        a generator; with a bounded queue it is consumed lazily. Stops feeding new jobs
+        once is_running() turns false.
+        """
+        for job in jobs:
+            while True:
+                if not is_running():
+                    break
+                try:
+                    self._queue.put(job, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            if not is_running():
+                break
+        self._queue.join()
+
+    def shutdown(self):
+        self._shutdown.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _worker(self):
+        try:
+            while not self._shutdown.is_set():
+                try:
+                    job = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                try:
+                    self.handler(job)
+                except Exception as e:
+                    print(f"[ERROR] {threading.current_thread().name} job crashed: {e}")
+                finally:
+                    self._queue.task_done()
+        finally:
+            if self.on_worker_exit:
+                try:
+                    self.on_worker_exit()
+                except Exception as e:
+                    print(f"[WARN] {threading.current_thread().name} cleanup failed: {e}")
+
+
+class SharedWorkerPool:
+    """
+    One set of worker threads serving several pipelines (tenants), each with its
+    own handler. Workers take jobs round-robin across tenants with queued work, so
+    one pipeline's backlog can't starve the others. A worker keeps serving the
+    tenant it served last while that tenant is within its fair share of workers
+    (and for at most SWITCH_AFTER_JOBS jobs while another tenant waits), so its
+    browser isn't switched between accounts for nothing. On a switch, the old
+    tenant's `on_worker_exit` runs on the worker first, closing that browser.
+    """
+
+    def __init__(self, size, name="fadv-worker"):
+        self.size = max(1, min(int(size), MAX_CONCURRENCY))
+        self.name = name
+        self._cond = threading.Condition()
+        self._tenants = {}  # name -> PoolTenant
+        self._rotation = collections.deque()  # tenant names, next in line first
+        self._shutdown = False
+        self._threads = []
+
+    def start(self):
+        for n in range(self.size):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{n + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def tenant(self, name, handler, on_worker_exit=None, queue_size=None):
+        """Registers a tenant and returns its PoolTenant (run_batch/shutdown, like a WorkerPool)."""
+        with self._cond:
+            if name in self._tenants:
+                raise ValueError(f"Pipeline '{name}' is already using the worker pool")
+            tenant = PoolTenant(self, name, handler, on_worker_exit, queue_size or self.size * 2)
+            self._tenants[name] = tenant
+            self._rotation.append(name)
+            return tenant
+
+    def shutdown(self):
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _remove(self, tenant):
+        """Unregisters a tenant once every worker that served it has run its exit hook."""
+        with self._cond:
+            tenant.closed = True
+            tenant.unfinished -= len(tenant.jobs)
+            tenant.jobs.clear()
+            self._cond.notify_all()
+            while tenant.served and not self._shutdown:
+                self._cond.wait(0.5)
+            if self._tenants.get(tenant.name) is tenant:
+                del self._tenants[tenant.name]
+                self._rotation.remove(tenant.name)
+
+    def _pick(self, holding, streak):
+        """The tenant a worker that last served `holding` should take a job from (lock held)."""
+        live = [tenant for tenant in self._tenants.values() if not tenant.closed]
+        wanting = sum(1 for tenant in live if tenant.jobs or tenant.busy)
+        if not wanting:
+            return None
+        share = -(-self.size // wanting)
+        if holding is not None and not holding.closed and holding.jobs and holding.busy < share:
+            waiting = any(tenant is not holding and tenant.jobs and tenant.busy < share for tenant in live)
+            if not waiting or streak < SWITCH_AFTER_JOBS:
+                return holding
+        for _ in range(len(self._rotation)):
+            tenant = self._tenants[self._rotation[0]]
+            self._rotation.rotate(-1)
+            if tenant.jobs and not tenant.closed:
+                return tenant
+        return None
+
+    def _leave(self, tenant):
+        """Runs `tenant`'s exit hook on this worker (it no longer holds that tenant's browser)."""
+        if tenant.on_worker_exit:
+            try:
+                tenant.on_worker_exit()
+            except Exception as e:
+                print(f"[WARN] {threading.current_thread().name} cleanup for {tenant.name} failed: {e}")
+        with self._cond:
+            tenant.served.discard(threading.current_thread().name)
+            self._cond.notify_all()
+
+    def _worker(self):
+        me = threading.current_thread().name
+        holding = None  # tenant this worker served last; its browser may still be open here
+        streak = 0
+        while True:
+            tenant = job = None
+            with self._cond:
+                while not self._shutdown and not (holding is not None and holding.closed):
+                    tenant = self._pick(holding, streak)
+                    if tenant is not None:
+                        job = tenant.jobs.popleft()
+                        tenant.busy += 1
+                        tenant.served.add(me)
+                        self._cond.notify_all()  # room in the tenant's queue
+                        break
+                    self._cond.wait(0.5)
+            if tenant is None:
+                if holding is not None:
+                    self._leave(holding)
+                    holding = None
+                if self._shutdown:
+                    return
+                continue
+            if tenant is holding:
+                streak += 1
+            else:
+                if holding is not None:
+                    self._leave(holding)
+                holding, streak = tenant, 1
+            try:
+                tenant.handler(job)
+            except Exception as e:
+                print(f"[ERROR] {me} job for {tenant.name} crashed: {e}")
+            finally:
+                with self._cond:
+                    tenant.busy -= 1
+                    tenant.unfinished -= 1
+                    self._cond.notify_all()
+
+
+class PoolTenant:
+    """One pipeline's handle on a SharedWorkerPool, with the WorkerPool run_batch/shutdown interface."""
+
+    def __init__(self, pool, name, handler, on_worker_exit, queue_size):
+        self.pool = pool
+        self.name = name
+        self.handler = handler
+        self.on_worker_exit = on_worker_exit
+        self.queue_size = queue_size
+        self.jobs = collections.deque()
+        self.unfinished = 0
+        self.busy = 0
+        self.served = set()  # worker names that may hold this tenant's browser
+        self.closed = False
+
+    @property
+    def size(self):
+        return self.pool.size
+
+    def run_batch(self, jobs, is_running=lambda: True):
+        """Queues the jobs (lazily, at most queue_size waiting) and blocks until all are handled."""
+        cond = self.pool._cond
+        for job in jobs:
+            with cond:
+                while len(self.jobs) >= self.queue_size and is_running() and not self.closed:
+                    cond.wait(0.5)
+                if not is_running() or self.closed:
+                    break
+                self.jobs.append(job)
+                self.unfinished += 1
+                cond.notify_all()
+        with cond:
+            while self.unfinished > 0:
+                cond.wait(0.5)
+
+    def shutdown(self):
+        self.pool._remove(self)